@@ -18,6 +18,37 @@
 # v1.8 Changelog:
 # - Added a "Manual Save & Clear" button to save all current logs on demand.
 
+# HRG Serial Monitor v1.9
+# Authors: Hui, Rongrong, Gemini
+# Description: A GUI tool with refined UI and memory management for the debug log.
+# v1.9 Changelog:
+# - Polling moved to hrg_core.af_poller: drift-free deadline scheduling on the monotonic clock
+#   instead of write/read/sleep(1), with a configurable target rate up to the link limit.
+# - Optional pipelining: several AF 01 FA requests in flight, replies matched by AF..FA framing.
+# - Status bar shows sent/replied/timeout/malformed counters, actual rate and round-trip time.
+
+# HRG Serial Monitor v1.10
+# Authors: Hui, Rongrong, Gemini
+# Description: A GUI tool with refined UI and memory management for the debug log.
+# v1.10 Changelog:
+# - CSV logging moved to hrg_core.csv_sink: rows are appended by a background writer thread,
+#   one file per session, rotated by size, rotated segments optionally gzip-compressed.
+# - Rows are written straight from the polling thread; csv_buffer and archive_log_data are gone,
+#   so the CSV no longer depends on how many lines the log window holds.
+# - The log window is simply trimmed when it grows past UI_MAX_LINES.
+# - Stopping or closing waits for the polling thread to exit before the CSV is closed; rows that
+#   still arrive after close() are refused and counted as dropped instead of being lost silently.
+
+# HRG Serial Monitor v1.11
+# Authors: Hui, Rongrong, Gemini
+# Description: A GUI tool with refined UI and memory management for the debug log.
+# v1.11 Changelog:
+# - The polling thread no longer schedules a Tk callback per sample. Values and log lines go to
+#   hrg_core.tk_refresh.RefreshScheduler, which redraws at UI_REFRESH_HZ: labels show only the
+#   latest reading and the accumulated log text is inserted with one insert per frame.
+# - The port box is editable: a port that comports() does not list (e.g. the hrg_core.simulator
+#   pty /dev/pts/N or its --link path) can be typed in and is opened by name.
+
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog # ### 修改点 1: 导入filedialog ###
@@ -25,28 +56,37 @@ from tkinter import ttk, scrolledtext
 import serial
 import serial.tools.list_ports
 import threading
-import time
-import struct
 from datetime import datetime
 import os
-import csv # 导入CSV模块
+import sys
+
+# 共享模块 hrg_core 位于仓库根目录，先把根目录加入模块搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hrg_core.af_poller import AFPoller, link_limit_hz, MAX_IN_FLIGHT
+from hrg_core.csv_sink import CsvSink
+from hrg_core.tk_refresh import RefreshScheduler, append_text
 
 class HRG_SerialMonitor:
     # --- 修改点 1: 定义常量 ---
     UI_MAX_LINES = 800  # UI中日志的最大行数
-    UI_TRIM_LINES = 600 # 达到最大行数后，归档并删除的行数
+    UI_TRIM_LINES = 600 # 达到最大行数后，从界面删除的最旧行数（CSV 另由 CsvSink 完整记录）
     LOG_SUBFOLDER = "log" # 日志存放的子文件夹名
+    CSV_HEADER = ['Timestamp', 'Pressure (KPa)', 'Temperature (C)']
+    CSV_MAX_BYTES = 20 * 1024 * 1024 # 单个 CSV 分段上限，超过后滚动到下一个文件
+    POLL_RATES = ['1', '10', '50', '100', '500', '1000', '最大'] # 轮询频率 (Hz)，"最大" 为链路上限
+    POLL_STATS_MS = 1000 # 状态栏轮询统计的刷新间隔
+    POLL_JOIN_TIMEOUT_S = 1.0 # 停止采集时等待轮询线程退出的最长时间
+    UI_REFRESH_HZ = 25 # 数值和日志的界面刷新帧率，与轮询频率无关
 
     def __init__(self, root):
         self.root = root
         self.root.title("H.R.G. 实时采集系统（硅所调试用） v1.6")
-        self.root.geometry("550x550")
+        self.root.geometry("550x620")
 
         self.port_map = {}
-        self.log_counter = 0
 
-        # --- 新增: 为写入CSV文件准备的数据缓冲区 ---
-        self.csv_buffer = []
+        # --- v1.10: 本次采集会话的 CSV 记录（后台线程写文件） ---
+        self.csv_sink = None
 
         self.setup_logging_folder() # 确保log文件夹存在
 
@@ -58,7 +98,8 @@ class HRG_SerialMonitor:
 
         ttk.Label(control_frame, text="串口:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
         self.port_var = tk.StringVar()
-        self.port_combobox = ttk.Combobox(control_frame, textvariable=self.port_var, state="readonly")
+        # 可编辑: 列表里没有的端口（如虚拟串口 /dev/pts/5）可以直接输入端口名
+        self.port_combobox = ttk.Combobox(control_frame, textvariable=self.port_var, state="normal")
         self.port_combobox.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         
         ttk.Label(control_frame, text="波特率:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
@@ -69,6 +110,22 @@ class HRG_SerialMonitor:
         self.refresh_button = ttk.Button(control_frame, text="刷新串口", command=self.update_serial_ports)
         self.refresh_button.grid(row=0, column=2, padx=5, pady=5)
 
+        # --- v1.9: 轮询频率和在途请求数，采集中修改立即生效 ---
+        ttk.Label(control_frame, text="轮询频率 (Hz):").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.rate_var = tk.StringVar(value=self.POLL_RATES[0])
+        self.rate_combobox = ttk.Combobox(control_frame, textvariable=self.rate_var, values=self.POLL_RATES)
+        self.rate_combobox.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        self.rate_combobox.bind("<<ComboboxSelected>>", self.apply_poll_settings)
+        self.rate_combobox.bind("<Return>", self.apply_poll_settings)
+        ttk.Label(control_frame, text="在途请求:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.in_flight_var = tk.StringVar(value='1')
+        self.in_flight_spinbox = ttk.Spinbox(control_frame, from_=1, to=MAX_IN_FLIGHT, width=5,
+                                             textvariable=self.in_flight_var, command=self.apply_poll_settings)
+        self.in_flight_spinbox.grid(row=3, column=1, padx=5, pady=5, sticky="w")
+        self.compress_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="压缩已写满的 CSV 分段 (.gz)",
+                        variable=self.compress_var).grid(row=4, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
         action_frame = ttk.Frame(root)
         action_frame.pack(padx=10, pady=5, fill="x")
         self.toggle_button = ttk.Button(action_frame, text="开始采集", command=self.toggle_monitoring)
@@ -101,10 +158,15 @@ class HRG_SerialMonitor:
         self.debug_text.pack(fill="both", expand=True, padx=5, pady=5)
 
         self.serial_port = None
+        self.poller = None
+        self.poll_status_job = None
         self.is_monitoring = False
         self.monitoring_thread = None
 
         self.update_serial_ports()
+
+        # --- v1.11: 固定帧率刷新数值和日志 ---
+        self.refresher = RefreshScheduler(root, self.render_updates, self.UI_REFRESH_HZ).start()
     
     # --- 修改点 1: 绑定窗口关闭事件到我们的自定义函数 ---
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -115,14 +177,13 @@ class HRG_SerialMonitor:
         # 1. 停止监控线程，这会安全地关闭串口
         if self.is_monitoring:
             self.is_monitoring = False
-            # 给予线程一点时间来完成当前循环，避免竞争条件
-            # 对于这个应用，线程的time.sleep(1)和串口timeout足够，一般不需要额外等待
+            self.stop_polling() # 等轮询线程退出，最后几个应答也能写进 CSV
         
-        # 2. 检查缓冲区是否有未保存的数据，并执行最终保存
-        if self.csv_buffer:
+        # 2. 写完队列中剩余的 CSV 行并关闭文件
+        if self.csv_sink:
             self.status_var.set("状态: 正在保存剩余日志...")
             self.root.update_idletasks() # 强制UI更新状态信息
-            self.archive_log_data(is_final_save=True)
+            self.close_csv_log()
         
         # 3. 销毁主窗口，正式退出程序
         self.root.destroy()
@@ -164,17 +225,19 @@ class HRG_SerialMonitor:
     def toggle_monitoring(self):
         # ... 此函数无变化 ...
         if not self.is_monitoring:
-            selected_display_name = self.port_var.get()
+            selected_display_name = self.port_var.get().strip()
             if not selected_display_name:
                 self.status_var.set("状态: 错误, 未选择串口!")
                 return
-            port_device = self.port_map[selected_display_name]
+            port_device = self.port_map.get(selected_display_name, selected_display_name) # 手动输入的端口名原样使用
             baud = int(self.baud_var.get())
             try:
-                self.serial_port = serial.Serial(port_device, baud, timeout=0.5)
+                rate, in_flight = self.read_poll_settings(baud)
+                self.serial_port = serial.Serial(port_device, baud, timeout=0.05)
+                self.poller = AFPoller(self.serial_port, rate, in_flight, on_response=self.parse_and_update_data)
+                self.csv_sink = CsvSink(self.LOG_SUBFOLDER, self.CSV_HEADER, max_bytes=self.CSV_MAX_BYTES,
+                                        compress=self.compress_var.get()).start() # 每次采集一个会话文件
                 self.is_monitoring = True
-                self.log_counter = 0
-                self.csv_buffer.clear() # 开始采集时清空缓冲区
                 self.debug_text.config(state='normal')
                 self.debug_text.delete('1.0', tk.END)
                 self.debug_text.config(state='disabled')
@@ -185,51 +248,106 @@ class HRG_SerialMonitor:
                 self.port_combobox.config(state="disabled")
                 self.baud_combobox.config(state="disabled")
                 self.refresh_button.config(state="disabled")
+                if self.poll_status_job:
+                    self.root.after_cancel(self.poll_status_job)
+                self.poll_status_job = self.root.after(self.POLL_STATS_MS, self.update_poll_status)
+            except (ValueError, OSError) as e:
+                self.status_var.set(f"状态: 错误, {e}")
+                if self.serial_port:
+                    self.serial_port.close()
+                    self.serial_port = None
             except serial.SerialException:
                 self.status_var.set(f"状态: 错误, 无法打开 {selected_display_name}")
                 self.serial_port = None
         else:
             self.is_monitoring = False
+            self.stop_polling()
             self.toggle_button.config(text="开始采集")
             self.status_var.set("状态: 已断开")
+            self.refresher.flush() # 先画完已收到的数据，再复位显示
             self.pressure_var.set("--")
             self.temperature_var.set("--")
-            self.port_combobox.config(state="readonly")
+            self.port_combobox.config(state="normal")
             self.baud_combobox.config(state="normal")
             self.refresh_button.config(state="normal")
             
-            # 停止采集时，将缓冲区剩余的数据也保存一次
-            if self.csv_buffer:
-                self.archive_log_data(is_final_save=True)
+            # 停止采集时，写完剩余的行并关闭本次会话的 CSV 文件
+            self.close_csv_log()
+
+    def stop_polling(self):
+        """停止轮询并等待轮询线程退出（最多 POLL_JOIN_TIMEOUT_S），之后不会再有应答写入 CSV"""
+        if self.poller:
+            self.poller.stop()
+        thread, self.monitoring_thread = self.monitoring_thread, None
+        if thread and thread is not threading.current_thread():
+            thread.join(self.POLL_JOIN_TIMEOUT_S)
+
+    def close_csv_log(self):
+        """关闭本次会话的 CSV 记录，在状态栏报告写入的文件"""
+        sink, self.csv_sink = self.csv_sink, None
+        if sink is None:
+            return
+        sink.close()
+        if sink.error:
+            self.status_var.set(f"状态: 错误, 写入日志文件失败: {sink.error}")
+            return
+        files = ", ".join(os.path.basename(path) for path in sink.segments)
+        dropped = f", 丢弃 {sink.dropped} 行" if sink.dropped else ""
+        self.status_var.set(f"状态: 已断开, 已保存 {sink.rows_written} 行至 {files}{dropped}")
+
+    # --- v1.9: 轮询参数 ---
+    def read_poll_settings(self, baud):
+        """从界面读取 (轮询频率, 在途请求数)；"最大" 取链路上限，输入有误时抛出 ValueError"""
+        rate_text = self.rate_var.get().strip()
+        try:
+            rate = link_limit_hz(baud) if rate_text == self.POLL_RATES[-1] else float(rate_text)
+            in_flight = int(self.in_flight_var.get())
+        except ValueError:
+            raise ValueError(f"轮询参数无效: {rate_text} Hz, 在途 {self.in_flight_var.get()}") from None
+        return rate, in_flight
+
+    def apply_poll_settings(self, event=None):
+        """采集中修改频率或在途请求数时立即生效"""
+        if not (self.is_monitoring and self.poller):
+            return
+        try:
+            self.poller.set_rate(*self.read_poll_settings(self.serial_port.baudrate))
+        except ValueError as e:
+            self.status_var.set(f"状态: 错误, {e}")
+
+    def update_poll_status(self):
+        """每 POLL_STATS_MS 在状态栏显示一次轮询计数"""
+        self.poll_status_job = None
+        if not (self.is_monitoring and self.poller):
+            return
+        s = self.poller.stats()
+        self.status_var.set(
+            f"状态: 采集中 {s['responses_per_s']:.0f}/{s['rate_hz']:.0f} Hz | 发送 {s['requests_sent']} "
+            f"应答 {s['responses']} 超时 {s['timeouts']} 格式错误 {s['malformed']} | "
+            f"RTT {s['rtt_mean'] * 1000:.2f} ms (最大 {s['rtt_max'] * 1000:.1f})")
+        self.poll_status_job = self.root.after(self.POLL_STATS_MS, self.update_poll_status)
 
     def serial_communication_loop(self):
-        # ... 此函数无变化 ...
-        command_to_send = bytes.fromhex('AF 01 FA')
-        while self.is_monitoring:
-            try:
-                self.serial_port.write(command_to_send)
-                response = self.serial_port.read(6)
-                if len(response) == 6 and response.startswith(b'\xaf') and response.endswith(b'\xfa'):
-                    self.parse_and_update_data(response)
-                time.sleep(1)
-            except serial.SerialException:
-                def safe_stop():
-                    self.status_var.set("状态: 串口通信错误, 已断开")
-                    if self.is_monitoring:
-                        self.toggle_monitoring()
-                self.root.after(0, safe_stop)
-                break
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
-
-    def parse_and_update_data(self, data):
+        # v1.9: 发送、收帧和超时都交给 AFPoller，应答通过 parse_and_update_data 回调
+        # 只关闭本线程自己的串口: 停止后立刻重新开始时，self.serial_port 已经是新打开的串口
+        poller = self.poller
+        try:
+            poller.run()
+        except serial.SerialException:
+            def safe_stop():
+                self.status_var.set("状态: 串口通信错误, 已断开")
+                if self.is_monitoring and self.poller is poller:
+                    self.toggle_monitoring()
+            self.root.after(0, safe_stop)
+        if poller.serial_port.is_open:
+            poller.serial_port.close()
+
+    def parse_and_update_data(self, timestamp, values, rtt):
         try:
-            pressure_raw = struct.unpack('>H', data[1:3])[0]
-            pressure_kpa = pressure_raw
-            temperature_raw = struct.unpack('>h', data[3:5])[0]
-            temperature_c = temperature_raw / 10.0
+            # 应答格式 AF 压力(u16) 温度(s16, 0.1℃) FA，AFPoller 已按 hrg_core.protocol.AF_RESPONSE 解码
+            pressure_kpa, temperature_c = values
             
-            timestamp_dt = datetime.now() # 获取datetime对象，方便后续格式化
+            timestamp_dt = datetime.fromtimestamp(timestamp) # 收到应答的时刻
             
             # --- 修改点 3: 准备UI和CSV两种格式的数据 ---
             timestamp_str_ui = timestamp_dt.strftime('%Y-%m-%d %H:%M:%S')
@@ -238,81 +356,30 @@ class HRG_SerialMonitor:
             timestamp_str_csv = timestamp_dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
             csv_row = [timestamp_str_csv, f"{pressure_kpa:.2f}", f"{temperature_c:.1f}"]
 
-            self.root.after(0, self.update_gui_and_log, log_message_ui, csv_row, pressure_kpa, temperature_c)
+            # CSV 直接在轮询线程里交给写文件线程，界面只负责显示
+            sink = self.csv_sink
+            if sink:
+                sink.write(csv_row)
+            # 界面只记下最新值和日志行，由 render_updates 按固定帧率统一刷新
+            self.refresher.post(pressure=pressure_kpa, temperature=temperature_c)
+            self.refresher.append(log_message_ui)
         except Exception as e:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             error_message = f"[{timestamp}] 数据解析错误: {e}\n"
-            self.root.after(0, self.append_to_debug_text, error_message) # 只更新UI
+            self.refresher.append(error_message) # 只更新UI
 
-    def update_gui_and_log(self, ui_msg, csv_data_row, pressure, temperature):
-        # 更新上方的实时数据标签
-        self.pressure_var.set(f"{pressure:.2f}")
-        self.temperature_var.set(f"{temperature:.1f}")
-        
-        # 将格式化好的日志消息追加到日志窗口
-        self.append_to_debug_text(ui_msg)
+    def render_updates(self, latest, log_text):
+        """每帧一次（Tk 主线程）: 数值标签只显示最新一次读数，本帧积累的日志一次插入"""
+        if 'pressure' in latest:
+            self.pressure_var.set(f"{latest['pressure']:.2f}")
+        if 'temperature' in latest:
+            self.temperature_var.set(f"{latest['temperature']:.1f}")
+        self.append_to_debug_text(log_text)
 
-        # --- 修改点 4: 将CSV数据行存入缓冲区 ---
-        self.csv_buffer.append(csv_data_row)
-        
     def append_to_debug_text(self, message):
-        self.debug_text.config(state='normal')
-        self.debug_text.insert(tk.END, message)
-        self.log_counter += 1
-        self.debug_text.see(tk.END)
-        self.debug_text.config(state='disabled')
-        
-        # --- 修改点 5: 检查是否需要归档 ---
-        if self.log_counter >= self.UI_MAX_LINES:
-            self.archive_log_data()
-
-    # --- 修改点 6: 全新的归档核心函数 ---
-    def archive_log_data(self, is_final_save=False):
-        """将缓冲区的数据写入CSV文件，并清理UI文本和缓冲区"""
-        
-        if is_final_save:
-            # 如果是最后一次保存，则保存缓冲区所有内容
-            lines_to_archive_count = len(self.csv_buffer)
-        else:
-            # 否则，按预设值保存
-            lines_to_archive_count = self.UI_TRIM_LINES
-            
-        if lines_to_archive_count == 0:
-            return
-
-        # 1. 从缓冲区切片出要归档的数据
-        data_to_write = self.csv_buffer[:lines_to_archive_count]
-        
-        # 2. 生成文件名并写入CSV
-        try:
-            # 文件名包含日期和时间，确保唯一性
-            filename = f"log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            filepath = os.path.join(self.LOG_SUBFOLDER, filename)
-
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                # 写入CSV表头
-                writer.writerow(['Timestamp', 'Pressure (KPa)', 'Temperature (C)'])
-                # 写入数据行
-                writer.writerows(data_to_write)
-            
-            # 在状态栏提示用户已保存
-            self.status_var.set(f"状态: 已归档 {lines_to_archive_count} 行至 {filename}")
-
-        except Exception as e:
-            self.status_var.set(f"状态: 错误, 写入日志文件失败: {e}")
-            return # 如果写入失败，则不进行后续的清理操作，避免数据丢失
-
-        # 3. 更新缓冲区（删除已写入的部分）
-        self.csv_buffer = self.csv_buffer[lines_to_archive_count:]
-
-        # 4. 如果不是最后一次保存，才清理UI
-        if not is_final_save:
-            self.debug_text.config(state='normal')
-            # 删除UI中最旧的行
-            self.debug_text.delete('1.0', f'{self.UI_TRIM_LINES + 1}.0')
-            self.debug_text.config(state='disabled')
-            self.log_counter -= self.UI_TRIM_LINES
+        # --- v1.10: 只裁剪界面，数据已由 CsvSink 完整写入 CSV ---
+        # 超过 UI_MAX_LINES 行时删除最旧的行，保留最近 UI_MAX_LINES - UI_TRIM_LINES 行
+        append_text(self.debug_text, message, self.UI_MAX_LINES, self.UI_MAX_LINES - self.UI_TRIM_LINES)
 
 
 if __name__ == "__main__":
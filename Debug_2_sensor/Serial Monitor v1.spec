@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['Serial Monitor v1.py'],
-    pathex=[],
+    pathex=['..'],
     binaries=[],
     datas=[],
     hiddenimports=[],
@@ -13,157 +13,166 @@
 # - 在协议解析中，增加了对CH3新格式包的完整解析。
 # - data_updated 信号传递的字典中，现在新增了 ch3_pressure 和 ch3_temperature。
 
-import serial
-import serial.tools.list_ports
-import time
-from PyQt5.QtCore import QThread, pyqtSignal
-import struct # 引入struct库来处理有符号数
+# 文件名: data_processor.py (Rev 2.6 - 共享协议核心)
+# Hui & Rongrong & Gemini 合作开发版本
+#
+# Rev 2.6 修改:
+# - 帧格式改由 hrg_core.protocol.HYBRID 统一声明，解析走预编译的 struct 解码器，
+#   不再手写移位、每次调用 struct.unpack 和 CH6-8 的循环。
+
+# 文件名: data_processor.py (Rev 2.7 - 查表换算)
+# Hui & Rongrong & Gemini 合作开发版本
+#
+# Rev 2.7 修改:
+# - CH1/CH2 的电压和 O1 压力/O2 温度改为按 ADC 码查预先算好的 4096 项表，
+#   不再逐帧做电压换算和两次 linear_map。
+# - 新增 set_calibration()，修改参考电压或标定区间后换算表自动重建。
+
+# 文件名: data_processor.py (Rev 2.8 - 分级调试信息)
+# Hui & Rongrong & Gemini 合作开发版本
+#
+# Rev 2.8 修改:
+# - debug_message 改为传递 DiagRecord，按类别(帧转储/协议错误/状态/串口)和级别过滤，
+#   字符串在日志线程里才格式化；帧转储默认关闭，关闭时每帧不再拼十六进制字符串。
+
+# 文件名: data_processor.py (Rev 2.9 - 无界面采集引擎)
+# Hui & Rongrong & Gemini 合作开发版本
+#
+# Rev 2.9 修改:
+# - 帧同步、解码、查表换算移到 hrg_core.decoders.HybridDecoder，
+#   串口读取、攒块和录制移到 hrg_core.acquisition.AcquisitionEngine，都不依赖 Qt。
+# - 本文件的 DataProcessor 只是薄薄的一层 QThread 适配，同一套逻辑也可以用
+#   python -m hrg_core.acquisition hybrid <串口> 在没有显示器的机器上运行。
+# - 同步模式下改为一次批量解码缓冲区内所有完整帧。
+
+# 文件名: data_processor.py (Rev 3.0 - 独立进程采集)
+# Hui & Rongrong & Gemini 合作开发版本
+#
+# Rev 3.0 修改:
+# - 新增 use_process: 串口读取和解码放到独立进程 (hrg_core.acquisition_process)，
+#   样本经共享内存环形缓冲区交给界面进程，不再与界面线程争用 GIL。
+# - 运行中修改标定 (set_calibration) 和调试开关 (set_category_enabled) 会转给子进程。
 
-# ... (常量定义不变) ...
-NEW_FRAME_TOTAL_BYTES = 16
-V_REF = 3.0
-SOF = 0xAF
-EOF = 0xFA
+# 文件名: data_processor.py (Rev 3.1 - 数字滤波)
+# Hui & Rongrong & Gemini 合作开发版本
+#
+# Rev 3.1 修改:
+# - 新增 set_filter(): 解码之后、显示和录制之前做滑动平均/指数平滑/中值/FIR 滤波，
+#   按整块 (帧数 × 通道数) 向量化处理，滤波状态跨块保持。
+
+# 文件名: data_processor.py (Rev 3.2 - 流水线延迟测量)
+# Hui & Rongrong & Gemini 合作开发版本
+#
+# Rev 3.2 修改:
+# - 新增 probe (hrg_core.pipeline_stats.PipelineProbe): 读取、帧切分、解码、发出、界面收到、绘制
+#   各阶段的 perf_counter_ns 时间戳和延迟直方图，默认关闭；独立进程模式下从发出开始计。
+
+from functools import partial
+from PyQt5.QtCore import QThread, pyqtSignal
+from hrg_core.protocol import HYBRID, V_REF
+from hrg_core.decoders import HybridDecoder, O1_PRESSURE_MAP, O2_TEMPERATURE_MAP
+from hrg_core.acquisition import AcquisitionEngine
+from hrg_core.acquisition_process import AcquisitionProcess
+from hrg_core.diagnostics import Diagnostics
+from hrg_core.sample_block import block_values
+
+# 帧格式 (CH1, CH2, AF..FA 的 CH3, CH6-8) 见 hrg_core.protocol.HYBRID
+NEW_FRAME_TOTAL_BYTES = HYBRID.size
+# 块传输时的字段名，与 data_updated 字典的键一致
+DATA_FIELDS = HybridDecoder.fields
+DATA_UNITS = HybridDecoder.units
 
 class DataProcessor(QThread):
-    # 信号和 __init__ 等保持不变
     data_updated = pyqtSignal(dict)
-    debug_message = pyqtSignal(str)
+    debug_message = pyqtSignal(object)  # hrg_core.diagnostics.DiagRecord
+    # 块传输模式: 每次传递一个 numpy 结构化数组 (timestamp + DATA_FIELDS)
+    block_ready = pyqtSignal(object)
     
-    # ... (start/stop/linear_map 等函数不变) ...
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.serial_port = serial.Serial()
-        self.port_name = ""
-        self.running = False
-        self._state = "HUNTING"
-
-    def start_processing(self, port_name):
+        # 调试信息按类别/级别过滤，帧转储默认关闭
+        self.diagnostics = Diagnostics(self.debug_message.emit)
+        self.decoder = HybridDecoder(self.diagnostics, V_REF, O1_PRESSURE_MAP, O2_TEMPERATURE_MAP)
+        self.engine = AcquisitionEngine(self.decoder)
+        # 块传输: 每 engine.block_frames 帧或每 engine.block_interval_ms 毫秒发一次块
+        self.use_block_transport = True
+        # 独立进程采集: 下次 start_processing() 生效
+        self.use_process = False
+        self.process = AcquisitionProcess(None, DATA_FIELDS)
+        # 流水线延迟测量 (hrg_core.pipeline_stats)，由界面上的流水线面板开关
+        self.probe = self.engine.probe
+        self.probe.counter_source = self._pipeline_counters
+
+    def start_processing(self, port_name, read_profile=None, record_path=None):
         if self.isRunning(): return
-        self.port_name = port_name
-        self.running = True
-        self._state = "HUNTING"
+        if read_profile is not None: self.engine.read_profile = read_profile
+        if self.use_process:
+            # 子进程按当前标定和调试开关新建解码器
+            calibration = self.decoder.calibration()
+            self.process.decoder_factory = partial(HybridDecoder, v_ref=self.decoder.v_ref,
+                                                   o1_pressure_map=calibration['o1_pressure_map'],
+                                                   o2_temperature_map=calibration['o2_temperature_map'])
+            self.process.start(port_name, self.engine.baudrate, self.engine.read_profile, record_path,
+                               self.diagnostics.level, self.diagnostics.switches, self.engine.filter.spec)
+        else:
+            self.engine.port_name = port_name
+            self.engine.record_path = record_path
+            self.engine.running = True
         self.start()
 
     def stop_processing(self):
-        self.running = False
+        self.engine.stop()
+        self.process.stop()
         self.wait()
+        self.process.close()
+
+    def set_calibration(self, v_ref=None, o1_pressure_map=None, o2_temperature_map=None):
+        """修改参考电压或标定区间，换算表随之重建；运行中调用下一帧即生效"""
+        self.decoder.set_calibration(v_ref, o1_pressure_map, o2_temperature_map)
+        self.process.call('decoder', 'set_calibration', v_ref, o1_pressure_map, o2_temperature_map)
+
+    def set_filter(self, spec):
+        """设置解码后的滤波 (见 hrg_core.filters)，显示和录制都用滤波后的数据"""
+        self.engine.set_filter(spec)
+        self.process.call('engine', 'set_filter', spec)
+
+    def set_category_enabled(self, category, on):
+        """打开/关闭一类调试信息，独立进程模式下同时转给子进程"""
+        self.diagnostics.set_enabled(category, on)
+        self.process.call('diagnostics', 'set_enabled', category, on)
 
-    def linear_map(self, value, from_min, from_max, to_min, to_max):
-        if (from_max - from_min) == 0: return to_min
-        normalized_value = (value - from_min) / (from_max - from_min)
-        return to_min + normalized_value * (to_max - to_min)
-        
     def process_final_frame(self, frame_buffer):
         """处理帧，并完整解析所有通道数据"""
-        if len(frame_buffer) != NEW_FRAME_TOTAL_BYTES:
+        values = self.decoder.decode_one(frame_buffer)
+        if values is None:
             return False, None
+        return True, dict(zip(DATA_FIELDS, values))
+
+    def _emit_rows(self, rows):
+        for row in rows.tolist():
+            self.data_updated.emit(dict(zip(DATA_FIELDS, row)))
+
+    def _pipeline_counters(self):
+        """累计 (字节数, 帧数): 独立进程模式下取共享内存里的计数器"""
+        ring = self.process.ring
+        if ring is not None:
+            counters = ring.counters()
+            return counters['bytes'], counters['frames']
+        return self.engine.bytes_read, self.decoder.frames_decoded
+
+    def _forward_block(self, block):
+        """独立进程模式: block 是从共享内存拷贝出来的数据块"""
+        if self.use_block_transport:
+            if self.probe.enabled:
+                self.probe.emitted(block)  # 子进程里的阶段测不到，从这里开始计
+            self.block_ready.emit(block)
+        else:
+            self._emit_rows(block_values(block))
 
-        try:
-            # --- 1. 解析 O2(CH1) 和 O1(CH2) (不变) ---
-            v_o2_ch1 = 0.0
-            v_o1_ch2 = 0.0
-            
-            p1 = (frame_buffer[0] << 8) | frame_buffer[1]
-            if (p1 >> 12) != 1: raise ValueError("CH1 校验失败")
-            v_o2_ch1 = ((p1 & 0x0FFF) / 4095.0) * V_REF
-
-            p2 = (frame_buffer[2] << 8) | frame_buffer[3]
-            if (p2 >> 12) != 2: raise ValueError("CH2 校验失败")
-            v_o1_ch2 = ((p2 & 0x0FFF) / 4095.0) * V_REF
-
-            pressure_o1 = self.linear_map(v_o1_ch2, 1.5, 3.0, 100, 1000)
-            temperature_o2 = self.linear_map(v_o2_ch1, 1.5, 3.0, -30, 200)
-
-            # --- 2. [核心修改] 解析 CH3 (新格式) ---
-            ch3_packet = frame_buffer[4:10]
-            if ch3_packet[0] != SOF or ch3_packet[5] != EOF:
-                raise ValueError("CH3 数据包帧头/帧尾错误")
-            
-            # 解析压力 (无符号16位整数)
-            pressure_ch3_raw = (ch3_packet[1] << 8) | ch3_packet[2]
-            pressure_ch3 = float(pressure_ch3_raw) # 单位 KPa
-            
-            # 解析温度 (有符号16位整数)
-            temp_ch3_raw = (ch3_packet[3] << 8) | ch3_packet[4]
-            # 使用struct库来处理有符号数(补码)，'>h'表示大端序的有符号短整型(16-bit)
-            signed_temp_scaled = struct.unpack('>h', ch3_packet[3:5])[0]
-            temperature_ch3 = signed_temp_scaled / 10.0 # 单位 ℃
-
-            # --- 3. 校验 CH6,7,8 (不变) ---
-            for idx, ch_num in enumerate([6, 7, 8]):
-                offset = 10 + idx * 2
-                p = (frame_buffer[offset] << 8) | frame_buffer[offset+1]
-                if (p >> 12) != ch_num: raise ValueError(f"CH{ch_num} 校验失败")
-
-            # --- [核心修改] 打包更完整的字典 ---
-            final_data = {
-                'o1_voltage': v_o1_ch2,
-                'o1_pressure': pressure_o1,
-                'o2_voltage': v_o2_ch1,
-                'o2_temperature': temperature_o2,
-                'ch3_pressure': pressure_ch3,
-                'ch3_temperature': temperature_ch3
-            }
-            return True, final_data
-
-        except (IndexError, ValueError, struct.error) as e:
-            # [核心修改] 在错误信息中加入导致错误的原始数据帧
-            error_frame_hex = ' '.join(f'{b:02X}' for b in frame_buffer)
-            self.debug_message.emit(f"[协议错误] {e}")
-            self.debug_message.emit(f"--> 原始数据帧: {error_frame_hex}")
-            return False, None
-
-    # --- run() 循环完全不变 ---
     def run(self):
-        # (run函数无需任何修改)
-        # ...
-        try:
-            self.serial_port.port = self.port_name
-            self.serial_port.baudrate = 115200
-            self.serial_port.timeout = 0.1
-            if not self.serial_port.is_open:
-                self.serial_port.open()
-            self.debug_message.emit(f"串口 {self.port_name} 已打开，波特率 115200。")
-        except serial.SerialException as e:
-            self.debug_message.emit(f"[错误] 打开串口失败: {e}")
-            self.running = False
+        if self.process.ring is not None:  # 独立进程模式
+            self.process.forward(self._forward_block, self.debug_message.emit, self.engine.block_interval_ms / 1000)
             return
-
-        frame_buffer = bytearray()
-        while self.running:
-            if self.serial_port.in_waiting > 0:
-                data = self.serial_port.read(self.serial_port.in_waiting)
-                frame_buffer.extend(data)
-                while True:
-                    if self._state == "HUNTING":
-                        if len(frame_buffer) < 2: break
-                        if (frame_buffer[0] >> 4) == 1:
-                            if len(frame_buffer) >= NEW_FRAME_TOTAL_BYTES:
-                                success, result_data = self.process_final_frame(frame_buffer[:NEW_FRAME_TOTAL_BYTES])
-                                if success:
-                                    self._state = "SYNCED"
-                                    self.debug_message.emit("[状态] 帧同步成功，进入同步模式。")
-                                    self.data_updated.emit(result_data)
-                                    self.debug_message.emit(f"[接收成功] Frame: {' '.join(f'{b:02X}' for b in frame_buffer[:NEW_FRAME_TOTAL_BYTES])}")
-                                    frame_buffer = frame_buffer[NEW_FRAME_TOTAL_BYTES:]
-                                else: frame_buffer.pop(0)
-                            else: break
-                        else: frame_buffer.pop(0)
-                    elif self._state == "SYNCED":
-                        if len(frame_buffer) < NEW_FRAME_TOTAL_BYTES: break
-                        success, result_data = self.process_final_frame(frame_buffer[:NEW_FRAME_TOTAL_BYTES])
-                        if success:
-                            self.data_updated.emit(result_data)
-                            self.debug_message.emit(f"[接收成功] Frame: {' '.join(f'{b:02X}' for b in frame_buffer[:NEW_FRAME_TOTAL_BYTES])}")
-                            frame_buffer = frame_buffer[NEW_FRAME_TOTAL_BYTES:]
-                        else:
-                            self._state = "HUNTING"
-                            self.debug_message.emit("[状态] 同步丢失！回到狩猎模式...")
-                            frame_buffer.pop(0)
-            else:
-                time.sleep(0.01)
-
-        if self.serial_port.is_open:
-            self.serial_port.close()
-            self.debug_message.emit(f"串口 {self.port_name} 已关闭。")
\ No newline at end of file
+        self.engine.on_block = self.block_ready.emit if self.use_block_transport else None
+        self.engine.on_rows = None if self.use_block_transport else self._emit_rows
+        self.engine.run()
@@ -1,8 +1,14 @@
 # 文件名: main.py
 import sys
+import os
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 
+# 共享模块 hrg_core 位于仓库根目录，先把根目录加入模块搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后独立进程采集需要
     from PyQt5.QtCore import Qt
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)  # 必须在创建 QApplication 之前
 
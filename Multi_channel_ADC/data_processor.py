@@ -1,152 +1,131 @@
 # 文件名: data_processor.py
+#
+# 采集、帧同步、解码和录制都在 hrg_core.acquisition / hrg_core.decoders 中（不依赖 Qt），
+# 这里的 QThread 只负责在工作线程里运行采集引擎，并把结果转成信号。
+# use_process 为 True 时采集引擎改在独立进程里运行 (hrg_core.acquisition_process)，
+# 这里的线程只从共享内存取新数据、转发调试信息，界面再忙也不影响串口排空。
 
-import serial
-import serial.tools.list_ports
-import time
+from functools import partial
 from PyQt5.QtCore import QThread, pyqtSignal
-
-# 定义协议常量
-NUM_CHANNELS = 8
-BYTES_PER_FRAME = NUM_CHANNELS * 2 # 8个通道，每个通道2字节
-V_REF = 3.0  # 参考电压
+from hrg_core.protocol import V_REF
+from hrg_core.decoders import Multi8Decoder
+from hrg_core.acquisition import AcquisitionEngine
+from hrg_core.acquisition_process import AcquisitionProcess
+from hrg_core.diagnostics import Diagnostics
+from hrg_core.sample_block import block_values
+
+# 协议常量: 帧格式在 hrg_core.protocol 中统一声明
+NUM_CHANNELS = len(Multi8Decoder.fields)
+BYTES_PER_FRAME = Multi8Decoder.layout.size # 8个通道，每个通道2字节
+CHANNEL_FIELDS = Multi8Decoder.fields # 块传输时各通道的字段名 ch1..ch8
 
 class DataProcessor(QThread):
     # 定义信号：一个用于传递8个电压值的列表，另一个用于传递调试信息
     data_updated = pyqtSignal(list)
-    debug_message = pyqtSignal(str)
+    # 调试信息: hrg_core.diagnostics.DiagRecord，str() 时才格式化
+    debug_message = pyqtSignal(object)
+    # 块传输模式: 每次传递一个 numpy 结构化数组 (timestamp, ch1..ch8)
+    block_ready = pyqtSignal(object)
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.serial_port = serial.Serial()
-        self.port_name = ""
-        self.running = False
-        self._state = "HUNTING" # 初始状态为“狩猎”模式
-
-    def start_processing(self, port_name):
-        """启动数据处理线程"""
+        # 调试信息按类别/级别过滤，帧转储默认关闭
+        self.diagnostics = Diagnostics(self.debug_message.emit)
+        self.decoder = Multi8Decoder(self.diagnostics, v_ref=V_REF)
+        self.engine = AcquisitionEngine(self.decoder)
+        # 块传输: 每 engine.block_frames 帧或每 engine.block_interval_ms 毫秒发一次块
+        self.use_block_transport = True
+        # 独立进程采集: 下次 start_processing() 生效
+        self.use_process = False
+        self.process = AcquisitionProcess(None, CHANNEL_FIELDS)
+        # 流水线延迟测量 (hrg_core.pipeline_stats)，由界面上的流水线面板开关
+        self.probe = self.engine.probe
+        self.probe.counter_source = self._pipeline_counters
+
+    @property
+    def voltage_table(self):
+        return self.decoder.voltage_table
+
+    def start_processing(self, port_name, read_profile=None, record_path=None):
+        """
+        启动数据处理线程。
+        read_profile 可选，见 hrg_core.serial_reader.READ_PROFILES；
+        record_path 可选，给出时把解码结果录制为二进制会话文件。
+        """
         if self.isRunning():
             return
-        self.port_name = port_name
-        self.running = True
-        self._state = "HUNTING" # 每次启动都从狩猎模式开始
+        if read_profile is not None:
+            self.engine.read_profile = read_profile
+        if self.use_process:
+            # 子进程按当前参考电压和调试开关新建解码器
+            self.process.decoder_factory = partial(Multi8Decoder, v_ref=self.decoder.v_ref)
+            self.process.start(port_name, self.engine.baudrate, self.engine.read_profile, record_path,
+                               self.diagnostics.level, self.diagnostics.switches, self.engine.filter.spec)
+        else:
+            self.engine.port_name = port_name
+            self.engine.record_path = record_path
+            self.engine.running = True
         self.start() # QThread的启动方法
 
     def stop_processing(self):
         """停止数据处理线程"""
-        self.running = False
+        self.engine.stop()
+        self.process.stop()
         self.wait() # 等待线程安全退出
+        self.process.close()
 
-    def process_frame(self, frame_buffer):
-        """处理一个16字节的数据帧"""
-        voltages = [0.0] * NUM_CHANNELS
-        valid_frame = True
-        
-        for i in range(NUM_CHANNELS):
-            # 从帧中提取高低字节
-            high_byte = frame_buffer[i * 2]
-            low_byte = frame_buffer[i * 2 + 1]
-
-            # 组合成16位数据
-            packed_data = (high_byte << 8) | low_byte
+    def set_v_ref(self, v_ref):
+        """修改参考电压，换算表随之重建；运行中调用下一帧即生效"""
+        self.decoder.v_ref = v_ref
+        self.process.call('decoder', 'set_calibration', v_ref)
 
-            # 解包出通道号和ADC值
-            channel = packed_data >> 12
-            adc_value = packed_data & 0x0FFF
+    def set_filter(self, spec):
+        """设置解码后的滤波 (见 hrg_core.filters)，显示和录制都用滤波后的数据"""
+        self.engine.set_filter(spec)
+        self.process.call('engine', 'set_filter', spec)
 
-            # --- 协议校验 ---
-            expected_channel = i + 1
-            if channel != expected_channel:
-                self.debug_message.emit(
-                    f"[协议错误] 在帧内位置 {i} 期望通道 {expected_channel}, 但得到 {channel}. "
-                    f"原始字节: {high_byte:02X} {low_byte:02X}"
-                )
-                valid_frame = False
-                break # 当前帧无效，跳出循环
-            
-            # 计算电压
-            voltage = (adc_value / 4095.0) * V_REF
-            voltages[i] = voltage
-        
-        if valid_frame:
-            # 如果整帧都有效，则发出更新信号
-            self.data_updated.emit(voltages)
-            # 在debug窗口显示成功接收的原始数据
-            self.debug_message.emit(f"[接收成功] Frame: {' '.join(f'{b:02X}' for b in frame_buffer)}")
+    def set_category_enabled(self, category, on):
+        """打开/关闭一类调试信息，独立进程模式下同时转给子进程"""
+        self.diagnostics.set_enabled(category, on)
+        self.process.call('diagnostics', 'set_enabled', category, on)
 
-        return valid_frame
+    def process_frame(self, frame_buffer):
+        """处理一个16字节的数据帧"""
+        voltages = self.decoder.decode_one(frame_buffer)
+        if voltages is None:
+            return False
+        # 如果整帧都有效，则滤波后按传输模式发出
+        voltages = self.engine.publish_one(voltages)
+        if not self.use_block_transport:
+            self.data_updated.emit(list(voltages))
+        return True
+
+    def _emit_rows(self, rows):
+        for row in rows.tolist():
+            self.data_updated.emit(row)
+
+    def _pipeline_counters(self):
+        """累计 (字节数, 帧数): 独立进程模式下取共享内存里的计数器"""
+        ring = self.process.ring
+        if ring is not None:
+            counters = ring.counters()
+            return counters['bytes'], counters['frames']
+        return self.engine.bytes_read, self.decoder.frames_decoded
+
+    def _forward_block(self, block):
+        """独立进程模式: block 是从共享内存拷贝出来的数据块"""
+        if self.use_block_transport:
+            if self.probe.enabled:
+                self.probe.emitted(block)  # 子进程里的阶段测不到，从这里开始计
+            self.block_ready.emit(block)
+        else:
+            self._emit_rows(block_values(block))
 
     def run(self):
-        """线程的主循环"""
-        try:
-            self.serial_port.port = self.port_name
-            self.serial_port.baudrate = 115200
-            self.serial_port.timeout = 0.1 # 设置一个短的超时，避免永久阻塞
-            if not self.serial_port.is_open:
-                self.serial_port.open()
-            self.debug_message.emit(f"串口 {self.port_name} 已打开，波特率 115200。")
-        except serial.SerialException as e:
-            self.debug_message.emit(f"[错误] 打开串口失败: {e}")
-            self.running = False
+        """线程的主循环: 运行采集引擎，块模式发 block_ready，否则逐帧发 data_updated"""
+        if self.process.ring is not None:  # 独立进程模式
+            self.process.forward(self._forward_block, self.debug_message.emit, self.engine.block_interval_ms / 1000)
             return
-
-        frame_buffer = bytearray()
-
-        while self.running:
-            if self.serial_port.in_waiting > 0:
-                # 读取所有可用数据
-                bytes_to_read = self.serial_port.in_waiting
-                data = self.serial_port.read(bytes_to_read)
-                
-                # 将新数据添加到缓冲区
-                frame_buffer.extend(data)
-
-                # --- 状态机逻辑 ---
-                while len(frame_buffer) >= 2: # 至少要有2个字节才能开始判断
-                    if self._state == "HUNTING":
-                        # 狩猎模式: 寻找通道1的包头
-                        high_byte = frame_buffer[0]
-                        
-                        # 检查高字节的高4位是否是 0x1
-                        if (high_byte >> 4) == 1:
-                            if len(frame_buffer) >= BYTES_PER_FRAME:
-                                # 缓冲区足够长，可以尝试验证一整帧
-                                potential_frame = frame_buffer[:BYTES_PER_FRAME]
-                                if self.process_frame(potential_frame):
-                                    # 验证成功！进入同步模式
-                                    self._state = "SYNCED"
-                                    self.debug_message.emit("[状态] 帧同步成功，进入同步模式。")
-                                    # 移除已处理的数据
-                                    frame_buffer = frame_buffer[BYTES_PER_FRAME:]
-                                else:
-                                    # 验证失败，丢弃一个字节，继续狩猎
-                                    frame_buffer.pop(0)
-                            else:
-                                # 缓冲区不够一帧，等待更多数据
-                                break
-                        else:
-                            # 不是通道1的包头，丢弃一个字节
-                            frame_buffer.pop(0)
-
-                    elif self._state == "SYNCED":
-                        # 同步模式: 按块处理数据
-                        if len(frame_buffer) >= BYTES_PER_FRAME:
-                            current_frame = frame_buffer[:BYTES_PER_FRAME]
-                            if self.process_frame(current_frame):
-                                # 成功处理，移除已处理的数据
-                                frame_buffer = frame_buffer[BYTES_PER_FRAME:]
-                            else:
-                                # 同步丢失！回到狩猎模式
-                                self._state = "HUNTING"
-                                self.debug_message.emit("[状态] 同步丢失！回到狩猎模式...")
-                                # 这里我们选择丢弃整个被认为是错误的帧，也可以只丢弃一个字节
-                                frame_buffer = frame_buffer[BYTES_PER_FRAME:]
-                        else:
-                            # 缓冲区不够一帧，等待更多数据
-                            break
-            else:
-                # 稍微等待一下，避免CPU空转
-                time.sleep(0.01)
-
-        if self.serial_port.is_open:
-            self.serial_port.close()
-            self.debug_message.emit(f"串口 {self.port_name} 已关闭。")
\ No newline at end of file
+        self.engine.on_block = self.block_ready.emit if self.use_block_transport else None
+        self.engine.on_rows = None if self.use_block_transport else self._emit_rows
+        self.engine.run()
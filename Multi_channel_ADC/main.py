@@ -1,9 +1,15 @@
 # 文件名: main.py
 import sys
+import os
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
-from main_window import MainWindow
+
+# 共享模块 hrg_core 位于仓库根目录，先把根目录加入模块搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后独立进程采集需要
+    from main_window import MainWindow
     app = QApplication(sys.argv)
     
     # 启用高清屏适配
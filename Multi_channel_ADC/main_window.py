@@ -5,32 +5,50 @@ import sys
 import os
 import datetime 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QComboBox, QPushButton, QGridLayout, QLabel, QLineEdit, QTextEdit)
-from PyQt5.QtCore import pyqtSlot, Qt
-from PyQt5.QtGui import QFont, QTextCursor
+                             QComboBox, QPushButton, QCheckBox, QGridLayout, QLabel, QLineEdit, QTabWidget)
+from PyQt5.QtCore import pyqtSlot, Qt, QTimer
+from PyQt5.QtGui import QFont
 import serial.tools.list_ports
-from data_processor import DataProcessor
-
-MAX_LOG_LINES = 50
-TRIM_LOG_LINES = 10
+from hrg_core.recording import SESSION_EXTENSION
+from hrg_core.log_sink import LogSink
+from hrg_core.ring_console import RingConsole
+from hrg_core.strip_chart import StripChart
+from hrg_core.stats_panel import StatsPanel
+from hrg_core.pipeline_panel import PipelinePanel
+from hrg_core.sample_block import block_values
+from hrg_core.diagnostics import FRAMES
+from hrg_core.filters import FILTER_PRESETS
+from data_processor import DataProcessor, CHANNEL_FIELDS
+
+MAX_LOG_LINES = 10000  # 调试窗口环形缓冲区的行数，完整内容在日志文件里
+LOG_REFRESH_MS = 100   # 调试窗口刷新间隔
 LOG_DIR = "log"
+LOG_NAME = "multi_adc_debug"  # 滚动日志文件 log/multi_adc_debug.log
+CHART_HISTORY = 1 << 20       # 曲线每通道保留的点数
 
 class MainWindow(QMainWindow):
     # ... (__init__ 和其他大部分函数保持不变) ...
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Hui & Rongrong & Gemini 的ADC监控上位机")
-        self.setGeometry(100, 100, 600, 500)
+        self.setGeometry(100, 100, 1200, 950)
         if not os.path.exists(LOG_DIR):
             os.makedirs(LOG_DIR)
+        # 所有调试信息先进日志线程写文件，调试窗口只定时显示最近写入的几行
+        self.log_sink = LogSink(LOG_DIR, LOG_NAME).start()
+        self._log_seq = 0
         self.processor = DataProcessor()
         self.processor.data_updated.connect(self.update_voltage_displays)
-        self.processor.debug_message.connect(self.log_message)
+        self.processor.data_updated.connect(lambda voltages: self.update_history([voltages]))
+        self.processor.block_ready.connect(self.update_displays)
+        # 工作线程直接把消息放进日志队列，不经过界面线程的事件循环
+        self.processor.debug_message.connect(self.log_sink.write, Qt.DirectConnection)
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.main_layout = QVBoxLayout(self.central_widget)
         self.setup_serial_controls()
         self.setup_voltage_grid()
+        self.setup_chart()
         self.setup_debug_console()
         self.refresh_ports()
         self.print_startup_message()
@@ -46,15 +64,40 @@ class MainWindow(QMainWindow):
         layout = QHBoxLayout()
         self.port_combobox = QComboBox()
         self.port_combobox.setMinimumWidth(300)
+        # 可编辑: 列表里没有的端口（如虚拟串口 /dev/pts/5）可以直接输入端口名
+        self.port_combobox.setEditable(True)
+        self.port_combobox.setInsertPolicy(QComboBox.NoInsert)
+        self.port_combobox.lineEdit().setPlaceholderText("未找到串口设备，可直接输入端口名")
         self.refresh_button = QPushButton("刷新")
         self.refresh_button.clicked.connect(self.refresh_ports)
         self.connect_button = QPushButton("连接")
         self.connect_button.setCheckable(True)
         self.connect_button.clicked.connect(self.toggle_connection)
+        self.record_checkbox = QCheckBox("录制")
+        self.record_checkbox.setToolTip(f"连接后把解码数据录制为 {LOG_DIR}/session_*{SESSION_EXTENSION} 二进制文件")
         layout.addWidget(QLabel("串口:"))
         layout.addWidget(self.port_combobox)
         layout.addWidget(self.refresh_button)
         layout.addWidget(self.connect_button)
+        layout.addWidget(self.record_checkbox)
+        # 逐帧原始数据转储量很大，默认关闭；关闭时采集线程不做任何格式化
+        self.frame_dump_checkbox = QCheckBox("帧转储")
+        self.frame_dump_checkbox.setToolTip("在调试信息中显示每一帧的原始数据")
+        self.frame_dump_checkbox.setChecked(self.processor.diagnostics.is_category_on(FRAMES))
+        self.frame_dump_checkbox.toggled.connect(lambda on: self.processor.set_category_enabled(FRAMES, on))
+        layout.addWidget(self.frame_dump_checkbox)
+        # 串口读取和解码放到独立进程，界面卡顿时也不会丢数据
+        self.process_checkbox = QCheckBox("独立进程")
+        self.process_checkbox.setToolTip("在单独的进程里采集和解码，数据经共享内存交给界面")
+        layout.addWidget(self.process_checkbox)
+        # 解码后的滤波，显示、曲线、统计和录制都用滤波后的数据；运行中也可以切换
+        self.filter_combobox = QComboBox()
+        for label, spec in FILTER_PRESETS:
+            self.filter_combobox.addItem(label, spec)
+        self.filter_combobox.currentIndexChanged.connect(
+            lambda index: self.processor.set_filter(self.filter_combobox.itemData(index)))
+        layout.addWidget(QLabel("滤波:"))
+        layout.addWidget(self.filter_combobox)
         layout.addStretch()
         self.main_layout.addLayout(layout)
 
@@ -72,24 +115,40 @@ class MainWindow(QMainWindow):
             grid_layout.addWidget(channel_label, row, col)
             grid_layout.addWidget(voltage_display, row, col + 1)
             self.voltage_displays.append(voltage_display)
-        self.main_layout.addLayout(grid_layout)
+        # 右侧是各通道的均值/噪声/漂移统计，另一页是采集流水线各阶段的延迟
+        self.stats_panel = StatsPanel(CHANNEL_FIELDS, ['V'] * len(CHANNEL_FIELDS))
+        self.processor.probe.add_gauge('log_queue', lambda: self.log_sink.pending)
+        self.pipeline_panel = PipelinePanel(self.processor.probe, LOG_DIR)
+        self.stats_tabs = QTabWidget()
+        self.stats_tabs.addTab(self.stats_panel, "统计")
+        self.stats_tabs.addTab(self.pipeline_panel, "流水线")
+        display_layout = QHBoxLayout()
+        display_layout.addLayout(grid_layout)
+        display_layout.addWidget(self.stats_tabs, 1)
+        self.main_layout.addLayout(display_layout, 2)
+
+    def setup_chart(self):
+        # 8 通道滚动曲线: 保留很长的历史，绘制开销只和控件宽度有关
+        self.chart = StripChart(CHANNEL_FIELDS, ['V'] * len(CHANNEL_FIELDS), capacity=CHART_HISTORY)
+        self.chart.setToolTip("滚轮缩放时间范围，右键显示全部或清空")
+        self.chart.painted.connect(self.processor.probe.rendered)
+        self.main_layout.addWidget(self.chart, 3)
 
     def setup_debug_console(self):
-        self.debug_console = QTextEdit()
-        self.debug_console.setReadOnly(True)
+        self.debug_console = RingConsole(capacity=MAX_LOG_LINES)
         self.debug_console.setFont(QFont("Consolas", 10))
         self.main_layout.addWidget(QLabel("调试信息:"))
         self.main_layout.addWidget(self.debug_console)
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.refresh_debug_console)
+        self.log_timer.start(LOG_REFRESH_MS)
 
     def refresh_ports(self):
         self.port_combobox.clear()
         ports = serial.tools.list_ports.comports()
         ch340_port_device = None
         if not ports:
-            self.port_combobox.addItem("未找到串口设备")
-            self.port_combobox.setEnabled(False)
-            return
-        self.port_combobox.setEnabled(True)
+            return  # 留空显示提示文字，仍可手动输入端口名
         for port in ports:
             display_text = port.description
             self.port_combobox.addItem(display_text, port.device)
@@ -101,9 +160,15 @@ class MainWindow(QMainWindow):
                 self.port_combobox.setCurrentIndex(index)
                 self.log_message(f"[智能选择] 已自动选择CH340端口: {self.port_combobox.itemText(index)}")
 
+    def selected_port(self):
+        """列表里的端口取设备名，手动输入的按原样作为端口名"""
+        text = self.port_combobox.currentText().strip()
+        index = self.port_combobox.findText(text)
+        return (self.port_combobox.itemData(index) if index != -1 else None) or text
+
     def toggle_connection(self, checked):
         if checked:
-            port = self.port_combobox.currentData() 
+            port = self.selected_port()
             if not port:
                 self.log_message("[错误] 未选择任何有效串口。")
                 self.connect_button.setChecked(False)
@@ -111,67 +176,61 @@ class MainWindow(QMainWindow):
             self.connect_button.setText("断开")
             self.port_combobox.setEnabled(False)
             self.refresh_button.setEnabled(False)
-            self.processor.start_processing(port)
+            self.record_checkbox.setEnabled(False)
+            self.process_checkbox.setEnabled(False)
+            self.stats_panel.reset()
+            self.processor.use_process = self.process_checkbox.isChecked()
+            record_path = None
+            if self.record_checkbox.isChecked():
+                filename = datetime.datetime.now().strftime("session_%Y%m%d_%H%M%S") + SESSION_EXTENSION
+                record_path = os.path.join(LOG_DIR, filename)
+            self.processor.start_processing(port, record_path=record_path)
         else:
             self.connect_button.setText("连接")
             self.port_combobox.setEnabled(True)
             self.refresh_button.setEnabled(True)
+            self.record_checkbox.setEnabled(True)
+            self.process_checkbox.setEnabled(True)
             self.processor.stop_processing()
 
     @pyqtSlot(list)
     def update_voltage_displays(self, voltages):
         for i, voltage in enumerate(voltages):
             self.voltage_displays[i].setText(f"{voltage:.3f} V")
-    
-    # --- [核心修改] 分离职责 ---
 
+    @pyqtSlot(object)
+    def update_displays(self, block):
+        """消费块传输模式下的数据块: 整块进曲线和统计，数字只显示块内最新一帧"""
+        if self.processor.probe.enabled:
+            self.processor.probe.received(block)
+        self.update_history(block_values(block), block['timestamp'])
+        latest = block[-1]
+        self.update_voltage_displays([float(latest[name]) for name in CHANNEL_FIELDS])
+
+    def update_history(self, rows, timestamps=None):
+        """(n, 8) 的电压进曲线和统计；逐帧模式没有时间戳，按到达时刻统计采样率"""
+        self.chart.extend(rows)
+        self.stats_panel.update_stats(rows, timestamps)
+    
     @pyqtSlot(str)
     def log_message(self, message):
-        """
-        这是“看门人”函数。它负责检查是否需要归档，
-        然后调用简单的显示函数来添加消息。
-        """
-        # 1. 检查是否需要归档
-        if self.debug_console.document().blockCount() > MAX_LOG_LINES:
-            self.archive_log()
+        """公共日志接口: 放进日志队列后立即返回，由日志线程写文件"""
+        self.log_sink.write(message)
 
-        # 2. 调用简单的显示函数来添加原始消息
-        self._add_log_to_display(message)
-
-    def _add_log_to_display(self, message):
+    def refresh_debug_console(self):
         """
-        这是简单的“执行者”函数。它的唯一职责是向UI添加文本。
-        它不包含任何检查逻辑。
+        定时把日志文件新写入的行交给调试窗口。
+        调试窗口是固定容量的环形缓冲区，只绘制可见的几行，消息再多界面开销也是固定的。
         """
-        self.debug_console.append(message)
-        self.debug_console.verticalScrollBar().setValue(self.debug_console.verticalScrollBar().maximum())
-
-    def archive_log(self):
-        """将旧的日志内容归档到文件，并从UI中移除"""
-        now = datetime.datetime.now()
-        filename = now.strftime("%Y%m%d_%H%M%S") + ".txt"
-        filepath = os.path.join(LOG_DIR, filename)
-
-        cursor = QTextCursor(self.debug_console.document())
-        cursor.movePosition(QTextCursor.Start)
-        cursor.movePosition(QTextCursor.Down, QTextCursor.KeepAnchor, TRIM_LOG_LINES)
-        
-        text_to_archive = cursor.selection().toPlainText()
-
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"--- Log archive from {now.strftime('%Y-%m-%d %H:%M:%S')} ---\n")
-                f.write(text_to_archive)
-            
-            # [核心修改] 直接调用简单的显示函数来报告状态，打破递归！
-            self._add_log_to_display(f"--- [系统] 旧日志已归档至: {filepath} ---")
-
-        except IOError as e:
-            self._add_log_to_display(f"--- [错误] 归档日志失败: {e} ---")
-
-        cursor.removeSelectedText()
-        cursor.deleteChar()
+        self._log_seq, lines, skipped = self.log_sink.tail(self._log_seq)
+        if not lines:
+            return
+        if skipped:
+            lines.insert(0, f"--- [系统] 省略 {skipped} 行，完整内容见 {self.log_sink.path} ---")
+        self.debug_console.append_lines(lines)
 
     def closeEvent(self, event):
+        self.log_timer.stop()
         self.processor.stop_processing()
-        event.accept()
\ No newline at end of file
+        self.log_sink.close()
+        event.accept()
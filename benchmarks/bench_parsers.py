@@ -0,0 +1,522 @@
+# 文件名: benchmarks/bench_parsers.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 解析器吞吐量与重同步基准测试（无界面、不跑 Qt/Tk 事件循环）。
+#
+# 覆盖的解码器:
+#   multi8.frame   Multi_channel_ADC  DataProcessor.process_frame
+#   multi8.run     Multi_channel_ADC  DataProcessor.run (回放字节流)
+#   hybrid.frame   Hybride_Digital_2ADC DataProcessor.process_final_frame
+#   hybrid.run     Hybride_Digital_2ADC DataProcessor.run (回放字节流)
+#   ff.parse       serial_debug_tool.py SerialDebugTool.parse_packets
+#   af.parse       Serial Monitor v1.py AFPoller 收帧 + HRG_SerialMonitor.parse_and_update_data
+#
+# 输出: 帧/秒、字节/秒、单帧延迟分位数 (p50/p90/p99/max, 纳秒)，
+# 以及各种损坏模式下重新同步所需的时间、字节数和丢帧数。结果写入 JSON，
+# 用 --baseline 指定旧结果文件即可对比，找出热路径上的性能回退。
+#
+# 用法:
+#   python benchmarks/bench_parsers.py --frames 20000 --output bench_results.json
+#   python benchmarks/bench_parsers.py --baseline old.json
+#   python benchmarks/bench_parsers.py --recorded hybrid=capture.bin   # 用录下的原始字节流
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from hrg_core.simulator import encode_multi8, encode_hybrid, encode_ff, encode_af_response
+from hrg_core.af_poller import AFPoller
+
+REGRESSION_THRESHOLD = 0.10  # 吞吐下降超过 10% 视为回退
+DECOY_INDEX = 4000           # 损坏数据里用的帧序号，不会与正常帧序号重复
+
+
+# --- 加载各工具的模块（各自目录下都有同名的 data_processor.py）---
+
+def load_module(name, relative_path):
+    path = os.path.join(REPO_ROOT, relative_path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ReplayPort:
+    """
+    把一段字节流按固定块大小"回放"给 DataProcessor.run，代替 serial.Serial。
+    数据读完后调用 on_exhausted（通常是采集引擎的 stop）。
+    """
+
+    def __init__(self, data, chunk_size=256, on_exhausted=None):
+        self._data = memoryview(bytes(data))
+        self._pos = 0
+        self._chunk_end = 0
+        self.chunk_size = chunk_size
+        self.on_exhausted = on_exhausted
+        self.is_open = False
+        self.port = None
+        self.baudrate = None
+        self.timeout = None
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def cancel_read(self):
+        pass
+
+    @property
+    def in_waiting(self):
+        return self._chunk_end - self._pos
+
+    def read(self, size=1):
+        if self._pos >= self._chunk_end:
+            # 模拟下一批数据到达
+            self._chunk_end = min(self._pos + self.chunk_size, len(self._data))
+        end = min(self._pos + size, self._chunk_end)
+        out = bytes(self._data[self._pos:end])
+        self._pos = end
+        if self._pos >= len(self._data) and self.on_exhausted:
+            self.on_exhausted()
+        return out
+
+
+class _HeadlessRoot:
+    """Tk 根窗口的替身: after() 只记录回调，不执行"""
+
+    def __init__(self):
+        self.scheduled = 0
+
+    def after(self, delay, callback=None, *args):
+        self.scheduled += 1
+
+
+class _PollPort:
+    """AFPoller 构造时只需要波特率；基准测试直接把应答喂给收帧逻辑"""
+
+    baudrate = 115200
+
+
+class _CaptureText:
+    """ScrolledText 的替身: 记录插入的文本行"""
+
+    def __init__(self):
+        self.lines = []
+
+    def insert(self, index, text):
+        self.lines.append(text)
+
+    def see(self, index):
+        pass
+
+
+# --- 合成字节流 ---
+# 每帧都把帧序号编码进数据里，解码后能据此判断哪些帧恢复了
+
+def multi8_frame(index):
+    return encode_multi8([index % 4096] + [(index * 7 + k) % 4096 for k in range(1, 8)])
+
+
+def hybrid_frame(index):
+    return encode_hybrid(2048 + index % 2048, 3000, index % 65536, (index % 600) - 300,
+                         (index % 4096, 100, 200))
+
+
+def ff_frame(index):
+    return encode_ff(index % 4096)
+
+
+FRAME_BUILDERS = {'multi8': multi8_frame, 'hybrid': hybrid_frame, 'ff': ff_frame}
+
+
+def build_stream(protocol, start, count):
+    """返回 (字节流, 每帧起始偏移列表)"""
+    build = FRAME_BUILDERS[protocol]
+    stream = bytearray()
+    offsets = []
+    for index in range(start, start + count):
+        offsets.append(len(stream))
+        stream += build(index)
+    return bytes(stream), offsets
+
+
+def percentiles(samples_ns):
+    samples = np.asarray(samples_ns, dtype=np.float64)
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {'p50_ns': float(p50), 'p90_ns': float(p90), 'p99_ns': float(p99), 'max_ns': float(samples.max())}
+
+
+# --- 各解码器的适配器 ---
+
+class Multi8Bench:
+    protocol = 'multi8'
+    frame_size = 16
+
+    def __init__(self):
+        self.module = load_module('multi8_data_processor', 'Multi_channel_ADC/data_processor.py')
+
+    def new_processor(self, block_transport):
+        processor = self.module.DataProcessor()
+        processor.use_block_transport = block_transport
+        return processor
+
+    def decode_one(self, processor):
+        return processor.process_frame
+
+    def frame_index(self, payload):
+        return round(payload[0] / self.module.V_REF * 4095)
+
+    def connect_frames(self, processor, callback):
+        processor.data_updated.connect(lambda voltages: callback(self.frame_index(voltages)))
+
+    def count_frames(self, processor, counter):
+        processor.block_ready.connect(lambda block: counter.append(len(block)))
+
+    def attach_replay(self, processor, stream, chunk_size):
+        """让 processor.run() 从回放的字节流读取，读完即停"""
+        engine = processor.engine
+        engine.serial_port = ReplayPort(stream, chunk_size, on_exhausted=engine.stop)
+        engine.running = True
+
+
+class HybridBench(Multi8Bench):
+    protocol = 'hybrid'
+    frame_size = 16
+
+    def __init__(self):
+        self.module = load_module('hybrid_data_processor', 'Hybride_Digital_2ADC/data_processor.py')
+
+    def decode_one(self, processor):
+        return processor.process_final_frame
+
+    def connect_frames(self, processor, callback):
+        processor.data_updated.connect(lambda data: callback(int(data['ch3_pressure'])))
+
+
+class FFBench:
+    protocol = 'ff'
+    frame_size = 3
+    _value_pattern = re.compile(r'\((\d+)\)')
+
+    def __init__(self):
+        self.module = load_module('serial_debug_tool_bench', 'serial_debug_tool.py')
+
+    def new_tool(self):
+        tool = self.module.SerialDebugTool.__new__(self.module.SerialDebugTool)
+        tool.root = _HeadlessRoot()
+        tool.receive_text = _CaptureText()
+        tool.decoder = self.module.FFDecoder()
+        return tool
+
+    def feed(self, tool, data):
+        # 读线程里的解析 + 格式化；一次返回的多行文本按行记录
+        text = tool.parse_packets(data)
+        if text:
+            tool.receive_text.lines.extend(text.splitlines())
+
+    def decoded_indices(self, tool):
+        return [int(self._value_pattern.search(line).group(1)) for line in tool.receive_text.lines]
+
+
+class AFBench:
+    protocol = 'af_poll'
+
+    def __init__(self):
+        self.module = load_module('serial_monitor_bench', 'Debug_2_sensor/Serial Monitor v1.py')
+
+    def new_monitor(self):
+        monitor = self.module.HRG_SerialMonitor.__new__(self.module.HRG_SerialMonitor)
+        monitor.root = _HeadlessRoot()
+        monitor.csv_sink = None
+        # 不启动: 只积累待显示的数据，和真实界面两帧之间的情形相同
+        monitor.refresher = self.module.RefreshScheduler(monitor.root, lambda latest, text: None)
+        return monitor
+
+    def new_poller(self, monitor):
+        return AFPoller(_PollPort(), on_response=monitor.parse_and_update_data)
+
+
+# --- 测量 ---
+
+def bench_frame_decoder(bench, n_frames, recorded=None):
+    processor = bench.new_processor(block_transport=True)
+    decode = bench.decode_one(processor)
+    if recorded is not None:
+        n = len(recorded) // bench.frame_size
+        frames = [recorded[i * bench.frame_size:(i + 1) * bench.frame_size] for i in range(n)]
+    else:
+        frames = [FRAME_BUILDERS[bench.protocol](i) for i in range(n_frames)]
+    timings = np.empty(len(frames), dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i, frame in enumerate(frames):
+        t0 = clock()
+        decode(frame)
+        timings[i] = clock() - t0
+    total_s = timings.sum() / 1e9
+    result = {'frames': len(frames), 'frames_per_s': len(frames) / total_s,
+              'bytes_per_s': len(frames) * bench.frame_size / total_s}
+    result.update(percentiles(timings))
+    return result
+
+
+def bench_run_loop(bench, n_frames, chunk_size, recorded=None):
+    stream = recorded if recorded is not None else build_stream(bench.protocol, 0, n_frames)[0]
+    processor = bench.new_processor(block_transport=True)
+    decoded = []
+    bench.count_frames(processor, decoded)
+    bench.attach_replay(processor, stream, chunk_size)
+    t0 = time.perf_counter()
+    processor.run()
+    elapsed = time.perf_counter() - t0
+    frames = sum(decoded)
+    return {'frames': frames, 'bytes': len(stream), 'chunk_size': chunk_size, 'seconds': elapsed,
+            'frames_per_s': frames / elapsed, 'bytes_per_s': len(stream) / elapsed}
+
+
+def bench_ff(bench, n_frames, chunk_size, recorded=None):
+    stream = recorded if recorded is not None else build_stream('ff', 0, n_frames)[0]
+    tool = bench.new_tool()
+    t0 = time.perf_counter()
+    for start in range(0, len(stream), chunk_size):
+        bench.feed(tool, stream[start:start + chunk_size])
+    elapsed = time.perf_counter() - t0
+    frames = len(tool.receive_text.lines)
+
+    # 单包延迟: 每次只喂一个完整包
+    tool = bench.new_tool()
+    timings = np.empty(min(n_frames, 5000), dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i in range(len(timings)):
+        packet = ff_frame(i)
+        t1 = clock()
+        bench.feed(tool, packet)
+        timings[i] = clock() - t1
+    result = {'frames': frames, 'bytes': len(stream), 'chunk_size': chunk_size, 'seconds': elapsed,
+              'frames_per_s': frames / elapsed, 'bytes_per_s': len(stream) / elapsed}
+    result.update(percentiles(timings))
+    return result
+
+
+def bench_af(bench, n_frames):
+    monitor = bench.new_monitor()
+    poller = bench.new_poller(monitor)
+    responses = [encode_af_response(i % 65536, (i % 600) - 300) for i in range(n_frames)]
+    timings = np.empty(n_frames, dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i, response in enumerate(responses):
+        t0 = clock()
+        poller.feed(response)
+        timings[i] = clock() - t0
+    total_s = timings.sum() / 1e9
+    result = {'frames': n_frames, 'frames_per_s': n_frames / total_s, 'bytes_per_s': n_frames * 6 / total_s}
+    result.update(percentiles(timings))
+    return result
+
+
+# --- 重同步 ---
+
+def corruption_patterns(protocol, frame_size, rng):
+    """返回 {模式名: 函数(下一帧字节) -> 插入到流中的损坏字节}"""
+    build = FRAME_BUILDERS[protocol]
+    return {
+        # 一段随机垃圾
+        'garbage_64': lambda frame: bytes(rng.randrange(256) for _ in range(64)) + frame,
+        # 丢掉一个字节
+        'drop_1': lambda frame: frame[:frame_size // 2] + frame[frame_size // 2 + 1:],
+        # 帧头字节的一个比特翻转
+        'bitflip_header': lambda frame: bytes([frame[0] ^ 0x40]) + frame[1:],
+        # 半截帧: 看起来像帧头，后面却接上了下一帧
+        'truncated_frame': lambda frame: build(DECOY_INDEX)[:frame_size // 2] + frame,
+    }
+
+
+def measure_resync(bench, feed_and_collect, warmup=50, tail=200, seed=1234):
+    """
+    流 = 热身帧 + 损坏 + 后续帧。根据解码出的帧序号计算:
+    resync_bytes: 从损坏点到第一帧恢复的帧结束为止的字节数
+    resync_us:    最后一帧好帧到第一帧恢复帧之间的解码耗时
+    frames_lost:  损坏点之后没有被解码出来的帧数
+    """
+    rng = random.Random(seed)
+    results = {}
+    head, _ = build_stream(bench.protocol, 0, warmup)
+    tail_stream, tail_offsets = build_stream(bench.protocol, warmup, tail)
+    for name, corrupt in corruption_patterns(bench.protocol, bench.frame_size, rng).items():
+        first = tail_stream[:bench.frame_size]
+        damaged = corrupt(first)
+        stream = head + damaged + tail_stream[bench.frame_size:]
+        corruption_offset = len(head)
+        shift = len(damaged) - bench.frame_size  # 损坏后后续帧的偏移变化
+
+        events = feed_and_collect(stream)  # [(perf_counter_ns, 帧序号), ...]
+        before = [t for t, index in events if index < warmup]
+        # 垃圾数据可能被误解码成任意序号，只认后续帧范围内的序号
+        after = [(t, index) for t, index in events if warmup <= index < warmup + tail]
+        if not after or not before:
+            results[name] = {'recovered': False}
+            continue
+        t_recover, index = after[0]
+        k = index - warmup
+        frame_end = corruption_offset + tail_offsets[k] + bench.frame_size + shift
+        results[name] = {
+            'recovered': True,
+            'resync_bytes': frame_end - corruption_offset,
+            'resync_us': (t_recover - before[-1]) / 1000.0,
+            'frames_lost': tail - len(after),
+        }
+    return results
+
+
+def resync_processor(bench, chunk_size):
+    def feed_and_collect(stream):
+        processor = bench.new_processor(block_transport=False)
+        events = []
+        clock = time.perf_counter_ns
+        bench.connect_frames(processor, lambda index: events.append((clock(), index)))
+        bench.attach_replay(processor, stream, chunk_size)
+        processor.run()
+        return events
+    return feed_and_collect
+
+
+def resync_ff(bench, chunk_size):
+    # 这个解析器一次处理整个缓冲区，时间分辨率只能到"一次喂入的数据块"
+    def feed_and_collect(stream):
+        tool = bench.new_tool()
+        events = []
+        clock = time.perf_counter_ns
+        seen = 0
+        for start in range(0, len(stream), chunk_size):
+            bench.feed(tool, stream[start:start + chunk_size])
+            indices = bench.decoded_indices(tool)[seen:]
+            now = clock()
+            events.extend((now, index) for index in indices)
+            seen += len(indices)
+        return events
+    return feed_and_collect
+
+
+# --- 汇总 ---
+
+def best_of(repeat, measure, *args):
+    """重复测量取吞吐最高的一次，减小机器负载抖动的影响"""
+    return max((measure(*args) for _ in range(repeat)), key=lambda entry: entry['frames_per_s'])
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten_throughput(results):
+    """{'multi8.run': frames_per_s, ...}，用于与基线对比"""
+    return {name: entry['frames_per_s'] for name, entry in results['benchmarks'].items() if 'frames_per_s' in entry}
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = flatten_throughput(baseline)
+    regressions = []
+    print(f"\n对比基线 {baseline_path} (版本 {baseline.get('meta', {}).get('git')}):")
+    for name, value in flatten_throughput(current).items():
+        if name not in old:
+            continue
+        ratio = value / old[name]
+        flag = ""
+        if ratio < 1.0 - REGRESSION_THRESHOLD:
+            flag = "  <-- 回退"
+            regressions.append(name)
+        print(f"  {name:16s} {old[name]:12.0f} -> {value:12.0f} 帧/秒  ({ratio:6.2f}x){flag}")
+    return regressions
+
+
+def load_recorded(specs):
+    recorded = {}
+    for spec in specs or []:
+        name, _, path = spec.partition('=')
+        with open(path, 'rb') as f:
+            recorded[name] = f.read()
+    return recorded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HRG 解析器基准测试")
+    parser.add_argument('--frames', type=int, default=20000, help="合成帧数 (默认 20000)")
+    parser.add_argument('--chunk', type=int, default=256, help="回放时每次到达的字节数 (默认 256)")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最好成绩 (默认 3)")
+    parser.add_argument('--recorded', action='append', metavar='PROTOCOL=PATH',
+                        help="用录下的原始字节流代替合成数据，PROTOCOL 为 multi8/hybrid/ff")
+    parser.add_argument('--output', default='bench_results.json', help="结果 JSON 文件")
+    parser.add_argument('--baseline', help="与之对比的旧结果 JSON 文件")
+    args = parser.parse_args(argv)
+    recorded = load_recorded(args.recorded)
+
+    multi8, hybrid, ff, af = Multi8Bench(), HybridBench(), FFBench(), AFBench()
+    benchmarks = {}
+    resync = {}
+    for bench in (multi8, hybrid):
+        name = bench.protocol
+        benchmarks[f'{name}.frame'] = best_of(args.repeat, bench_frame_decoder, bench, args.frames, recorded.get(name))
+        benchmarks[f'{name}.run'] = best_of(args.repeat, bench_run_loop, bench, args.frames, args.chunk, recorded.get(name))
+        resync[name] = measure_resync(bench, resync_processor(bench, args.chunk))
+    benchmarks['ff.parse'] = best_of(args.repeat, bench_ff, ff, args.frames, args.chunk, recorded.get('ff'))
+    resync['ff'] = measure_resync(ff, resync_ff(ff, args.chunk))
+    benchmarks['af.parse'] = best_of(args.repeat, bench_af, af, args.frames)
+
+    results = {
+        'meta': {
+            'git': git_revision(),
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'frames': args.frames,
+            'chunk': args.chunk,
+            'repeat': args.repeat,
+            'recorded': sorted(recorded),
+        },
+        'benchmarks': benchmarks,
+        'resync': resync,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"{'解码器':16s} {'帧/秒':>12s} {'字节/秒':>14s} {'p50(ns)':>10s} {'p99(ns)':>10s}")
+    for name, entry in benchmarks.items():
+        print(f"{name:16s} {entry['frames_per_s']:12.0f} {entry['bytes_per_s']:14.0f} "
+              f"{entry.get('p50_ns', float('nan')):10.0f} {entry.get('p99_ns', float('nan')):10.0f}")
+    print("\n重同步:")
+    for protocol, patterns in resync.items():
+        for pattern, entry in patterns.items():
+            if entry['recovered']:
+                print(f"  {protocol:8s} {pattern:16s} {entry['resync_bytes']:5d} 字节 "
+                      f"{entry['resync_us']:9.1f} us  丢帧 {entry['frames_lost']}")
+            else:
+                print(f"  {protocol:8s} {pattern:16s} 未恢复")
+    print(f"\n结果已写入 {args.output}")
+
+    if args.baseline:
+        return 1 if compare(results, args.baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
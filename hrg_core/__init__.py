@@ -0,0 +1,10 @@
+# 文件名: hrg_core/__init__.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 各上位机共享的底层模块（帧缓冲、协议解析等）。
+# 两个 Qt 程序和 Tk 工具都从仓库根目录导入本包，
+# 子模块请按需显式导入，避免 Tk 工具被迫加载 Qt。
+# 界面控件模块 ring_console、strip_chart、stats_panel、pipeline_panel 依赖 PyQt5，
+# 只给两个 Qt 上位机用，Tk 工具不要导入；其余模块都不依赖 Qt。
+# 协议解析 (protocol、decoders) 依赖 NumPy，Tk 工具也要用到:
+# serial_debug_tool 经 decoders，Serial Monitor 经 af_poller -> protocol，运行环境都需要安装 NumPy。
@@ -0,0 +1,270 @@
+# 文件名: hrg_core/acquisition.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 不依赖 Qt 的采集引擎: 打开串口 -> 事件驱动读取 -> 流式解码 -> 数据块/录制。
+# Qt 上位机的 DataProcessor 只是把这里的回调转成 pyqtSignal；
+# 没有显示器的采集机可以直接用命令行运行:
+#
+#   python -m hrg_core.acquisition hybrid /dev/ttyUSB0 -o log/session.hrgs
+#   python -m hrg_core.acquisition multi8 COM5 --duration 60 > data.csv
+#
+# 输出文件以 .hrgs 结尾时写二进制会话文件，否则写 CSV（"-" 为标准输出）。
+
+import argparse
+import sys
+import threading
+import time
+
+import numpy as np
+import serial
+
+from hrg_core.serial_reader import SerialReader, READ_PROFILES, DEFAULT_READ_PROFILE
+from hrg_core.sample_block import SampleBlockBuffer, DEFAULT_BLOCK_FRAMES, DEFAULT_BLOCK_INTERVAL_MS
+from hrg_core.recording import SessionRecorder, SESSION_EXTENSION
+from hrg_core.decoders import STREAMING_DECODERS
+from hrg_core.filters import FilterStage
+from hrg_core.pipeline_stats import PipelineProbe
+from hrg_core.diagnostics import Diagnostics, FRAMES, IO, DEBUG, INFO, WARNING, ERROR
+
+DEFAULT_BAUDRATE = 115200
+
+
+class AcquisitionEngine:
+    """
+    单串口采集。run() 在调用者的线程里运行直到 stop()，stop() 可以从任何线程调用。
+    调用 run() 之前先把 running 置为 True（先置位再启动线程，避免 stop() 早于 run() 时丢失）。
+
+    回调都在 run() 所在的线程里调用:
+      on_rows(rows)    每次解出新样本，rows 为 (N, 字段数) 的 float64 数组
+      on_block(block)  攒满一个数据块（或攒块超时），block 为结构化数组: timestamp + 解码器字段
+    record_path 非空时，数据块同时追加写入 .hrgs 会话文件。
+    set_filter() 设置的滤波在解码之后、回调和录制之前进行。
+    probe 是流水线延迟测量（见 hrg_core.pipeline_stats），probe.enabled 为 False 时不打时间戳。
+
+    引擎只读不写，不支持需要定时发请求的应答式解码器（如 AFPollDecoder），传入时抛出 ValueError；
+    这类串口请用 hrg_core.hub.AcquisitionHub。
+    """
+
+    def __init__(self, decoder, baudrate=DEFAULT_BAUDRATE, read_profile=DEFAULT_READ_PROFILE,
+                 block_frames=DEFAULT_BLOCK_FRAMES, block_interval_ms=DEFAULT_BLOCK_INTERVAL_MS,
+                 on_rows=None, on_block=None):
+        if decoder.poll_request is not None:
+            raise ValueError(f"{type(decoder).__name__} 是应答式协议，需要定时发请求，请用 hrg_core.hub")
+        self.decoder = decoder
+        self.diagnostics = decoder.diagnostics
+        self.serial_port = serial.Serial()
+        self.port_name = ""
+        self.baudrate = baudrate
+        self.running = False
+        # 事件驱动读取: 阻塞等待数据，延迟/吞吐由 read_profile 决定
+        self.read_profile = read_profile
+        self._reader = None
+        # 每 block_frames 帧或每 block_interval_ms 毫秒出一个块
+        self.block_frames = block_frames
+        self.block_interval_ms = block_interval_ms
+        self._block_buffer = SampleBlockBuffer(decoder.fields, block_frames, block_interval_ms)
+        self.on_rows = on_rows
+        self.on_block = on_block
+        # 解码之后的滤波，见 hrg_core.filters
+        self.filter = FilterStage()
+        # 二进制录制
+        self.record_path = None
+        self._recorder = None
+        # 统计
+        self.bytes_read = 0
+        self.probe = PipelineProbe()
+        self.probe.add_gauge('serial_rx', lambda: self.serial_port.in_waiting)
+        self.probe.add_gauge('block_frames', lambda: len(self._block_buffer))
+        self.probe.counter_source = lambda: (self.bytes_read, self.decoder.frames_decoded)
+        decoder.probe = self.probe
+
+    # --- 控制 ---
+
+    def set_filter(self, spec):
+        """按描述字符串设置滤波 (如 "ma:8")，空字符串关闭；运行中调用下一批数据即生效"""
+        self.filter = FilterStage(spec)
+
+    def stop(self):
+        self.running = False
+        if self._reader:
+            self._reader.cancel()  # 唤醒正在阻塞的读取
+
+    def run(self):
+        if not self._open_port():
+            self.running = False
+            return
+        self.decoder.reset()
+        self.filter.reset()
+        self._block_buffer = SampleBlockBuffer(self.decoder.fields, self.block_frames, self.block_interval_ms)
+        if self.record_path:
+            self._open_recorder()
+        try:
+            while self.running:
+                # 阻塞等待数据到达（或超时），不轮询 in_waiting
+                data = self._reader.read()
+                if data:
+                    self.bytes_read += len(data)
+                    probe = self.probe if self.probe.enabled else None
+                    if probe is not None:
+                        probe.begin()
+                    rows = self.decoder.feed(data)
+                    if probe is not None:
+                        probe.decoded(len(rows))
+                    if len(rows):
+                        self.publish(rows)
+                # 没有新帧时也要按时把攒了一半的块发出去
+                if self._blocks_enabled():
+                    self._emit_block(self._block_buffer.poll())
+        finally:
+            self._emit_block(self._block_buffer.flush())
+            self.decoder.report_errors()
+            self._close_recorder()
+            if self.serial_port.is_open:
+                self.serial_port.close()
+                self.diagnostics.info(IO, "串口 %s 已关闭。", self.port_name)
+
+    # --- 数据出口 ---
+
+    def publish(self, rows):
+        """交出一批解码结果: 先滤波，再回调 on_rows，最后攒进数据块"""
+        rows = self.filter.process(rows)
+        if self.on_rows is not None:
+            self.on_rows(rows)
+        if self._blocks_enabled():
+            for block in self._block_buffer.append_many(time.time(), rows):
+                self._emit_block(block)
+
+    def publish_one(self, values):
+        """单帧版本的 publish()，只攒块，不回调 on_rows；返回滤波后的值"""
+        if self.filter:
+            values = self.filter.process(np.asarray([values], dtype=np.float64))[0]
+        if self._blocks_enabled():
+            self._emit_block(self._block_buffer.append(time.time(), values))
+        return values
+
+    def _blocks_enabled(self):
+        """有人接收数据块或正在录制时才需要攒块"""
+        return self.on_block is not None or self._recorder is not None
+
+    def _emit_block(self, block):
+        if block is None:
+            return
+        if self.probe.enabled:
+            self.probe.emitted(block, len(self._block_buffer))
+        if self._recorder is not None:
+            self._recorder.write_block(block)
+        if self.on_block is not None:
+            self.on_block(block)
+
+    # --- 串口与录制 ---
+
+    def _open_port(self):
+        try:
+            self.serial_port.port = self.port_name
+            self.serial_port.baudrate = self.baudrate
+            self._reader = SerialReader(self.serial_port, self.read_profile)
+            self._reader.configure()  # 超时取自 read_profile，避免永久阻塞
+            if not self.serial_port.is_open:
+                self.serial_port.open()
+            self.diagnostics.info(IO, "串口 %s 已打开，波特率 %d。", self.port_name, self.baudrate)
+            return True
+        except serial.SerialException as e:
+            self.diagnostics.error(IO, "[错误] 打开串口失败: %s", e)
+            return False
+
+    def _open_recorder(self):
+        try:
+            calibration = dict(self.decoder.calibration())
+            if self.filter:
+                calibration['filter'] = self.filter.spec  # 录制的是滤波后的数据
+            self._recorder = SessionRecorder(self.record_path, self.decoder.fields, units=self.decoder.units,
+                                             v_ref=self.decoder.v_ref, calibration=calibration)
+            self.diagnostics.info(IO, "[录制] 开始录制到 %s", self.record_path)
+        except (OSError, ValueError) as e:
+            self._recorder = None
+            self.diagnostics.error(IO, "[错误] 创建录制文件失败: %s", e)
+
+    def _close_recorder(self):
+        if self._recorder is not None:
+            self._recorder.close()
+            self.diagnostics.info(IO, "[录制] 已保存 %d 帧到 %s", self._recorder.records_written, self.record_path)
+            self._recorder = None
+
+
+# --- 命令行 ---
+
+class _CsvWriter:
+    """把数据块写成 CSV: 时间戳 + 解码器字段"""
+
+    def __init__(self, stream, fields):
+        self.stream = stream
+        self.columns = len(fields) + 1
+        self.fmt = ['%.6f'] + ['%.9g'] * len(fields)
+        stream.write(','.join(('timestamp',) + tuple(fields)) + '\n')
+
+    def write_block(self, block):
+        # 数据块全是 float64，可以直接视为二维数组
+        table = np.ascontiguousarray(block).view(np.float64).reshape(len(block), self.columns)
+        np.savetxt(self.stream, table, fmt=self.fmt, delimiter=',')
+
+
+def _print_record(record):
+    print(record, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HRG 无界面采集程序")
+    parser.add_argument('protocol', choices=sorted(STREAMING_DECODERS),
+                        help="设备连续发送的协议；af_poll 等应答式协议请用 python -m hrg_core.hub")
+    parser.add_argument('port', help="串口名，例如 COM5 或 /dev/ttyUSB0")
+    parser.add_argument('-o', '--output', default='-',
+                        help=f"输出文件: *{SESSION_EXTENSION} 为二进制会话文件，其他为 CSV，'-' 为标准输出 (默认)")
+    parser.add_argument('--baud', type=int, default=DEFAULT_BAUDRATE, help="波特率 (默认 115200)")
+    parser.add_argument('--profile', choices=sorted(READ_PROFILES), default='throughput',
+                        help="读取策略 (默认 throughput)")
+    parser.add_argument('--duration', type=float, default=0.0, help="采集秒数，0 表示直到 Ctrl+C")
+    parser.add_argument('--level', choices=['debug', 'info', 'warning', 'error'], default='info',
+                        help="标准错误上显示的调试信息级别")
+    parser.add_argument('--frame-dump', action='store_true', help="打印每一帧的原始数据")
+    parser.add_argument('--filter', default='', help="解码后的滤波，例如 ma:8、iir:0.1、median:5、fir:31:0.05")
+    args = parser.parse_args(argv)
+
+    levels = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+    diagnostics = Diagnostics(_print_record, level=levels[args.level], enabled={FRAMES: args.frame_dump})
+    engine = AcquisitionEngine(STREAMING_DECODERS[args.protocol](diagnostics), baudrate=args.baud,
+                               read_profile=READ_PROFILES[args.profile])
+    engine.port_name = args.port
+    try:
+        engine.set_filter(args.filter)
+    except ValueError as e:
+        parser.error(str(e))
+
+    csv_file = None
+    if args.output.endswith(SESSION_EXTENSION):
+        engine.record_path = args.output
+    else:
+        csv_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+        engine.on_block = _CsvWriter(csv_file, engine.decoder.fields).write_block
+
+    if args.duration:
+        timer = threading.Timer(args.duration, engine.stop)
+        timer.daemon = True
+        timer.start()
+
+    started = time.monotonic()
+    engine.running = True
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if csv_file is not None and csv_file is not sys.stdout:
+            csv_file.close()
+        elapsed = max(time.monotonic() - started, 1e-9)
+        frames = engine.decoder.frames_decoded
+        print(f"共 {frames} 帧, {engine.bytes_read} 字节, 失步 {engine.decoder.sync_losses} 次, "
+              f"丢弃 {engine.decoder.bytes_discarded} 字节, {elapsed:.1f} 秒, 平均 {frames / elapsed:.0f} 帧/秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
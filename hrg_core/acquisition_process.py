@@ -0,0 +1,170 @@
+# 文件名: hrg_core/acquisition_process.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 在独立进程里运行 AcquisitionEngine: 串口读取和解码不再与界面线程争用 GIL，
+# 界面重绘、日志刷新再忙也不会拖慢串口排空。
+#
+# 数据: 子进程把解码结果写进 hrg_core.shm_ring.SharedSampleRing，父进程映射同一块内存，
+#       按块拷贝出来交给界面（子进程绕回来覆盖环里的行也不影响已交出的块）；
+# 调试信息: 子进程按过滤规则格式化后经队列送回，父进程还原成 DiagRecord；
+# 控制: 运行中修改参考电压、标定、滤波、调试开关等，经命令队列转给子进程里的对象。
+# 录制 (.hrgs) 也在子进程里完成。
+
+import multiprocessing
+import queue
+import threading
+import time
+
+from hrg_core.acquisition import AcquisitionEngine, DEFAULT_BAUDRATE
+from hrg_core.diagnostics import Diagnostics, DiagRecord, DEFAULT_LEVEL, IO, WARNING
+from hrg_core.serial_reader import DEFAULT_READ_PROFILE
+from hrg_core.shm_ring import SharedSampleRing, DEFAULT_CAPACITY
+
+# 用 spawn 启动: 从带 Qt 和多个线程的进程 fork 可能死锁，Windows 上也只有 spawn
+_CONTEXT = multiprocessing.get_context('spawn')
+_STOP_TIMEOUT_S = 2.0
+
+
+class AcquisitionProcess:
+    """
+    父进程一侧的句柄。
+
+    decoder_factory: 可 pickle 的可调用对象，diagnostics -> 解码器，
+                     例如 functools.partial(HybridDecoder, v_ref=3.0)；
+                     与 AcquisitionEngine 一样只支持连续发送的协议，应答式解码器会在子进程里报错退出
+    start() 之后:
+      ring            共享内存样本缓冲区 (读)
+      get_message()   取一条子进程发来的 DiagRecord，没有时返回 None
+      call()          在子进程里调用解码器或调试信息对象的方法
+      forward()       在调用者线程里转发新数据和调试信息，直到子进程退出
+    """
+
+    def __init__(self, decoder_factory, fields, capacity=DEFAULT_CAPACITY):
+        self.decoder_factory = decoder_factory
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.ring = None
+        self._process = None
+        self._commands = None
+        self._messages = None
+
+    def start(self, port_name, baudrate=DEFAULT_BAUDRATE, read_profile=DEFAULT_READ_PROFILE, record_path=None,
+              level=DEFAULT_LEVEL, enabled=None, filter_spec=""):
+        self.close()
+        self.ring = SharedSampleRing.create(self.fields, self.capacity)
+        self._commands = _CONTEXT.Queue()
+        self._messages = _CONTEXT.Queue()
+        self._process = _CONTEXT.Process(
+            target=_child_main, name="hrg-acquisition", daemon=True,
+            args=(self.decoder_factory, self.ring.name, self.fields, port_name, baudrate, read_profile,
+                  record_path, level, enabled, filter_spec, self._commands, self._messages))
+        self._process.start()
+
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def call(self, target, method, *args):
+        """target 为 'decoder'、'engine' 或 'diagnostics'；子进程未运行时忽略"""
+        if self.is_alive():
+            self._commands.put((target, method, args))
+
+    def get_message(self, timeout=None):
+        """阻塞至多 timeout 秒等一条调试信息；timeout=None 表示不等待"""
+        try:
+            if timeout is None:
+                item = self._messages.get_nowait()
+            else:
+                item = self._messages.get(timeout=timeout)
+        except (queue.Empty, AttributeError):
+            return None
+        category, level, text = item
+        return DiagRecord(category, level, text, ())
+
+    def forward(self, on_block, on_message, interval_s):
+        """
+        每 interval_s 秒把共享缓冲区里的新行拷贝成一个数据块交给 on_block，
+        其间收到的调试信息交给 on_message。子进程退出后把剩余的信息转发完再返回。
+        """
+        seq = self.ring.seq
+        while True:
+            alive = self.is_alive()
+            deadline = time.monotonic() + interval_s
+            record = self.get_message(timeout=interval_s)
+            while record is not None:
+                on_message(record)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                record = self.get_message(timeout=remaining)
+            seq, block, lost = self.ring.read_since(seq)
+            if lost:
+                on_message(DiagRecord(IO, WARNING, "[警告] 界面读取落后，跳过 %d 行样本（录制不受影响）", (lost,)))
+            if len(block):
+                on_block(block)
+            if not alive:
+                record = self.get_message()
+                while record is not None:
+                    on_message(record)
+                    record = self.get_message()
+                return
+
+    def stop(self):
+        """请子进程停止并等待它退出（录制文件由子进程关闭）；共享内存留给 close() 释放"""
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            self._commands.put(None)
+            self._process.join(_STOP_TIMEOUT_S)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+        self._process = None
+
+    def close(self):
+        """释放共享内存；交给界面的数据块都是拷贝，不受影响"""
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+# --- 子进程 ---
+
+def _child_main(decoder_factory, ring_name, fields, port_name, baudrate, read_profile, record_path,
+                level, enabled, filter_spec, commands, messages):
+    ring = SharedSampleRing.attach(ring_name, fields)
+    diagnostics = Diagnostics(lambda record: messages.put((record.category, record.level, str(record))),
+                              level=level, enabled=enabled)
+    decoder = decoder_factory(diagnostics)
+    try:
+        engine = AcquisitionEngine(decoder, baudrate=baudrate, read_profile=read_profile)
+    except ValueError as e:  # 应答式协议: 经调试信息告诉界面，而不是打开串口后一直收不到数据
+        diagnostics.error(IO, "[错误] %s", e)
+        ring.close()
+        return
+    engine.port_name = port_name
+    engine.record_path = record_path
+    engine.set_filter(filter_spec)
+
+    def on_rows(rows):
+        ring.write(time.time(), rows)
+        ring.set_counters(engine.bytes_read, decoder.frames_decoded, decoder.sync_losses, decoder.protocol_errors)
+
+    engine.on_rows = on_rows
+    targets = {'decoder': decoder, 'engine': engine, 'diagnostics': diagnostics}
+
+    def serve_commands():
+        while True:
+            command = commands.get()
+            if command is None:
+                engine.stop()
+                return
+            target, method, args = command
+            getattr(targets[target], method)(*args)
+
+    threading.Thread(target=serve_commands, daemon=True).start()
+    engine.running = True
+    try:
+        engine.run()
+    finally:
+        ring.set_counters(engine.bytes_read, decoder.frames_decoded, decoder.sync_losses, decoder.protocol_errors)
+        ring.close()
@@ -0,0 +1,252 @@
+# 文件名: hrg_core/af_poller.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# AF 01 FA 请求/应答协议的高速轮询，取代 "写请求 -> 阻塞读 6 字节 -> sleep(1)" 的一问一答。
+#   - 发送时刻按单调时钟上的固定网格 t0 + k*周期 排定，不受处理耗时影响，长时间运行也不漂移；
+#     错过的时刻直接跳过并计数，不会事后连发补齐。
+#   - 可以同时有多个请求在途（流水线），应答按 AF..FA 帧同步从字节流里切出来，
+#     按先进先出与最早的未应答请求配对，得到每次的往返时间。
+#   - 超时、格式错误、多余的应答和丢弃的字节都只计数，不打断轮询。
+# 不依赖 Qt 和 Tk，Serial Monitor v1.py 在自己的线程里调用 run()。
+
+import collections
+import os
+import select
+import time
+
+from hrg_core.frame_ring import FrameRing
+from hrg_core.protocol import AF_RESPONSE, AF_POLL_REQUEST
+
+DEFAULT_RATE_HZ = 1.0
+DEFAULT_MAX_IN_FLIGHT = 1
+DEFAULT_TIMEOUT_S = 0.5        # 请求发出后最多等多久，超过就算超时
+MIN_TIMEOUT_S = 0.02           # 自适应超时的下限，留出 USB 串口的调度抖动
+MAX_IN_FLIGHT = 8
+_IDLE_WAIT_S = 0.05            # 最长等待多久就回来检查一次停止标志
+_POLL_SLEEP_S = 0.001          # 不能 select 串口的平台上，没有数据时每次睡这么久再查 in_waiting
+_SYNC = bytes([AF_RESPONSE.fields[0].expected])
+
+
+def link_limit_hz(baudrate):
+    """链路能承受的最高轮询频率: 应答比请求长，按应答字节数和 10 bit/字节 计算"""
+    return baudrate / 10.0 / max(AF_RESPONSE.size, len(AF_POLL_REQUEST))
+
+
+class AFPoller:
+    """
+    在调用者的线程里运行 run()，直到 stop() 或串口出错（SerialException 原样抛出）。
+
+    on_response(timestamp, values, rtt) 在 run() 的线程里调用:
+      timestamp  收到应答的时刻 (time.time() 基准，由单调时钟推算)
+      values     AF_RESPONSE.decode() 的结果 (压力 KPa, 温度 ℃)
+      rtt        与之配对的请求的往返时间（秒）
+
+    run() 不修改串口设置（改 timeout 在 pyserial 里会重新配置串口）: 只读取 in_waiting 报告的字节，
+    等待下一个事件时 POSIX 上用 select 等串口可读，其他平台按 _POLL_SLEEP_S 轮询 in_waiting。
+    feed() 是帧同步和配对的入口，回放或测试时可以不经串口直接喂字节。
+    应答丢失时，下一条应答会先配给丢失的那个请求（往返时间偏大一次），
+    而多出来的那个请求最终按超时计数，所以发送/应答/超时三个计数总是对得上。
+    超时按平滑往返时间自适应 (srtt + 4*rttvar，同 TCP)，夹在 MIN_TIMEOUT_S 和 timeout_s 之间，
+    丢失的应答不会长时间占着在途名额。
+    """
+
+    def __init__(self, serial_port, rate_hz=DEFAULT_RATE_HZ, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 timeout_s=DEFAULT_TIMEOUT_S, on_response=None):
+        self.serial_port = serial_port
+        self.on_response = on_response
+        self.timeout_s = timeout_s
+        self.running = False
+        self._ring = FrameRing(4096)
+        self._pending = collections.deque()  # 在途请求的发送时刻 (单调时钟)
+        self._mono0 = time.monotonic()
+        self._wall0 = time.time()
+        self.set_rate(rate_hz, max_in_flight)
+        self.reset_counters()
+
+    # --- 配置 ---
+
+    def set_rate(self, rate_hz, max_in_flight=None):
+        """目标频率 (Hz)，不超过链路上限；运行中调用从下一个发送时刻起生效"""
+        limit = link_limit_hz(self.serial_port.baudrate)
+        if not rate_hz or rate_hz <= 0:
+            raise ValueError(f"轮询频率必须大于 0，得到 {rate_hz}")
+        self.rate_hz = min(float(rate_hz), limit)
+        if max_in_flight is not None:
+            if not 1 <= max_in_flight <= MAX_IN_FLIGHT:
+                raise ValueError(f"在途请求数必须在 1..{MAX_IN_FLIGHT} 之间，得到 {max_in_flight}")
+            self.max_in_flight = int(max_in_flight)
+        self._period = 1.0 / self.rate_hz
+        self._next_send = None  # 下一轮从当前时刻重新起网格
+
+    def reset_counters(self):
+        self.requests_sent = 0
+        self.responses = 0
+        self.timeouts = 0
+        self.malformed = 0       # 以 AF 开头但帧尾不对的候选帧
+        self.unsolicited = 0     # 没有在途请求时收到的应答
+        self.skipped = 0         # 因落后或在途请求已满而跳过的发送时刻
+        self.bytes_discarded = 0
+        self.rtt_last = 0.0
+        self.rtt_max = 0.0
+        self._rtt_sum = 0.0
+        self._rtt_count = 0
+        self._srtt = None
+        self._rttvar = 0.0
+        self._rto = self.timeout_s
+        self._last_stats = (time.monotonic(), 0, 0, 0.0, 0)  # 上次统计时的 (时刻, 应答数, 发送数, 往返时间和, 配对数)
+
+    # --- 运行 ---
+
+    def clock(self):
+        """应答时间戳: 单调时钟推算的墙上时间，不受系统对时跳变影响"""
+        return self._wall0 + (time.monotonic() - self._mono0)
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        self.running = True
+        self._ring.clear()
+        self._pending.clear()
+        self._next_send = None
+        port = self.serial_port
+        try:
+            port.reset_input_buffer()
+        except (AttributeError, OSError):
+            pass
+        wait_readable = _readable_waiter(port)
+        while self.running:
+            now = time.monotonic()
+            self._expire(now)
+            wait = min(self._send_due(now), _IDLE_WAIT_S)
+            waiting = port.in_waiting
+            readable = False
+            if not waiting and wait > 0:
+                readable = wait_readable(wait)
+                waiting = port.in_waiting
+            if waiting:
+                self.feed(port.read(waiting))
+            elif readable:
+                # select 报告可读却没有数据，通常是设备断开: 由 read() 抛出 SerialException
+                self.feed(port.read(1))
+
+    def _send_due(self, now):
+        """到点就发送，返回距下一个事件（发送时刻或最早的超时）的秒数"""
+        if self._next_send is None:
+            self._next_send = now
+        behind = now - self._next_send
+        if behind >= self._period:
+            # 落后超过一个周期: 跳过错过的时刻，保持原来的网格
+            missed = int(behind / self._period)
+            self.skipped += missed
+            self._next_send += missed * self._period
+        if now >= self._next_send:
+            if len(self._pending) < self.max_in_flight:
+                self.serial_port.write(AF_POLL_REQUEST)
+                self._pending.append(now)
+                self.requests_sent += 1
+            else:
+                self.skipped += 1
+            self._next_send += self._period
+        wait = self._next_send - now
+        if self._pending:
+            wait = min(wait, self._pending[0] + self._rto - now)
+        return wait
+
+    def _expire(self, now):
+        pending = self._pending
+        while pending and now - pending[0] > self._rto:
+            pending.popleft()
+            self.timeouts += 1
+
+    def feed(self, data):
+        """收到的字节: 按 AF..FA 切帧，每条应答与最早的在途请求配对并回调 on_response"""
+        ring = self._ring
+        ring.extend(data)
+        size = AF_RESPONSE.size
+        while len(ring) >= size:
+            index = ring.find(_SYNC)
+            if index == -1:
+                self.bytes_discarded += len(ring)
+                ring.skip(len(ring))
+                break
+            if index:
+                self.bytes_discarded += index
+                ring.skip(index)
+                if len(ring) < size:
+                    break
+            values = AF_RESPONSE.decode(ring.peek(size))
+            if values is None:
+                self.malformed += 1
+                self.bytes_discarded += 1
+                ring.skip(1)
+                continue
+            ring.skip(size)
+            self._matched(values)
+
+    def _matched(self, values):
+        now = time.monotonic()
+        self.responses += 1
+        if self._pending:
+            rtt = now - self._pending.popleft()
+            self.rtt_last = rtt
+            self.rtt_max = max(self.rtt_max, rtt)
+            self._rtt_sum += rtt
+            self._rtt_count += 1
+            self._update_rto(rtt)
+        else:
+            self.unsolicited += 1
+            rtt = None
+        if self.on_response is not None:
+            self.on_response(self._wall0 + (now - self._mono0), values, rtt)
+
+    def _update_rto(self, rtt):
+        if self._srtt is None:
+            self._srtt, self._rttvar = rtt, rtt / 2
+        else:
+            self._rttvar += 0.25 * (abs(self._srtt - rtt) - self._rttvar)
+            self._srtt += 0.125 * (rtt - self._srtt)
+        self._rto = min(self.timeout_s, max(MIN_TIMEOUT_S, self._srtt + 4 * self._rttvar))
+
+    # --- 统计 ---
+
+    def stats(self):
+        """返回计数器快照，速率和平均往返时间按距离上次调用的区间计算"""
+        now = time.monotonic()
+        last_time, last_responses, last_sent, last_rtt_sum, last_rtt_count = self._last_stats
+        elapsed = max(now - last_time, 1e-9)
+        self._last_stats = (now, self.responses, self.requests_sent, self._rtt_sum, self._rtt_count)
+        matched = self._rtt_count - last_rtt_count
+        return {
+            'rate_hz': self.rate_hz,
+            'max_in_flight': self.max_in_flight,
+            'requests_sent': self.requests_sent,
+            'responses': self.responses,
+            'timeouts': self.timeouts,
+            'malformed': self.malformed,
+            'unsolicited': self.unsolicited,
+            'skipped': self.skipped,
+            'bytes_discarded': self.bytes_discarded,
+            'in_flight': len(self._pending),
+            'requests_per_s': (self.requests_sent - last_sent) / elapsed,
+            'responses_per_s': (self.responses - last_responses) / elapsed,
+            'rtt_mean': (self._rtt_sum - last_rtt_sum) / matched if matched else 0.0,
+            'rtt_max': self.rtt_max,
+            'timeout_s': self._rto,
+        }
+
+
+def _readable_waiter(port):
+    """返回 wait(秒) -> select 是否报告可读 的函数，不改串口的超时设置"""
+    if os.name == 'posix':
+        try:
+            fd = port.fileno()
+        except (AttributeError, OSError, ValueError):
+            fd = None
+        if fd is not None:
+            return lambda wait: bool(select.select([fd], [], [], wait)[0])
+
+    def sleep_then_check(wait):
+        time.sleep(min(wait, _POLL_SLEEP_S))
+        return False
+    return sleep_then_check
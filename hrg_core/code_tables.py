@@ -0,0 +1,91 @@
+# 文件名: hrg_core/code_tables.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# ADC 码换算查找表: 12 位 ADC 码只有 4096 种取值，
+# 所以“码 -> 电压 -> 标定物理量”的换算可以预先算好，
+# 解析时直接按码取值，不再逐样本做除法、乘法和 linear_map。
+#
+# 每张表同时提供两种形式:
+#   - Python 列表 (voltages / values)，单帧解析时 table.values[code] 取值
+#   - NumPy 数组 (voltage_array / value_array)，批量解析时 gather() 一次取出整列
+# 修改 v_ref 或 mapping 会自动重建表。
+
+import numpy as np
+
+from hrg_core.protocol import ADC_FULL_SCALE
+
+ADC_CODES = 4096  # 12 位 ADC 码的取值个数
+
+
+def linear_map(value, from_min, from_max, to_min, to_max):
+    """线性标定，与各上位机原来的 linear_map 相同；value 可以是标量或 NumPy 数组"""
+    if (from_max - from_min) == 0:
+        return to_min + value * 0
+    normalized_value = (value - from_min) / (from_max - from_min)
+    return to_min + normalized_value * (to_max - to_min)
+
+
+class ChannelTable:
+    """
+    一个 ADC 通道的换算表。
+    v_ref:   参考电压，电压 = (码 / 4095.0) * v_ref
+    mapping: 可选的线性标定 (电压下限, 电压上限, 物理量下限, 物理量上限)；
+             为 None 时 values 与 voltages 相同
+    """
+
+    def __init__(self, v_ref, mapping=None, full_scale=ADC_FULL_SCALE):
+        self._v_ref = v_ref
+        self._mapping = tuple(mapping) if mapping is not None else None
+        self.full_scale = full_scale
+        self._rebuild()
+
+    def __len__(self):
+        return ADC_CODES
+
+    def __repr__(self):
+        return f"ChannelTable(v_ref={self._v_ref!r}, mapping={self._mapping!r})"
+
+    @property
+    def v_ref(self):
+        return self._v_ref
+
+    @v_ref.setter
+    def v_ref(self, v_ref):
+        if v_ref != self._v_ref:
+            self._v_ref = v_ref
+            self._rebuild()
+
+    @property
+    def mapping(self):
+        return self._mapping
+
+    @mapping.setter
+    def mapping(self, mapping):
+        mapping = tuple(mapping) if mapping is not None else None
+        if mapping != self._mapping:
+            self._mapping = mapping
+            self._rebuild()
+
+    def _rebuild(self):
+        codes = np.arange(ADC_CODES, dtype=np.float64)
+        voltage_array = (codes / self.full_scale) * self._v_ref
+        if self._mapping is None:
+            value_array = voltage_array
+        else:
+            value_array = linear_map(voltage_array, *self._mapping)
+        voltage_array.flags.writeable = False
+        value_array.flags.writeable = False
+        # 先算好新表再替换引用，工作线程不会读到算了一半的表
+        self.voltages, self.values = voltage_array.tolist(), value_array.tolist()
+        self.voltage_array, self.value_array = voltage_array, value_array
+
+    def convert(self, code):
+        """按公式换算任意码（包括超出 12 位的），返回 (电压, 物理量)；热路径请直接查表"""
+        voltage = (code / self.full_scale) * self._v_ref
+        if self._mapping is None:
+            return voltage, voltage
+        return voltage, linear_map(voltage, *self._mapping)
+
+    def gather(self, codes):
+        """NumPy 批量查表: codes 为 0..4095 的整数数组，返回 (电压数组, 物理量数组)"""
+        return self.voltage_array[codes], self.value_array[codes]
@@ -0,0 +1,178 @@
+# 文件名: hrg_core/csv_sink.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 采集数据的流式 CSV 记录，取代 Serial Monitor 里的 csv_buffer 列表 + 每 600 行新建一个归档文件。
+# 与 log_sink.LogSink 同样的结构: 任何线程调用 write() 只是把一行放进有界队列，
+# 由独立的写文件线程批量追加到本次会话的 CSV 文件（带缓冲写入，定时刷盘）。
+# 每次会话一个文件，超过大小上限就滚动到下一个分段，写完的分段可以选择用 gzip 压缩:
+#   log_20250101_120000.csv -> log_20250101_120000_002.csv -> ...
+# 与界面日志窗口显示多少行无关。
+
+import csv
+import datetime
+import gzip
+import io
+import os
+import queue
+import shutil
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024  # 单个分段上限，超过则滚动
+DEFAULT_QUEUE_SIZE = 100000           # 队列满时丢弃新行并计数，绝不阻塞调用方
+FLUSH_INTERVAL_S = 1.0                # 空闲时最长多久刷一次盘
+WRITE_BUFFER_BYTES = 256 * 1024
+_BATCH_MAX = 5000                     # 每次从队列最多取多少行一起写
+
+_STOP = object()
+
+
+class CsvSink:
+    """
+    一次采集会话的 CSV 文件 + 写文件线程。
+
+    write(row) 线程安全且不阻塞，row 是字段序列（已经格式化好的字符串或数字）；
+    close() 写完队列中剩余的行、刷盘后关闭文件，可以重复调用。close() 开始之后到达的行
+    不再入队，和队列满时一样计入 dropped，不会在停止标记之后悄悄丢失。
+    每个分段都以 header 开头，单独打开也是完整的 CSV。
+    """
+
+    def __init__(self, directory, header, prefix="log", max_bytes=DEFAULT_MAX_BYTES, compress=False,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        self.directory = directory
+        self.header = list(header)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.dropped = 0          # 队列满或已关闭而丢弃的行数
+        self.rows_written = 0
+        self.segments = []        # 本次会话已写过的文件（压缩后为 .csv.gz 的路径）
+        self.error = None         # 写文件线程遇到的 OSError，出错后不再写入
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._session = None
+        self._file = None
+        self._file_bytes = 0
+        self._header_bytes = 0
+        self._thread = None
+        self._closing = False     # close() 已开始，受 _lock 保护
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """当前正在写的文件"""
+        return self.segments[-1] if self.segments else None
+
+    # --- 生命周期 ---
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._session = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="CsvSink", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """停止写文件线程，剩余的行写完后关闭文件"""
+        with self._lock:
+            if self._thread is None or self._closing:
+                return
+            self._closing = True  # 此后 write() 不再入队，停止标记一定是最后一项
+        self._queue.put(_STOP)  # 停止标记必须送达，这里允许阻塞
+        self._thread.join()
+        self._thread = None
+
+    # --- 生产者接口 ---
+
+    def write(self, row):
+        """把一行放入队列，立即返回；队列已满或已关闭时丢弃并返回 False"""
+        with self._lock:
+            if self._thread is None or self._closing:
+                self.dropped += 1
+                return False
+            try:
+                self._queue.put_nowait(row)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                return False
+
+    # --- 写文件线程 ---
+
+    def _run(self):
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=FLUSH_INTERVAL_S)
+            except queue.Empty:
+                item = None
+            # 一次取走队列里已有的行，合并成一次写入
+            rows = []
+            while item is not None:
+                if item is _STOP:
+                    running = False
+                    break
+                rows.append(item)
+                if len(rows) >= _BATCH_MAX:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            if self.error is not None:
+                continue  # 出错后只清空队列，等待 close()
+            try:
+                if rows:
+                    self._write_rows(rows)
+                now = time.monotonic()
+                if not running or now - last_flush >= FLUSH_INTERVAL_S:
+                    self._file.flush()
+                    last_flush = now
+            except OSError as e:
+                self.error = e
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError as e:
+                self.error = self.error or e
+            self._file = None
+
+    def _write_rows(self, rows):
+        text = io.StringIO()
+        csv.writer(text).writerows(rows)
+        data = text.getvalue().encode('utf-8')
+        if self.max_bytes and self._file_bytes + len(data) > self.max_bytes and self._file_bytes > self._header_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file_bytes += len(data)
+        self.rows_written += len(rows)
+
+    # --- 分段 ---
+
+    def _open(self):
+        index = len(self.segments) + 1
+        suffix = f"_{index:03d}" if index > 1 else ""
+        path = os.path.join(self.directory, f"{self.prefix}_{self._session}{suffix}.csv")
+        self._file = open(path, 'wb', buffering=WRITE_BUFFER_BYTES)
+        text = io.StringIO()
+        csv.writer(text).writerow(self.header)
+        header = text.getvalue().encode('utf-8')
+        self._file.write(header)
+        self._header_bytes = self._file_bytes = len(header)
+        self.segments.append(path)
+
+    def _rotate(self):
+        self._file.close()
+        if self.compress:
+            self.segments[-1] = _gzip_file(self.segments[-1])
+        self._open()
+
+
+def _gzip_file(path):
+    """把写完的分段压缩成 path.gz 并删除原文件，返回新路径"""
+    target = path + '.gz'
+    with open(path, 'rb') as source, gzip.open(target, 'wb') as destination:
+        shutil.copyfileobj(source, destination)
+    os.remove(path)
+    return target
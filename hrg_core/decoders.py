@@ -0,0 +1,411 @@
+# 文件名: hrg_core/decoders.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 与界面无关的流式解码器: 喂进串口读到的原始字节，吐出解码好的样本数组。
+# 帧同步 (狩猎/同步两种状态)、批量解码、查表换算和调试信息都在这里，
+# Qt 上位机、命令行采集程序和多串口采集都共用同一套逻辑。
+#
+#   Multi8Decoder  Multi_channel_ADC 的 8 通道电压
+#   HybridDecoder  Hybride_Digital_2ADC 的 O1/O2 物理量 + CH3 数字传感器
+#   FFDecoder      serial_debug_tool.py 的 FF 帧头 3 字节包
+#   AFPollDecoder  Serial Monitor v1.py 的 AF..FA 应答（需要定时发送 poll_request）
+#
+# 狩猎时用 FrameLayout.frame_starts() 一次检查缓冲区里所有可能的帧起点（帧头/帧尾和各通道号），
+# 连续 confirm_frames 帧都对得上才进入同步，碰巧像帧头的数据很难造成误锁定。
+#
+# 协议错误只在出错处累加整数计数器（按第一个不符的字段分类），
+# 每 report_interval_s 秒至多汇总成一条调试信息，附带几帧坏帧样本；
+# 链路再差，每秒的调试信息条数也是固定的，不会随丢弃的字节数增长。
+
+import time
+
+import numpy as np
+
+from hrg_core.frame_ring import FrameRing
+from hrg_core.protocol import (MULTI8, HYBRID, FF_PACKET, AF_RESPONSE, AF_POLL_REQUEST, V_REF, FF_V_REF,
+                               ADC_FULL_SCALE)
+from hrg_core.code_tables import ChannelTable, ADC_CODES
+from hrg_core.diagnostics import Diagnostics, hex_dump, FRAMES, PROTOCOL, STATE, INFO, WARNING
+
+HUNTING = "HUNTING"  # 狩猎模式: 寻找包头（通道1的高4位，或固定的帧头字节）
+SYNCED = "SYNCED"    # 同步模式: 按帧长批量解码
+
+# Hybride_Digital_2ADC 的线性标定: (电压下限, 电压上限, 物理量下限, 物理量上限)
+O1_PRESSURE_MAP = (1.5, 3.0, 100, 1000)     # O1(CH2) 电压 -> 压力 KPa
+O2_TEMPERATURE_MAP = (1.5, 3.0, -30, 200)   # O2(CH1) 电压 -> 温度 ℃
+
+DEFAULT_REPORT_INTERVAL_S = 1.0
+DEFAULT_ERROR_SAMPLES = 3
+LENGTH_ERROR = "帧长度"
+
+
+def _frame_text(frame):
+    return f"[接收成功] Frame: {hex_dump(frame)}"
+
+
+def _raw_frame_text(frame):
+    return f"--> 原始数据帧: {hex_dump(frame)}"
+
+
+def _error_summary_text(elapsed, frames, errors, sync_losses, discarded, reasons, state):
+    text = (f"[协议统计] {elapsed:.1f} 秒内: 接收 {frames} 帧, 协议错误 {errors}, "
+            f"失步 {sync_losses} 次, 丢弃 {discarded} 字节, 当前{'同步' if state == SYNCED else '狩猎'}")
+    if reasons:
+        text += " (" + ", ".join(f"{reason} {count}" for reason, count in reasons) + ")"
+    return text
+
+
+class FrameDecoder:
+    """
+    流式解码器基类。子类给出帧格式 layout、输出字段 fields/units，并实现
+    convert()（批量: 原始值数组 -> 输出数组）和 convert_one()（单帧: 原始值元组 -> 输出元组）。
+
+    feed(data) 返回本次新解出的 (N, len(fields)) float64 数组，没有完整帧时 N 为 0。
+    """
+
+    layout = None
+    fields = ()
+    units = ()
+    resync_skip = 1          # 同步丢失时，坏帧之前的好帧之外再丢弃的字节数
+    report_raw_frame = False  # 协议错误时是否另起一行打印原始帧
+    sync_byte = None         # 帧以固定字节开头时给出，狩猎时先用 find 跳过帧头之前的字节
+    confirm_frames = 3       # 狩猎时要求连续这么多帧校验通过才进入同步
+    poll_request = None      # 应答式协议需要定时发送的请求
+    report_interval_s = DEFAULT_REPORT_INTERVAL_S  # 协议错误汇总的最短间隔
+    error_samples = DEFAULT_ERROR_SAMPLES          # 每条汇总附带的坏帧样本数，0 为不附带
+
+    def __init__(self, diagnostics=None):
+        self.diagnostics = diagnostics or Diagnostics(lambda record: None)
+        self.state = HUNTING
+        self._ring = FrameRing()
+        self._sync = bytes([self.sync_byte]) if self.sync_byte is not None else None
+        self._empty = np.empty((0, len(self.fields)), dtype=np.float64)
+        self.frames_decoded = 0
+        self.sync_losses = 0
+        self.protocol_errors = 0  # 校验失败的帧数（同步时的坏帧和单帧接口）
+        self.bytes_discarded = 0  # 狩猎和重同步时丢弃的字节数
+        self.error_counts = {}    # 错误类别 (Field.error_label 或 LENGTH_ERROR) -> 次数
+        self._error_frames = []   # 本次汇总之前的坏帧样本
+        self._reported = (0, 0, 0, 0, {})  # 上次汇总时的 (帧数, 协议错误, 失步, 丢弃字节, 分类计数)
+        self._last_report = time.monotonic()
+        self._states_reported = set()  # 本次汇总之前已经发过的状态变化信息
+        self.probe = None         # pipeline_stats.PipelineProbe，启用时累加批量解码的耗时
+
+    def reset(self):
+        """清空缓冲区，回到狩猎模式（每次重新打开串口时调用）"""
+        self.state = HUNTING
+        self._ring.clear()
+
+    # --- 子类实现 ---
+
+    def convert(self, raw):
+        raise NotImplementedError
+
+    def convert_one(self, raw):
+        raise NotImplementedError
+
+    def calibration(self):
+        """写进录制文件头的标定信息"""
+        return {}
+
+    @property
+    def v_ref(self):
+        return V_REF
+
+    # --- 单帧 ---
+
+    def decode_one(self, frame):
+        """解码一帧，返回输出元组；无效帧计入协议错误并返回 None"""
+        raw = self.layout.unpack(frame)
+        if raw is None:
+            self._count_error(frame)
+            return None
+        return self.convert_one(raw)
+
+    def _count_error(self, frame):
+        self.protocol_errors += 1
+        field = self.layout.error_field(frame)
+        reason = field.error_label if field is not None else LENGTH_ERROR
+        self.error_counts[reason] = self.error_counts.get(reason, 0) + 1
+        if len(self._error_frames) < self.error_samples and self.diagnostics.enabled(PROTOCOL, WARNING):
+            # frame 可能指向环形缓冲区，拷贝一份留到汇总时再交给日志线程格式化
+            self._error_frames.append(bytes(frame))
+
+    def report_errors(self):
+        """
+        把上次汇总以来的计数作为一条协议统计发出，后面跟着样本坏帧；没有新错误和丢弃字节时不发。
+        feed() 每 report_interval_s 秒自动调用，停止采集时再调用一次把最后一段发出去。
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_report
+        self._last_report = now
+        frames, errors, sync_losses, discarded, counts = self._reported
+        if self.protocol_errors == errors and self.bytes_discarded == discarded:
+            return
+        reasons = tuple((reason, count - counts.get(reason, 0))
+                        for reason, count in self.error_counts.items() if count != counts.get(reason, 0))
+        self._reported = (self.frames_decoded, self.protocol_errors, self.sync_losses, self.bytes_discarded,
+                          dict(self.error_counts))
+        samples, self._error_frames = self._error_frames, []
+        self._states_reported.clear()
+        self.diagnostics.warning(PROTOCOL, _error_summary_text, elapsed, self.frames_decoded - frames,
+                                 self.protocol_errors - errors, self.sync_losses - sync_losses,
+                                 self.bytes_discarded - discarded, reasons, self.state)
+        for frame in samples:
+            self.diagnostics.warning(PROTOCOL, self._protocol_error_text, frame)
+            if self.report_raw_frame:
+                self.diagnostics.warning(PROTOCOL, _raw_frame_text, frame)
+
+    def _state_changed(self, level, text):
+        """同步/失步信息每个汇总周期每种只发一条，其余的只体现在协议统计的失步次数里"""
+        if text not in self._states_reported:
+            self._states_reported.add(text)
+            self.diagnostics.log(STATE, level, text)
+
+    def _protocol_error_text(self, frame):
+        return f"[协议错误] {self.layout.describe_error(frame)}"
+
+    def _dump_frames(self, frames, count):
+        size = self.layout.size
+        for i in range(count):
+            self.diagnostics.debug(FRAMES, _frame_text, bytes(frames[i * size:(i + 1) * size]))
+
+    # --- 流式 ---
+
+    def _discard(self, n):
+        self.bytes_discarded += n
+        self._ring.skip(n)
+
+    def _hunt(self):
+        """
+        找到第一个之后连续 confirm_frames 帧都校验通过的起点，丢弃它之前的字节并返回 True；
+        数据还不够判断时只丢弃已经排除的字节，返回 False 等待更多数据。
+        """
+        ring = self._ring
+        size = self.layout.size
+        if self._sync is not None:
+            index = ring.find(self._sync)
+            if index == -1:
+                self._discard(len(ring))
+                return False
+            self._discard(index)
+        valid = self.layout.frame_starts(np.frombuffer(ring.peek(), dtype=np.uint8))
+        # 前 decided 个起点后面的 confirm_frames 帧都已经到齐，可以下结论
+        decided = len(valid) - (self.confirm_frames - 1) * size
+        if decided > 0:
+            confirmed = valid[:decided]
+            for k in range(1, self.confirm_frames):
+                confirmed = confirmed & valid[k * size:k * size + decided]
+            index = int(np.argmax(confirmed))
+            if confirmed[index]:
+                self._discard(index)
+                return True
+        # 没有确认的起点: 丢到第一个还没下结论的候选为止
+        decided = max(decided, 0)
+        pending = np.flatnonzero(valid[decided:])
+        self._discard(decided + int(pending[0]) if len(pending) else len(valid))
+        return False
+
+    def feed(self, data):
+        ring = self._ring
+        ring.extend(data)
+        size = self.layout.size
+        decoded = []
+        probe = self.probe if self.probe is not None and self.probe.enabled else None
+        while len(ring) >= 2:  # 至少要有2个字节才能开始判断
+            if self.state == HUNTING:
+                if not self._hunt():
+                    break  # 缓冲区里还确认不了帧头，等待更多数据
+                self.state = SYNCED
+                self._state_changed(INFO, "[状态] 帧同步成功，进入同步模式。")
+            else:
+                # 同步模式: 一次性批量解码缓冲区内所有完整帧
+                n_frames = len(ring) // size
+                if n_frames == 0:
+                    break
+                frames = ring.peek(n_frames * size)
+                if probe is not None:
+                    t0 = probe.clock()
+                raw, valid = self.layout.unpack_many(frames)
+                # 第一个无效帧之前的帧都可以直接输出
+                n_good = n_frames if valid.all() else int(np.argmin(valid))
+                if n_good:
+                    decoded.append(self.convert(raw[:n_good]))
+                    if probe is not None:
+                        probe.decode_ns += probe.clock() - t0
+                    if self.diagnostics.frames_enabled:
+                        self._dump_frames(frames, n_good)
+                if n_good < n_frames:
+                    # 同步丢失！用逐帧解析报告具体的协议错误，然后回到狩猎模式
+                    self.decode_one(frames[n_good * size:(n_good + 1) * size])
+                    self.state = HUNTING
+                    self.sync_losses += 1
+                    self._state_changed(WARNING, "[状态] 同步丢失！回到狩猎模式...")
+                    ring.skip(n_good * size)
+                    self._discard(self.resync_skip)
+                else:
+                    ring.skip(n_frames * size)
+
+        if not decoded:
+            rows = self._empty
+        else:
+            rows = decoded[0] if len(decoded) == 1 else np.concatenate(decoded)
+            self.frames_decoded += len(rows)
+        if self.protocol_errors != self._reported[1] or self.bytes_discarded != self._reported[3]:
+            if time.monotonic() - self._last_report >= self.report_interval_s:
+                self.report_errors()
+        return rows
+
+
+class Multi8Decoder(FrameDecoder):
+    """8 通道电压"""
+
+    layout = MULTI8
+    fields = MULTI8.value_names  # ch1..ch8
+    units = ('V',) * len(MULTI8.value_names)
+
+    def __init__(self, diagnostics=None, v_ref=V_REF):
+        super().__init__(diagnostics)
+        # 8 个通道共用同一参考电压，按 ADC 码直接查表
+        self.voltage_table = ChannelTable(v_ref)
+
+    @property
+    def v_ref(self):
+        return self.voltage_table.v_ref
+
+    @v_ref.setter
+    def v_ref(self, v_ref):
+        self.voltage_table.v_ref = v_ref
+
+    def set_calibration(self, v_ref=None):
+        """与 HybridDecoder.set_calibration 同样的接口，便于跨进程转发"""
+        if v_ref is not None:
+            self.v_ref = v_ref
+
+    def convert(self, raw):
+        return self.voltage_table.voltage_array[raw]
+
+    def convert_one(self, raw):
+        lookup = self.voltage_table.voltages
+        return tuple(lookup[code] for code in raw)
+
+    def calibration(self):
+        return {'adc_full_scale': int(ADC_FULL_SCALE)}
+
+
+class HybridDecoder(FrameDecoder):
+    """
+    O2(CH1) 电压/温度、O1(CH2) 电压/压力、CH3 压力/温度；CH6-8 只做通道号校验。
+    """
+
+    layout = HYBRID
+    fields = ('o1_voltage', 'o1_pressure', 'o2_voltage', 'o2_temperature', 'ch3_pressure', 'ch3_temperature')
+    units = ('V', 'KPa', 'V', '℃', 'KPa', '℃')
+    report_raw_frame = True
+
+    def __init__(self, diagnostics=None, v_ref=V_REF, o1_pressure_map=O1_PRESSURE_MAP,
+                 o2_temperature_map=O2_TEMPERATURE_MAP):
+        super().__init__(diagnostics)
+        # 换算表: O2 接 CH1 (电压->温度)，O1 接 CH2 (电压->压力)
+        self.o2_table = ChannelTable(v_ref, o2_temperature_map)
+        self.o1_table = ChannelTable(v_ref, o1_pressure_map)
+        self.ch3_temperature_scale = HYBRID.scales[HYBRID.value_names.index('ch3_temperature')]
+
+    @property
+    def v_ref(self):
+        return self.o1_table.v_ref
+
+    def set_calibration(self, v_ref=None, o1_pressure_map=None, o2_temperature_map=None):
+        """修改参考电压或标定区间，换算表随之重建；运行中调用下一帧即生效"""
+        if v_ref is not None:
+            self.o1_table.v_ref = v_ref
+            self.o2_table.v_ref = v_ref
+        if o1_pressure_map is not None:
+            self.o1_table.mapping = o1_pressure_map
+        if o2_temperature_map is not None:
+            self.o2_table.mapping = o2_temperature_map
+
+    def convert(self, raw):
+        # raw 的列: CH1 码, CH2 码, CH3 压力, CH3 温度(0.1℃), CH6, CH7, CH8
+        o1, o2 = self.o1_table, self.o2_table
+        code_o2, code_o1 = raw[:, 0], raw[:, 1]
+        out = np.empty((len(raw), len(self.fields)), dtype=np.float64)
+        out[:, 0] = o1.voltage_array[code_o1]
+        out[:, 1] = o1.value_array[code_o1]
+        out[:, 2] = o2.voltage_array[code_o2]
+        out[:, 3] = o2.value_array[code_o2]
+        out[:, 4] = raw[:, 2]
+        out[:, 5] = raw[:, 3] * self.ch3_temperature_scale
+        return out
+
+    def convert_one(self, raw):
+        code_o2, code_o1, pressure_ch3, temperature_ch3 = raw[:4]
+        o1, o2 = self.o1_table, self.o2_table
+        return (o1.voltages[code_o1], o1.values[code_o1], o2.voltages[code_o2], o2.values[code_o2],
+                float(pressure_ch3), temperature_ch3 * self.ch3_temperature_scale)
+
+    def calibration(self):
+        return {
+            'o1_pressure_map': self.o1_table.mapping,
+            'o2_temperature_map': self.o2_table.mapping,
+            'ch3_temperature_scale': self.ch3_temperature_scale,
+        }
+
+
+class FFDecoder(FrameDecoder):
+    """FF 帧头 + 12 位数值，输出 ADC 码和电压 (2.998V 参考)"""
+
+    layout = FF_PACKET
+    fields = ('adc', 'voltage')
+    units = ('', 'V')
+    sync_byte = FF_PACKET.fields[0].expected
+    confirm_frames = 1  # 调试工具里的包可能零星到达，不等后续的包
+
+    def __init__(self, diagnostics=None, v_ref=FF_V_REF):
+        super().__init__(diagnostics)
+        self.voltage_table = ChannelTable(v_ref)
+
+    @property
+    def v_ref(self):
+        return self.voltage_table.v_ref
+
+    def convert(self, raw):
+        codes = raw[:, 0]
+        out = np.empty((len(raw), 2), dtype=np.float64)
+        out[:, 0] = codes
+        out[:, 1] = self.voltage_table.voltage_array[np.minimum(codes, ADC_CODES - 1)]
+        wide = codes >= ADC_CODES
+        if wide.any():
+            # 超出 12 位的值只会出现在损坏的包里，按公式换算
+            out[wide, 1] = codes[wide] / self.voltage_table.full_scale * self.voltage_table.v_ref
+        return out
+
+    def convert_one(self, raw):
+        code = raw[0]
+        voltage = self.voltage_table.voltages[code] if code < ADC_CODES else self.voltage_table.convert(code)[0]
+        return float(code), voltage
+
+
+class AFPollDecoder(FrameDecoder):
+    """AF 压力(u16) 温度(s16, 0.1℃) FA 应答；调用方需要定时发送 poll_request"""
+
+    layout = AF_RESPONSE
+    fields = ('pressure', 'temperature')
+    units = ('KPa', '℃')
+    sync_byte = AF_RESPONSE.fields[0].expected
+    poll_request = AF_POLL_REQUEST
+    confirm_frames = 1  # 一问一答，下一帧要等下一次请求
+
+    def convert(self, raw):
+        return raw * np.asarray(self.layout.scales)
+
+    def convert_one(self, raw):
+        return self.layout.scale(raw)
+
+    def calibration(self):
+        return {'temperature_scale': self.layout.scales[1]}
+
+
+DECODERS = {'multi8': Multi8Decoder, 'hybrid': HybridDecoder, 'ff': FFDecoder, 'af_poll': AFPollDecoder}
+# 设备自己连续发送的协议；应答式协议 (poll_request 非空) 只有 AcquisitionHub 会发请求
+STREAMING_DECODERS = {name: cls for name, cls in DECODERS.items() if cls.poll_request is None}
@@ -0,0 +1,132 @@
+# 文件名: hrg_core/diagnostics.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 结构化调试信息: 每条信息带类别和级别，按“总级别 + 分类开关”过滤。
+# 被过滤掉的信息在调用处就返回，不拼字符串、不发信号；
+# 通过的信息也只保存格式和参数，真正的字符串在消费方（日志线程）调用 str() 时才生成，
+# 不占用采集线程的时间。
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+# 类别
+FRAMES = 'frames'        # 逐帧的原始数据转储
+PROTOCOL = 'protocol'    # 协议校验失败
+STATE = 'state'          # 同步/失步等状态变化
+IO = 'io'                # 串口、录制文件
+CATEGORIES = (FRAMES, PROTOCOL, STATE, IO)
+CATEGORY_LABELS = {FRAMES: '帧转储', PROTOCOL: '协议错误', STATE: '状态变化', IO: '串口/文件'}
+
+DEFAULT_LEVEL = DEBUG
+# 逐帧转储量太大，默认关闭，需要时在界面上打开
+DEFAULT_ENABLED = {FRAMES: False, PROTOCOL: True, STATE: True, IO: True}
+
+
+def hex_dump(data):
+    """字节 -> 'AF 01 FA' 形式的十六进制文本"""
+    return bytes(data).hex(' ').upper()
+
+
+class DiagRecord:
+    """
+    一条延迟格式化的调试信息。
+    fmt 是 %-格式字符串，或者接收 args 并返回字符串的函数；
+    str(record) 第一次调用时才格式化，结果会缓存。
+    """
+
+    __slots__ = ('category', 'level', 'fmt', 'args', '_text')
+
+    def __init__(self, category, level, fmt, args):
+        self.category = category
+        self.level = level
+        self.fmt = fmt
+        self.args = args
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            if callable(self.fmt):
+                self._text = self.fmt(*self.args)
+            elif self.args:
+                self._text = self.fmt % self.args
+            else:
+                self._text = self.fmt
+        return self._text
+
+    def __repr__(self):
+        return f"DiagRecord({self.category!r}, {LEVEL_NAMES.get(self.level, self.level)}, {str(self)!r})"
+
+
+class Diagnostics:
+    """
+    调试信息的过滤和分发。
+    emit: 接收 DiagRecord 的回调，例如 QThread 的 debug_message.emit。
+
+    热路径上先用 enabled(category) 判断，关闭时连参数都不必准备:
+        if diag.enabled(FRAMES):
+            diag.log(FRAMES, DEBUG, hex_dump, bytes(frame))
+    """
+
+    def __init__(self, emit, level=DEFAULT_LEVEL, enabled=None):
+        self._emit = emit
+        self._level = level
+        self._switches = dict(DEFAULT_ENABLED)
+        if enabled:
+            self._switches.update(enabled)
+        # 每个类别实际放行的最低级别，关闭的类别为无穷大；log() 只需一次查表和比较
+        self._thresholds = {}
+        self._rebuild()
+
+    def _rebuild(self):
+        self._thresholds = {category: (self._level if on else float('inf'))
+                            for category, on in self._switches.items()}
+        # 供热路径直接读取的布尔值
+        self.frames_enabled = self._thresholds.get(FRAMES, float('inf')) <= DEBUG
+
+    # --- 配置 ---
+
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, level):
+        self._level = level
+        self._rebuild()
+
+    def set_enabled(self, category, on):
+        self._switches[category] = bool(on)
+        self._rebuild()
+
+    @property
+    def switches(self):
+        """各类别开关的副本，可用来构造另一个同样配置的 Diagnostics"""
+        return dict(self._switches)
+
+    def is_category_on(self, category):
+        return self._switches.get(category, True)
+
+    def enabled(self, category, level=DEBUG):
+        return level >= self._thresholds.get(category, self._level)
+
+    # --- 发出 ---
+
+    def log(self, category, level, fmt, *args):
+        if level < self._thresholds.get(category, self._level):
+            return
+        self._emit(DiagRecord(category, level, fmt, args))
+
+    def debug(self, category, fmt, *args):
+        self.log(category, DEBUG, fmt, *args)
+
+    def info(self, category, fmt, *args):
+        self.log(category, INFO, fmt, *args)
+
+    def warning(self, category, fmt, *args):
+        self.log(category, WARNING, fmt, *args)
+
+    def error(self, category, fmt, *args):
+        self.log(category, ERROR, fmt, *args)
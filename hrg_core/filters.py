@@ -0,0 +1,160 @@
+# 文件名: hrg_core/filters.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 解码之后、显示和录制之前的数字滤波。
+# 每个滤波器一次处理一整块 (帧数 × 通道数) 的数据，所有通道在同一次 numpy 运算里完成，
+# 块与块之间的状态（历史样本、IIR 输出）保存在滤波器里，分块处理与一次处理整段数据结果相同。
+#
+# 滤波器用一个简短的字符串描述，便于界面选择、跨进程传递和写进录制文件头:
+#   "ma:8"        8 点滑动平均
+#   "iir:0.1"     单极点 IIR (指数平滑)，y += 0.1 * (x - y)
+#   "median:5"    5 点滑动中值，去掉孤立的毛刺
+#   "fir:31:0.05" 31 阶 FIR 低通，截止频率为采样率的 0.05 倍（Hamming 窗函数法设计）
+# 空字符串或 None 表示不滤波。
+
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 界面上的预设: (显示名, 描述字符串)
+FILTER_PRESETS = (
+    ("不滤波", ""),
+    ("滑动平均 8 点", "ma:8"),
+    ("滑动平均 32 点", "ma:32"),
+    ("指数平滑 α=0.1", "iir:0.1"),
+    ("指数平滑 α=0.02", "iir:0.02"),
+    ("中值 5 点", "median:5"),
+    ("FIR 低通 31 阶 (0.05 fs)", "fir:31:0.05"),
+)
+
+
+class _WindowFilter:
+    """需要最近 length-1 个历史样本的滤波器的公共部分"""
+
+    def __init__(self, length):
+        if length < 1:
+            raise ValueError(f"滤波长度必须 >= 1，得到 {length}")
+        self.length = length
+        self._tail = None  # (length-1, 通道数)
+
+    def reset(self):
+        self._tail = None
+
+    def _extend(self, block):
+        """历史样本 + 本块，返回拼接结果并更新历史；第一块用首帧填充历史，避免从 0 开始的过渡"""
+        if self._tail is None:
+            self._tail = np.repeat(block[:1], self.length - 1, axis=0)
+        data = np.concatenate((self._tail, block))
+        self._tail = data[len(data) - (self.length - 1):].copy()
+        return data
+
+    def _windows(self, block):
+        """(帧数, 通道数, length) 的滑动窗口视图"""
+        return sliding_window_view(self._extend(block), self.length, axis=0)
+
+
+class MovingAverage(_WindowFilter):
+    def process(self, block):
+        data = self._extend(block)
+        csum = np.cumsum(data, axis=0)
+        csum = np.concatenate((np.zeros((1, data.shape[1])), csum))
+        return (csum[self.length:] - csum[:-self.length]) / self.length
+
+
+class Median(_WindowFilter):
+    def process(self, block):
+        return np.median(self._windows(block), axis=-1)
+
+
+class FIR(_WindowFilter):
+    def __init__(self, taps):
+        self.taps = np.asarray(taps, dtype=np.float64)
+        super().__init__(len(self.taps))
+
+    def process(self, block):
+        # 窗口内按时间正序排列，卷积需要把系数反过来
+        return self._windows(block) @ self.taps[::-1]
+
+
+class SinglePoleIIR:
+    """y[n] = y[n-1] + alpha * (x[n] - y[n-1])"""
+
+    def __init__(self, alpha):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha 必须在 (0, 1] 之间，得到 {alpha}")
+        self.alpha = alpha
+        self.decay = 1.0 - alpha
+        # 闭式解里要除以 decay^k，分段处理让它不超过 1e8，避免溢出和精度损失
+        self._segment = max(1, int(8 * math.log(10) / -math.log(self.decay))) if self.decay > 0 else 0
+        self._last = None
+
+    def reset(self):
+        self._last = None
+
+    def process(self, block):
+        if self.decay == 0:
+            return block.copy()
+        if self._last is None:
+            self._last = block[0].copy()
+        out = np.empty_like(block)
+        last = self._last
+        for start in range(0, len(block), self._segment):
+            x = block[start:start + self._segment]
+            # y_k = decay^k * (y_0 + alpha * sum_{j<=k} x_j / decay^j)
+            powers = self.decay ** np.arange(1, len(x) + 1)[:, None]
+            y = powers * (last + self.alpha * np.cumsum(x / powers, axis=0))
+            out[start:start + len(x)] = y
+            last = y[-1]
+        self._last = last.copy()
+        return out
+
+
+def design_lowpass(taps, cutoff):
+    """Hamming 窗函数法设计 FIR 低通；cutoff 为截止频率与采样率之比 (0, 0.5)，直流增益为 1"""
+    if not 0 < cutoff < 0.5:
+        raise ValueError(f"截止频率必须在 (0, 0.5) 之间 (相对采样率)，得到 {cutoff}")
+    n = np.arange(taps) - (taps - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return h / h.sum()
+
+
+class FilterStage:
+    """
+    按描述字符串构造的滤波阶段，输入输出都是 (帧数, 通道数) 的 float64 数组。
+    spec 为空时 process() 原样返回。
+    """
+
+    def __init__(self, spec=""):
+        self.spec = spec or ""
+        self._filter = _build(self.spec)
+
+    def __bool__(self):
+        return self._filter is not None
+
+    def reset(self):
+        if self._filter is not None:
+            self._filter.reset()
+
+    def process(self, block):
+        if self._filter is None or len(block) == 0:
+            return block
+        return self._filter.process(np.asarray(block, dtype=np.float64))
+
+
+def _build(spec):
+    if not spec:
+        return None
+    name, *params = spec.split(':')
+    try:
+        if name == 'ma':
+            return MovingAverage(int(params[0]))
+        if name == 'median':
+            return Median(int(params[0]))
+        if name == 'iir':
+            return SinglePoleIIR(float(params[0]))
+        if name == 'fir':
+            return FIR(design_lowpass(int(params[0]), float(params[1])))
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"滤波器描述 {spec!r} 有误: {e}") from None
+    raise ValueError(f"未知滤波器 {name!r}，可选 ma / iir / median / fir")
@@ -0,0 +1,91 @@
+# 文件名: hrg_core/frame_ring.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 取代状态机里的 bytearray.pop(0) 和 frame_buffer[16:] 切片拷贝。
+# 旧写法每丢弃一个字节或取出一帧都要搬动整个缓冲区，积压越多越慢（平方复杂度）。
+
+DEFAULT_CAPACITY = 64 * 1024
+
+
+class FrameRing:
+    """
+    预分配的环形字节缓冲区，用读/写偏移量代替搬移数据。
+
+    - extend()  追加串口读到的新数据
+    - peek(n)   零拷贝地取出开头 n 个字节 (memoryview)
+    - skip(n)   丢弃开头 n 个字节，只移动读偏移，O(1)
+    - find()    在未读数据中查找字节序列
+
+    写偏移走到缓冲区末尾时才把未读数据整体搬回开头（偶尔发生一次），
+    因此 peek() 返回的帧总是连续的。注意: peek() 得到的视图只在下一次
+    extend() 之前有效。
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._read = 0
+        self._write = 0
+
+    def __len__(self):
+        return self._write - self._read
+
+    def __getitem__(self, index):
+        """按相对读偏移取单个字节"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("FrameRing 下标越界")
+        return self._buf[self._read + index]
+
+    @property
+    def capacity(self):
+        return len(self._buf)
+
+    def clear(self):
+        self._read = 0
+        self._write = 0
+
+    def extend(self, data):
+        """追加数据，必要时先压缩（搬回开头），空间仍不够才扩容"""
+        n = len(data)
+        if self._write + n > len(self._buf):
+            self._compact(n)
+        self._buf[self._write:self._write + n] = data
+        self._write += n
+
+    def peek(self, n=None):
+        """零拷贝地返回开头 n 个字节（默认全部未读数据）"""
+        end = self._write if n is None else min(self._read + n, self._write)
+        return self._view[self._read:end]
+
+    def skip(self, n):
+        """丢弃开头 n 个字节"""
+        self._read = min(self._read + n, self._write)
+        if self._read == self._write:
+            # 读空了，直接归零，省去以后的压缩
+            self._read = 0
+            self._write = 0
+
+    def find(self, sub, start=0):
+        """返回 sub 相对读偏移的位置，找不到返回 -1"""
+        index = self._buf.find(sub, self._read + start, self._write)
+        return index - self._read if index != -1 else -1
+
+    def _compact(self, incoming):
+        unread = self._write - self._read
+        needed = unread + incoming
+        if needed > len(self._buf):
+            # 积压超过容量，按两倍扩容（罕见路径）
+            capacity = len(self._buf)
+            while capacity < needed:
+                capacity *= 2
+            new_buf = bytearray(capacity)
+            new_buf[:unread] = self._view[self._read:self._write]
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+        elif self._read:
+            # 先拷出再写回，避免源和目标区间重叠
+            self._buf[:unread] = self._buf[self._read:self._write]
+        self._read = 0
+        self._write = unread
@@ -0,0 +1,334 @@
+# 文件名: hrg_core/hub.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 多串口采集: 一个线程、一个事件循环同时管理 N 块板子（小绿、小黑板、小紫……），
+# 每个串口有自己的解码器 (multi8 / hybrid / ff / af_poll)，共用同一个单调时间基准，
+# 并统计每个串口的吞吐和错误计数。增加板子不会增加轮询线程。
+#
+# POSIX 上用 selectors 等待所有串口的文件描述符；
+# Windows 的 select 不支持串口句柄，退化为在同一个线程里轮询 in_waiting。
+#
+# 命令行用法:
+#   python -m hrg_core.hub 小绿=multi8:/dev/ttyUSB0 小黑板=hybrid:/dev/ttyUSB1 小紫=af_poll:/dev/ttyUSB2 \
+#       --output-dir log --stats-every 5
+
+import argparse
+import os
+import selectors
+import sys
+import threading
+import time
+
+import numpy as np
+import serial
+
+from hrg_core.decoders import DECODERS
+from hrg_core.diagnostics import Diagnostics, IO, INFO, WARNING
+from hrg_core.recording import SessionRecorder, SESSION_EXTENSION
+
+DEFAULT_BAUDRATE = 115200
+DEFAULT_POLL_INTERVAL_S = 0.1  # 应答式协议 (af_poll) 发送请求的间隔
+READ_CHUNK = 65536             # 一次最多取走的字节数
+_IDLE_WAIT_S = 0.05            # 没有数据时事件循环最长等待多久（也是检查停止标志的周期）
+_FALLBACK_POLL_S = 0.002       # 不能 select 串口的平台上，空闲时两次轮询的间隔
+
+
+class PortChannel:
+    """hub 里的一个串口: 端口、解码器和计数器"""
+
+    def __init__(self, name, port_name, decoder, baudrate=DEFAULT_BAUDRATE, poll_interval=DEFAULT_POLL_INTERVAL_S):
+        self.name = name
+        self.port_name = port_name
+        self.decoder = decoder
+        self.baudrate = baudrate
+        self.poll_interval = poll_interval if decoder.poll_request else None
+        self.serial_port = None
+        self.next_poll = 0.0
+        # 计数器
+        self.bytes_read = 0
+        self.requests_sent = 0
+        self.io_errors = 0
+        self._last_stats = (time.monotonic(), 0, 0)  # 上次统计时的 (时刻, 字节数, 帧数)
+
+    @property
+    def frames(self):
+        return self.decoder.frames_decoded
+
+    @property
+    def is_open(self):
+        return self.serial_port is not None and self.serial_port.is_open
+
+    def open(self):
+        # timeout=0: 非阻塞，读到多少算多少，等待交给事件循环
+        self.serial_port = serial.Serial(self.port_name, self.baudrate, timeout=0, write_timeout=0)
+        self.decoder.reset()
+        self.next_poll = time.monotonic()
+
+    def close(self):
+        self.decoder.report_errors()
+        if self.serial_port is not None and self.serial_port.is_open:
+            self.serial_port.close()
+
+    def stats(self):
+        """返回计数器快照，速率按距离上次调用的时间计算"""
+        now = time.monotonic()
+        last_time, last_bytes, last_frames = self._last_stats
+        elapsed = max(now - last_time, 1e-9)
+        self._last_stats = (now, self.bytes_read, self.frames)
+        return {
+            'name': self.name,
+            'port': self.port_name,
+            'protocol': type(self.decoder).__name__,
+            'bytes': self.bytes_read,
+            'frames': self.frames,
+            'bytes_per_s': (self.bytes_read - last_bytes) / elapsed,
+            'frames_per_s': (self.frames - last_frames) / elapsed,
+            'sync_losses': self.decoder.sync_losses,
+            'protocol_errors': self.decoder.protocol_errors,
+            'bytes_discarded': self.decoder.bytes_discarded,
+            'io_errors': self.io_errors,
+            'requests_sent': self.requests_sent,
+        }
+
+
+class AcquisitionHub:
+    """
+    单线程管理多个串口。run() 在调用者的线程里运行直到 stop()。
+
+    回调都在 run() 所在的线程里调用:
+      on_rows(channel, timestamp, rows)  某个串口解出新样本；timestamp 来自共享时间基准
+      on_message(channel_name, record)   该串口的调试信息 (DiagRecord)
+    """
+
+    def __init__(self, on_rows=None, on_message=None, level=INFO, enabled=None):
+        self.channels = []
+        self.on_rows = on_rows
+        self.on_message = on_message
+        self.level = level
+        self.enabled = enabled
+        self.running = False
+        # 共享时间基准: 单调时钟，起点对齐到 time.time()，各串口的时间戳可以直接比较
+        self._mono0 = time.monotonic()
+        self._wall0 = time.time()
+        self._wakeup = None
+
+    def clock(self):
+        return self._wall0 + (time.monotonic() - self._mono0)
+
+    def add_port(self, name, port_name, protocol, baudrate=DEFAULT_BAUDRATE, poll_interval=DEFAULT_POLL_INTERVAL_S):
+        """添加一个串口，protocol 为 DECODERS 中的名字；返回 PortChannel"""
+        diagnostics = Diagnostics(lambda record, name=name: self._message(name, record),
+                                  level=self.level, enabled=self.enabled)
+        channel = PortChannel(name, port_name, DECODERS[protocol](diagnostics), baudrate, poll_interval)
+        self.channels.append(channel)
+        return channel
+
+    def stats(self):
+        return [channel.stats() for channel in self.channels]
+
+    def _message(self, name, record):
+        if self.on_message is not None:
+            self.on_message(name, record)
+
+    # --- 控制 ---
+
+    def stop(self):
+        self.running = False
+        if self._wakeup is not None:
+            try:
+                os.write(self._wakeup[1], b'\0')  # 唤醒正在等待的 select
+            except OSError:
+                pass
+
+    def run(self):
+        """调用前先把 running 置为 True（与 AcquisitionEngine 相同）"""
+        opened = [channel for channel in self.channels if self._open(channel)]
+        try:
+            if os.name == 'nt':
+                self._run_polling(opened)
+            else:
+                self._run_selector(opened)
+        finally:
+            for channel in opened:
+                channel.close()
+                channel.decoder.diagnostics.info(IO, "串口 %s 已关闭。", channel.port_name)
+
+    def _open(self, channel):
+        try:
+            channel.open()
+            channel.decoder.diagnostics.info(IO, "串口 %s 已打开，波特率 %d。", channel.port_name, channel.baudrate)
+            return True
+        except serial.SerialException as e:
+            channel.io_errors += 1
+            channel.decoder.diagnostics.error(IO, "[错误] 打开串口失败: %s", e)
+            return False
+
+    # --- 事件循环 ---
+
+    def _run_selector(self, channels):
+        selector = selectors.DefaultSelector()
+        self._wakeup = os.pipe()
+        os.set_blocking(self._wakeup[0], False)
+        selector.register(self._wakeup[0], selectors.EVENT_READ, None)
+        for channel in channels:
+            selector.register(channel.serial_port.fileno(), selectors.EVENT_READ, channel)
+        try:
+            while self.running:
+                for key, _ in selector.select(self._send_polls(channels)):
+                    channel = key.data
+                    if channel is None:
+                        os.read(self._wakeup[0], 64)
+                    elif not self._read(channel):
+                        selector.unregister(key.fd)
+        finally:
+            selector.close()
+            for fd in self._wakeup:
+                os.close(fd)
+            self._wakeup = None
+
+    def _run_polling(self, channels):
+        while self.running:
+            self._send_polls(channels)
+            busy = False
+            for channel in channels:
+                if channel.is_open and channel.serial_port.in_waiting:
+                    busy = self._read(channel) or busy
+            if not busy:
+                time.sleep(_FALLBACK_POLL_S)
+
+    def _read(self, channel):
+        """取走一个串口已到达的数据并解码；串口出错时关闭它并返回 False"""
+        try:
+            data = channel.serial_port.read(READ_CHUNK)
+        except serial.SerialException as e:
+            channel.io_errors += 1
+            channel.decoder.diagnostics.error(IO, "[错误] 读取串口失败: %s", e)
+            channel.close()
+            return False
+        if data:
+            channel.bytes_read += len(data)
+            rows = channel.decoder.feed(data)
+            if len(rows) and self.on_rows is not None:
+                self.on_rows(channel, self.clock(), rows)
+        return True
+
+    def _send_polls(self, channels):
+        """给到期的应答式串口发请求，返回距离下一次请求的等待时间（供 select 超时用）"""
+        now = time.monotonic()
+        wait = _IDLE_WAIT_S
+        for channel in channels:
+            if channel.poll_interval is None or not channel.is_open:
+                continue
+            if now >= channel.next_poll:
+                try:
+                    channel.serial_port.write(channel.decoder.poll_request)
+                    channel.requests_sent += 1
+                except serial.SerialException as e:  # 包括写超时
+                    channel.io_errors += 1
+                    channel.decoder.diagnostics.warning(IO, "[错误] 发送请求失败: %s", e)
+                channel.next_poll += channel.poll_interval
+                if channel.next_poll < now:
+                    channel.next_poll = now + channel.poll_interval  # 落后太多时不补发
+            wait = min(wait, channel.next_poll - now)
+        return max(wait, 0.0)
+
+
+# --- 命令行 ---
+
+def _parse_port_spec(spec):
+    """'名字=协议:串口' -> (名字, 协议, 串口)"""
+    try:
+        name, rest = spec.split('=', 1)
+        protocol, port_name = rest.split(':', 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"串口格式应为 名字=协议:串口，例如 小绿=multi8:COM5，得到 {spec!r}")
+    if protocol not in DECODERS:
+        raise argparse.ArgumentTypeError(f"未知协议 {protocol}，可选 {', '.join(sorted(DECODERS))}")
+    return name, protocol, port_name
+
+
+class _SessionWriter:
+    """把某个串口的样本写进各自的 .hrgs 会话文件"""
+
+    def __init__(self, path, decoder):
+        self.recorder = SessionRecorder(path, decoder.fields, units=decoder.units,
+                                        v_ref=decoder.v_ref, calibration=decoder.calibration())
+
+    def write(self, timestamp, rows):
+        block = np.empty(len(rows), dtype=self.recorder.dtype)
+        table = block.view('<f8').reshape(len(rows), -1)
+        table[:, 0] = timestamp
+        table[:, 1:] = rows
+        self.recorder.write_block(block)
+
+
+def _format_stats(stats):
+    return (f"[{stats['name']}] {stats['frames_per_s']:.0f} 帧/秒, {stats['bytes_per_s'] / 1024:.1f} KB/s, "
+            f"共 {stats['frames']} 帧, 失步 {stats['sync_losses']}, 协议错误 {stats['protocol_errors']}, "
+            f"丢弃 {stats['bytes_discarded']} 字节, IO错误 {stats['io_errors']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HRG 多串口采集")
+    parser.add_argument('ports', nargs='+', type=_parse_port_spec, metavar='名字=协议:串口')
+    parser.add_argument('--baud', type=int, default=DEFAULT_BAUDRATE, help="波特率 (默认 115200)")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL_S,
+                        help="af_poll 协议的请求间隔秒数 (默认 0.1)")
+    parser.add_argument('--output-dir', help=f"每个串口录制一个 名字_时间{SESSION_EXTENSION} 文件到该目录")
+    parser.add_argument('--stats-every', type=float, default=5.0, help="打印统计的间隔秒数，0 表示只在结束时打印")
+    parser.add_argument('--duration', type=float, default=0.0, help="采集秒数，0 表示直到 Ctrl+C")
+    parser.add_argument('--quiet', action='store_true', help="只显示警告和错误")
+    args = parser.parse_args(argv)
+
+    hub = AcquisitionHub(on_message=lambda name, record: print(f"[{name}] {record}", file=sys.stderr),
+                         level=WARNING if args.quiet else INFO)
+    for name, protocol, port_name in args.ports:
+        hub.add_port(name, port_name, protocol, baudrate=args.baud, poll_interval=args.poll_interval)
+
+    writers = {}
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        for channel in hub.channels:
+            path = os.path.join(args.output_dir, f"{channel.name}_{stamp}{SESSION_EXTENSION}")
+            writers[channel.name] = _SessionWriter(path, channel.decoder)
+        hub.on_rows = lambda channel, timestamp, rows: writers[channel.name].write(timestamp, rows)
+
+    if args.duration:
+        timer = threading.Timer(args.duration, hub.stop)
+        timer.daemon = True
+        timer.start()
+    started = time.monotonic()
+    hub.running = True  # 调用 run() 前先置位
+    # 统计线程: hub.stats() 会更新各串口的区间计数，结束时先停下它再打印总计
+    report_stopped = threading.Event()
+    reporter = None
+    if args.stats_every:
+        def report():
+            while not report_stopped.wait(args.stats_every):
+                for stats in hub.stats():
+                    print(_format_stats(stats), file=sys.stderr)
+        reporter = threading.Thread(target=report, daemon=True)
+        reporter.start()
+
+    try:
+        hub.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.running = False
+        report_stopped.set()
+        if reporter is not None:
+            reporter.join()
+        for writer in writers.values():
+            writer.recorder.close()
+        # 结束时按整个采集时长给出平均速率
+        elapsed = max(time.monotonic() - started, 1e-9)
+        for stats in hub.stats():
+            stats['frames_per_s'] = stats['frames'] / elapsed
+            stats['bytes_per_s'] = stats['bytes'] / elapsed
+            print(_format_stats(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
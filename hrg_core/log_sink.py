@@ -0,0 +1,173 @@
+# 文件名: hrg_core/log_sink.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 异步日志: 任何线程调用 write() 只是把消息放进有界队列，
+# 由独立的写日志线程批量写入同一个滚动日志文件（按大小或时间滚动，带缓冲写入）。
+# 界面不再逐行追加、也不再每几行新建一个归档文件，
+# 只需定时调用 tail() 取最近写入的几行显示。
+
+import collections
+import datetime
+import os
+import queue
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024  # 单个日志文件上限，超过则滚动
+DEFAULT_MAX_AGE_S = 3600.0           # 单个日志文件最长使用时间 (秒)，0 表示不按时间滚动
+DEFAULT_BACKUP_COUNT = 10            # 保留的历史文件个数: name.log.1 ... name.log.N
+DEFAULT_QUEUE_SIZE = 10000           # 队列满时丢弃新消息并计数，绝不阻塞调用方
+DEFAULT_TAIL_SIZE = 500              # tail() 能取到的最近行数
+FLUSH_INTERVAL_S = 0.5               # 空闲时最长多久刷一次盘
+WRITE_BUFFER_BYTES = 64 * 1024
+_BATCH_MAX = 1000                    # 每次从队列最多取多少条一起写
+
+_STOP = object()
+
+
+class LogSink:
+    """
+    单文件滚动日志 + 写日志线程。
+
+    write(message) 线程安全且不阻塞，可以直接连到工作线程的调试信号上；
+    tail(since) 返回 since 序号之后写入的行，供界面定时刷新；
+    close() 写完队列中剩余的消息后关闭文件。
+    """
+
+    def __init__(self, directory, basename="debug", max_bytes=DEFAULT_MAX_BYTES, max_age_s=DEFAULT_MAX_AGE_S,
+                 backup_count=DEFAULT_BACKUP_COUNT, queue_size=DEFAULT_QUEUE_SIZE, tail_size=DEFAULT_TAIL_SIZE):
+        self.directory = directory
+        self.path = os.path.join(directory, basename + ".log")
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.backup_count = backup_count
+        self.dropped = 0          # 队列满而丢弃的消息数
+        self.lines_written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._tail = collections.deque(maxlen=tail_size)
+        self._tail_lock = threading.Lock()
+        self._file = None
+        self._file_bytes = 0
+        self._opened_at = 0.0
+        self._thread = None
+
+    @property
+    def pending(self):
+        """队列里还没写出的消息数"""
+        return self._queue.qsize()
+
+    # --- 生命周期 ---
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="LogSink", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """停止写日志线程，剩余消息写完后关闭文件"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)  # 停止标记必须送达，这里允许阻塞
+        self._thread.join()
+        self._thread = None
+
+    # --- 生产者接口 ---
+
+    def write(self, message):
+        """把一条消息放入队列，立即返回；队列已满时丢弃并返回 False"""
+        try:
+            self._queue.put_nowait((time.time(), message))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    # --- 界面接口 ---
+
+    def tail(self, since=0):
+        """
+        返回 (序号, 新行列表, 省略行数)。
+        序号是到目前为止写入的总行数，下次调用时作为 since 传回；
+        since 之后写入的行超过尾部缓存容量时，只返回最近的部分，其余计入省略行数。
+        """
+        with self._tail_lock:
+            seq = self.lines_written
+            new = seq - since
+            if new <= 0:
+                return seq, [], 0
+            kept = min(new, len(self._tail))
+            lines = list(self._tail)[len(self._tail) - kept:]
+        return seq, lines, new - kept
+
+    # --- 写日志线程 ---
+
+    def _run(self):
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=FLUSH_INTERVAL_S)
+            except queue.Empty:
+                item = None
+            # 一次取走队列里已有的消息，合并成一次写入
+            items = []
+            while item is not None:
+                if item is _STOP:
+                    running = False
+                    break
+                items.append(item)
+                if len(items) >= _BATCH_MAX:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            if items:
+                self._write_batch(items)
+            now = time.monotonic()
+            if not running or now - last_flush >= FLUSH_INTERVAL_S:
+                self._file.flush()
+                last_flush = now
+        self._file.close()
+        self._file = None
+
+    def _write_batch(self, items):
+        lines = []
+        for timestamp, message in items:
+            stamp = datetime.datetime.fromtimestamp(timestamp).strftime("%H:%M:%S.%f")[:-3]
+            lines.append(f"[{stamp}] {message}")
+        if self._should_rotate():
+            self._rotate()
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        self._file.write(data)
+        self._file_bytes += len(data)
+        with self._tail_lock:
+            self._tail.extend(lines)
+            self.lines_written += len(lines)
+
+    # --- 滚动 ---
+
+    def _open(self):
+        self._file = open(self.path, "ab", buffering=WRITE_BUFFER_BYTES)
+        self._file_bytes = self._file.tell()
+        self._opened_at = time.monotonic()
+
+    def _should_rotate(self):
+        if self.max_bytes and self._file_bytes >= self.max_bytes:
+            return True
+        return bool(self.max_age_s) and time.monotonic() - self._opened_at >= self.max_age_s
+
+    def _rotate(self):
+        """name.log -> name.log.1 -> ... -> name.log.N，最旧的文件被删除"""
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
@@ -0,0 +1,128 @@
+# 文件名: hrg_core/pipeline_panel.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 流水线延迟面板: 显示 hrg_core.pipeline_stats.PipelineProbe 各阶段的次数/p50/p99/最大值、
+# 吞吐和队列深度，由定时器每 refresh_ms 刷新一次；可以把完整直方图导出成 JSON。
+
+import os
+import time
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QCheckBox, QPushButton, QLabel,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QTimer
+
+from hrg_core.pipeline_stats import STAGES, STAGE_LABELS, GAUGE_LABELS
+
+DEFAULT_REFRESH_MS = 500
+_COLUMNS = (('count', "次数"), ('p50_ns', "p50"), ('p99_ns', "p99"), ('max_ns', "最大"))
+
+
+def format_ns(ns):
+    if ns < 1000:
+        return f"{ns} ns"
+    if ns < 1000000:
+        return f"{ns / 1e3:.1f} µs"
+    if ns < 1000000000:
+        return f"{ns / 1e6:.2f} ms"
+    return f"{ns / 1e9:.2f} s"
+
+
+class PipelinePanel(QWidget):
+    """每个阶段一行；上方是开关、重置、导出和吞吐，下方是队列深度（当前/峰值）"""
+
+    def __init__(self, probe, export_dir, refresh_ms=DEFAULT_REFRESH_MS, parent=None):
+        super().__init__(parent)
+        self.probe = probe
+        self.export_dir = export_dir
+
+        self.enable_checkbox = QCheckBox("测量")
+        self.enable_checkbox.setChecked(probe.enabled)
+        self.enable_checkbox.toggled.connect(self.set_enabled)
+        self.reset_button = QPushButton("重置")
+        self.reset_button.clicked.connect(self.reset)
+        self.export_button = QPushButton("导出")
+        self.export_button.clicked.connect(self.export)
+        self.summary_label = QLabel()
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("流水线:"))
+        controls.addWidget(self.enable_checkbox)
+        controls.addWidget(self.reset_button)
+        controls.addWidget(self.export_button)
+        controls.addWidget(self.summary_label)
+        controls.addStretch()
+
+        self.table = QTableWidget(len(STAGES), len(_COLUMNS))
+        self.table.setHorizontalHeaderLabels([label for _, label in _COLUMNS])
+        self.table.setVerticalHeaderLabels([STAGE_LABELS[stage] for stage in STAGES])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setWordWrap(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        row_height = self.table.fontMetrics().height() + 6
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(row_height)
+        self.table.setFixedHeight(row_height * (len(STAGES) + 1) + 4)
+        self._items = [[QTableWidgetItem("--") for _ in _COLUMNS] for _ in STAGES]
+        for row, items in enumerate(self._items):
+            for column, item in enumerate(items):
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        self.gauge_label = QLabel()
+        self.gauge_label.setWordWrap(True)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(controls)
+        layout.addWidget(self.table)
+        layout.addWidget(self.gauge_label)
+
+        self._message = ""
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(refresh_ms)
+        self.refresh()
+
+    # --- 公共接口 ---
+
+    def set_enabled(self, on):
+        self.probe.set_enabled(on)
+        self.refresh()
+
+    def reset(self):
+        self.probe.reset()
+        self._message = ""
+        self.refresh()
+
+    def export(self):
+        """导出到 export_dir/pipeline_年月日_时分秒.json，结果显示在吞吐一栏后面"""
+        path = os.path.join(self.export_dir, time.strftime("pipeline_%Y%m%d_%H%M%S.json"))
+        try:
+            os.makedirs(self.export_dir, exist_ok=True)
+            self.probe.export(path)
+            self._message = f"已导出 {path}"
+        except OSError as e:
+            self._message = f"导出失败: {e}"
+        self.refresh()
+
+    # --- 刷新 ---
+
+    def refresh(self):
+        snapshot = self.probe.snapshot()
+        summary = f"{snapshot['bytes_per_s'] / 1024:.1f} KB/s, {snapshot['frames_per_s']:.0f} 帧/s"
+        if self._message:
+            summary += f"  {self._message}"
+        self.summary_label.setText(summary)
+        for stage, items in zip(STAGES, self._items):
+            result = snapshot['stages'][stage]
+            for (key, _), item in zip(_COLUMNS, items):
+                if not result['count']:
+                    item.setText("--")
+                elif key == 'count':
+                    item.setText(str(result['count']))
+                else:
+                    item.setText(format_ns(result[key]))
+        parts = []
+        for name, (value, peak) in snapshot['gauges'].items():
+            label, unit = GAUGE_LABELS.get(name, (name, ""))
+            parts.append(f"{label} {'--' if value is None else value}/{peak} {unit}")
+        self.gauge_label.setText("队列 (当前/峰值): " + " | ".join(parts))
@@ -0,0 +1,258 @@
+# 文件名: hrg_core/pipeline_stats.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 采集流水线的端到端延迟和吞吐测量（不依赖 Qt）。
+# 各环节在同一个 perf_counter_ns 时钟上打时间戳，相邻两个时间戳之差记入该阶段的直方图:
+#
+#   extract  串口读到数据 -> 帧切分完成（狩猎/同步、找出完整帧，狩猎时的帧头扫描也算在这里）
+#   decode   批量解包 + 查表换算
+#   emit     换算完成 -> 数据块发出（滤波 + 攒块等待，按块内最早的数据计）
+#   gui      数据块发出 -> 界面线程收到（Qt 事件队列）
+#   render   界面线程收到 -> 曲线画完
+#   total    串口读到数据 -> 曲线画完
+#
+# 另有字节/帧计数和若干队列深度量表。默认关闭；关闭时各环节只多一次属性判断。
+# 独立进程模式下读取、切分和换算在子进程里，只能测到数据块发出之后的阶段。
+
+import collections
+import json
+import threading
+import time
+
+STAGES = ('extract', 'decode', 'emit', 'gui', 'render', 'total')
+STAGE_LABELS = {
+    'extract': "帧切分",
+    'decode': "解码换算",
+    'emit': "攒块发出",
+    'gui': "跨线程到界面",
+    'render': "绘制",
+    'total': "端到端",
+}
+# 队列深度量表: 名字 -> (显示名, 单位)；serial_rx 和 block_frames 由采集引擎登记
+GAUGE_LABELS = {
+    'serial_rx': ("串口接收缓冲", "B"),
+    'block_frames': ("攒块缓冲", "帧"),
+    'gui_blocks': ("待界面处理", "块"),
+    'render_blocks': ("待绘制", "块"),
+    'log_queue': ("日志队列", "条"),
+}
+PERCENTILES = (0.5, 0.99)
+_MIN_RATE_INTERVAL_S = 0.2   # 两次快照间隔太短时沿用上次的速率，不重新计算
+_MAX_TRACKED_BLOCKS = 256  # 已发出、界面还没收到的块最多跟踪这么多（界面不消费时不至于无限增长）
+
+# 直方图分桶: 每个 2 倍区间再均分 8 格，相对分辨率约 12%，覆盖 0 ~ 2^63 ns
+_SUB_BITS = 3
+_SUB = 1 << _SUB_BITS
+_BUCKETS = 64 * _SUB
+
+
+def _bucket(ns):
+    if ns < _SUB:
+        return max(ns, 0)
+    shift = ns.bit_length() - 1 - _SUB_BITS
+    return (shift + 1) * _SUB + (ns >> shift) - _SUB
+
+
+def _bucket_bounds(index):
+    """桶 index 覆盖的 [下限, 上限) 纳秒"""
+    if index < _SUB:
+        return index, index + 1
+    shift = index // _SUB - 1
+    low = (index % _SUB + _SUB) << shift
+    return low, low + (1 << shift)
+
+
+class LatencyHistogram:
+    """对数分桶的纳秒直方图: 记录 O(1)，分位数误差约 12%，最大值精确"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, q):
+        """第 q 分位 (0~1) 的纳秒数，取所在桶的中点，不超过最大值；没有样本时为 0"""
+        if self.count == 0:
+            return 0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                low, high = _bucket_bounds(index)
+                return min((low + high) // 2, self.max)
+        return self.max
+
+    def summary(self):
+        result = {'count': self.count, 'mean_ns': self.total // self.count if self.count else 0, 'max_ns': self.max}
+        for q in PERCENTILES:
+            result[f'p{round(q * 100)}_ns'] = self.percentile(q)
+        return result
+
+    def nonzero_buckets(self):
+        """[(下限 ns, 上限 ns, 个数), ...]，导出用"""
+        return [(*_bucket_bounds(i), n) for i, n in enumerate(self.counts) if n]
+
+
+class PipelineProbe:
+    """
+    采集线程一侧依次调用 begin() -> (解码器累加 decode_ns) -> decoded() -> emitted()，
+    界面线程一侧调用 received() 和 rendered()。enabled 为 False 时调用方应跳过这些调用。
+
+    数据块在两个线程之间按 id() 对应；add_gauge() 登记的量表在 snapshot() 时取值。
+    counter_source 是返回累计 (字节数, 帧数) 的函数，吞吐按它计算；采集引擎用自己的计数器，
+    独立进程模式下换成共享内存里的计数器。这两个计数一直在累加，不受 enabled 影响。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.clock = time.perf_counter_ns
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.counter_source = None
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def set_enabled(self, on):
+        with self._lock:
+            self.enabled = bool(on)
+            self._inflight.clear()
+            self._unrendered.clear()
+            self._pending = self._current = None
+
+    def reset(self):
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.reset()
+            self.decode_ns = 0
+            self._t_read = 0
+            self._current = None    # 最近一批数据的 (读到时刻, 换算完成时刻)
+            self._pending = None    # 攒块缓冲区里最早一批数据的 (读到时刻, 换算完成时刻)
+            self._inflight = collections.OrderedDict()  # id(块) -> (读到时刻或 None, 发出时刻)
+            self._unrendered = []   # 界面已收到、还没画出来的 (读到时刻或 None, 收到时刻)
+            self._peaks = {}
+            self._started = time.monotonic()
+            self._last_rates = (self._started,) + self.counters()
+            self._rates = (0.0, 0.0)
+
+    # --- 采集线程 ---
+
+    def begin(self):
+        """串口刚读到一批数据"""
+        self._t_read = self.clock()
+        self.decode_ns = 0
+
+    def decoded(self, nframes):
+        """解码器处理完本次读到的数据，解出 nframes 帧"""
+        now = self.clock()
+        if nframes == 0:
+            return
+        self.histograms['decode'].record(self.decode_ns)
+        self.histograms['extract'].record(max(0, now - self._t_read - self.decode_ns))
+        self._current = (self._t_read, now)
+        if self._pending is None:
+            self._pending = self._current
+
+    def emitted(self, block, remaining=0):
+        """数据块即将交给界面；remaining 为发出后攒块缓冲区里还剩的帧数"""
+        now = self.clock()
+        reference = self._pending or self._current
+        self._pending = self._current if remaining else None
+        t_read = None
+        if reference is not None:
+            t_read, t_decoded = reference
+            self.histograms['emit'].record(now - t_decoded)
+        with self._lock:
+            self._inflight[id(block)] = (t_read, now)
+            while len(self._inflight) > _MAX_TRACKED_BLOCKS:
+                self._inflight.popitem(last=False)
+
+    # --- 界面线程 ---
+
+    def received(self, block):
+        now = self.clock()
+        with self._lock:
+            entry = self._inflight.pop(id(block), None)
+        if entry is None:
+            return
+        t_read, t_emitted = entry
+        self.histograms['gui'].record(now - t_emitted)
+        self._unrendered.append((t_read, now))
+
+    def rendered(self):
+        """曲线画完一帧: 之前收到的块都已经显示出来"""
+        if not self._unrendered:
+            return
+        now = self.clock()
+        pending, self._unrendered = self._unrendered, []
+        render, total = self.histograms['render'], self.histograms['total']
+        for t_read, t_received in pending:
+            render.record(now - t_received)
+            if t_read is not None:
+                total.record(now - t_read)
+
+    # --- 量表与快照 ---
+
+    def add_gauge(self, name, read):
+        """登记一个队列深度量表，read() 返回当前深度"""
+        self._gauges[name] = read
+
+    def gauges(self):
+        """{名字: (当前值, 峰值)}，峰值是历次取值的最大值；取值出错时当前值为 None"""
+        values = {'gui_blocks': len(self._inflight), 'render_blocks': len(self._unrendered)}
+        for name, read in self._gauges.items():
+            try:
+                values[name] = int(read())
+            except Exception:  # 例如串口刚关闭
+                values[name] = None
+        result = {}
+        for name, value in values.items():
+            if value is not None:
+                self._peaks[name] = max(self._peaks.get(name, 0), value)
+            result[name] = (value, self._peaks.get(name, 0))
+        return result
+
+    def counters(self):
+        if self.counter_source is None:
+            return 0, 0
+        return tuple(self.counter_source())
+
+    def snapshot(self):
+        """各阶段分位数、吞吐和量表；速率按距离上次调用的区间计算"""
+        now = time.monotonic()
+        nbytes, frames = self.counters()
+        last_time, last_bytes, last_frames = self._last_rates
+        elapsed = now - last_time
+        if elapsed >= _MIN_RATE_INTERVAL_S:
+            self._rates = (max(0, nbytes - last_bytes) / elapsed, max(0, frames - last_frames) / elapsed)
+            self._last_rates = (now, nbytes, frames)
+        return {
+            'enabled': self.enabled,
+            'elapsed_s': now - self._started,
+            'bytes': nbytes,
+            'frames': frames,
+            'bytes_per_s': self._rates[0],
+            'frames_per_s': self._rates[1],
+            'stages': {stage: self.histograms[stage].summary() for stage in STAGES},
+            'gauges': self.gauges(),
+        }
+
+    def export(self, path):
+        """把快照和各阶段的完整直方图写成 JSON"""
+        result = self.snapshot()
+        result['time'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        result['histograms'] = {stage: self.histograms[stage].nonzero_buckets() for stage in STAGES}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        return path
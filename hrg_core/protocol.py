@@ -0,0 +1,273 @@
+# 文件名: hrg_core/protocol.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 表驱动的协议核心: 每种帧格式只在这里声明一次（字段偏移、通道号校验、
+# 帧头/帧尾标记、有无符号、换算系数），再由声明自动生成预编译的
+# struct.Struct（单帧解析）和 NumPy dtype（批量解析）。
+# 所有上位机都走这里，提速或修 bug 只需改一处。
+
+import struct
+import numpy as np
+
+V_REF = 3.0          # Multi_channel_ADC / Hybride_Digital_2ADC 的参考电压
+FF_V_REF = 2.998     # serial_debug_tool.py 使用的参考电压
+ADC_FULL_SCALE = 4095.0
+
+# 字段类型: struct 格式码, NumPy 格式
+_KINDS = {
+    'marker': ('B', 'u1'),   # 固定字节（帧头/帧尾），只校验不输出
+    'adc12': ('H', '>u2'),   # 大端16位: 高4位是通道号(校验)，低12位是 ADC 码
+    'u16': ('H', '>u2'),     # 大端无符号16位
+    's16': ('h', '>i2'),     # 大端有符号16位（补码）
+}
+
+
+class Field:
+    """
+    帧内的一个字段。
+    kind:    'marker' / 'adc12' / 'u16' / 's16'
+    expected: marker 的固定字节值，或 adc12 的通道号
+    scale:   输出值 = 原始值 * scale（marker 无输出）
+    label:   出错时显示的名字，默认为 name
+    """
+
+    def __init__(self, name, offset, kind, expected=None, scale=1.0, label=None):
+        if kind not in _KINDS:
+            raise ValueError(f"未知字段类型: {kind}")
+        self.name = name
+        self.offset = offset
+        self.kind = kind
+        self.expected = expected
+        self.scale = scale
+        self.label = label or name
+
+    @property
+    def size(self):
+        return 1 if self.kind == 'marker' else 2
+
+    @property
+    def error_label(self):
+        """校验失败时的错误类别，按它分类计数"""
+        return f"{self.label} 通道号" if self.kind == 'adc12' else self.label
+
+
+class FrameLayout:
+    """
+    定长帧格式。构造时编译出:
+      - 覆盖整帧的 struct.Struct，单帧解析只需一次 unpack
+      - 带偏移的 NumPy 结构化 dtype，批量解析时把缓冲区直接视为 (N,) 数组
+
+    单帧接口: unpack() 原始值 / decode() 换算后的值 / error_field() 和 describe_error() 出错原因 / pack() 编码
+    批量接口: decode_many() 一次解析缓冲区里所有完整帧，frame_starts() 一次检查所有可能的帧起点
+
+    unpack()/decode() 是构造时为该帧格式专门生成的函数（见 _compile），
+    帧无效时返回 None，不抛异常。
+    """
+
+    def __init__(self, name, size, fields):
+        self.name = name
+        self.size = size
+        self.fields = sorted(fields, key=lambda f: f.offset)
+        self.value_fields = [f for f in self.fields if f.kind != 'marker']
+        self.value_names = tuple(f.name for f in self.value_fields)
+        self.scales = tuple(f.scale for f in self.value_fields)
+
+        fmt = '>'
+        cursor = 0
+        for f in self.fields:
+            if f.offset < cursor:
+                raise ValueError(f"{name}: 字段 {f.name} 与前一个字段重叠")
+            fmt += 'x' * (f.offset - cursor) + _KINDS[f.kind][0]
+            cursor = f.offset + f.size
+        if cursor > size:
+            raise ValueError(f"{name}: 字段超出帧长 {size}")
+        fmt += 'x' * (size - cursor)
+        self._struct = struct.Struct(fmt)
+
+        self._compile()
+
+        self.dtype = np.dtype({
+            'names': [f.name for f in self.fields],
+            'formats': [_KINDS[f.kind][1] for f in self.fields],
+            'offsets': [f.offset for f in self.fields],
+            'itemsize': size,
+        })
+
+    def __repr__(self):
+        return f"FrameLayout({self.name!r}, size={self.size})"
+
+    # --- 单帧 ---
+
+    def _compile(self):
+        """
+        生成本帧格式专用的 unpack(frame) 和 decode(frame):
+        整帧当作一个大整数，与掩码相与后和期望值比较，一次完成所有帧头/帧尾和通道号校验；
+        再用一次 struct 解包取出全部字段，逐字段的换算直接展开成表达式，没有循环。
+        unpack 返回原始值元组（adc12 已去掉通道号），decode 返回换算后的值元组。
+        """
+        mask = bytearray(self.size)
+        expected = bytearray(self.size)
+        for f in self.fields:
+            if f.kind == 'marker':
+                mask[f.offset] = 0xFF
+                expected[f.offset] = f.expected
+            elif f.kind == 'adc12':
+                mask[f.offset] = 0xF0
+                expected[f.offset] = f.expected << 4
+
+        names = [f'r{i}' for i in range(len(self.fields))]
+        raw_exprs = []
+        value_exprs = []
+        for i, f in enumerate(self.fields):
+            if f.kind == 'marker':
+                continue
+            raw = f'(r{i} & 0x0FFF)' if f.kind == 'adc12' else f'r{i}'
+            value_exprs.append(f'{raw} * s{len(raw_exprs)}')
+            raw_exprs.append(raw)
+        guard = (f"    if len(frame) != {self.size} or from_bytes(frame, 'big') & MASK != EXPECTED:\n"
+                 f"        return None\n"
+                 f"    {', '.join(names)}, = struct_unpack(frame)\n")
+        source = (f"def unpack(frame):\n{guard}    return ({', '.join(raw_exprs)},)\n\n"
+                  f"def decode(frame):\n{guard}    return ({', '.join(value_exprs)},)\n")
+
+        namespace = {
+            'from_bytes': int.from_bytes,
+            'struct_unpack': self._struct.unpack,
+            'MASK': int.from_bytes(mask, 'big'),
+            'EXPECTED': int.from_bytes(expected, 'big'),
+        }
+        namespace.update({f's{j}': scale for j, scale in enumerate(self.scales)})
+        exec(compile(source, f'<FrameLayout {self.name}>', 'exec'), namespace)
+        self.unpack = namespace['unpack']
+        self.decode = namespace['decode']
+        # error_field() 逐字节检查用: (偏移, 掩码, 期望值, 字段)
+        self._checks = tuple((f.offset, mask[f.offset], expected[f.offset], f)
+                             for f in self.fields if mask[f.offset])
+
+    def scale(self, raw_values):
+        """原始值 -> 物理量"""
+        return tuple(v * s for v, s in zip(raw_values, self.scales))
+
+    def error_field(self, frame):
+        """无效帧中第一个校验不符的字段；帧长度不对或帧有效时返回 None。只比较字节，不拼字符串"""
+        if len(frame) != self.size:
+            return None
+        for offset, mask, expected, field in self._checks:
+            if frame[offset] & mask != expected:
+                return field
+        return None
+
+    def describe_error(self, frame):
+        """说明帧为什么无效（只在出错时调用，不在热路径上）"""
+        if len(frame) != self.size:
+            return f"帧长度错误: 期望 {self.size} 字节, 实际 {len(frame)} 字节"
+        raw = self._struct.unpack(frame)
+        for i, f in enumerate(self.fields):
+            if f.kind == 'marker' and raw[i] != f.expected:
+                return f"{f.label}错误: 偏移 {f.offset} 期望 {f.expected:02X}, 但得到 {raw[i]:02X}"
+            if f.kind == 'adc12' and raw[i] >> 12 != f.expected:
+                return (f"{f.label} 校验失败: 偏移 {f.offset} 期望通道 {f.expected}, 但得到 {raw[i] >> 12}. "
+                        f"原始字节: {frame[f.offset]:02X} {frame[f.offset + 1]:02X}")
+        return None
+
+    def pack(self, raw_values):
+        """按原始值编码一帧（自动填入帧头/帧尾和通道号），模拟器用"""
+        values = iter(raw_values)
+        args = []
+        for f in self.fields:
+            if f.kind == 'marker':
+                args.append(f.expected)
+            elif f.kind == 'adc12':
+                args.append((f.expected << 12) | (next(values) & 0x0FFF))
+            elif f.kind == 'u16':
+                args.append(next(values) & 0xFFFF)
+            else:
+                args.append(next(values))
+        return self._struct.pack(*args)
+
+    # --- 批量 ---
+
+    def frames_view(self, buffer):
+        """把缓冲区零拷贝地视为 (N,) 结构化数组，尾部不足一帧的字节忽略"""
+        n_frames = len(buffer) // self.size
+        return np.frombuffer(buffer, dtype=self.dtype, count=n_frames)
+
+    def validate_many(self, frames):
+        """frames_view() 结果的每帧有效性掩码"""
+        valid = np.ones(len(frames), dtype=bool)
+        for f in self.fields:
+            if f.kind == 'marker':
+                valid &= frames[f.name] == f.expected
+            elif f.kind == 'adc12':
+                valid &= (frames[f.name] >> 12) == f.expected
+        return valid
+
+    def frame_starts(self, data):
+        """
+        data 为 uint8 数组，返回 (len(data) - size + 1,) 的掩码: 从该位置起的一整帧帧头/帧尾和通道号都对得上。
+        每个校验字节一次向量化比较，不逐个位置循环，狩猎模式用它代替逐字节试解码。
+        """
+        n = len(data) - self.size + 1
+        if n <= 0:
+            return np.zeros(0, dtype=bool)
+        valid = np.ones(n, dtype=bool)
+        for offset, mask, expected, _ in self._checks:
+            column = data[offset:offset + n]
+            if mask != 0xFF:
+                column = column & mask
+            valid &= column == expected
+        return valid
+
+    def unpack_many(self, buffer):
+        """批量返回 ((N, 字段数) 的原始值数组, (N,) 有效性掩码)"""
+        frames = self.frames_view(buffer)
+        raw = np.empty((len(frames), len(self.value_fields)), dtype=np.int32)
+        for j, f in enumerate(self.value_fields):
+            column = frames[f.name]
+            raw[:, j] = column & 0x0FFF if f.kind == 'adc12' else column
+        return raw, self.validate_many(frames)
+
+    def decode_many(self, buffer):
+        """批量返回 ((N, 字段数) 的换算后 float64 数组, (N,) 有效性掩码)"""
+        raw, valid = self.unpack_many(buffer)
+        return raw * np.asarray(self.scales), valid
+
+
+# --- 各上位机的帧格式声明 ---
+
+# Multi_channel_ADC: 8 个通道，每个 2 字节，高 4 位依次是通道号 1..8
+MULTI8 = FrameLayout('multi8', 16, [
+    Field(f'ch{i + 1}', i * 2, 'adc12', expected=i + 1, scale=V_REF / ADC_FULL_SCALE, label=f'CH{i + 1}')
+    for i in range(8)
+])
+
+# Hybride_Digital_2ADC: CH1, CH2, [AF 压力 温度 FA](CH3), CH6, CH7, CH8
+HYBRID = FrameLayout('hybrid', 16, [
+    Field('ch1', 0, 'adc12', expected=1, scale=V_REF / ADC_FULL_SCALE, label='CH1'),
+    Field('ch2', 2, 'adc12', expected=2, scale=V_REF / ADC_FULL_SCALE, label='CH2'),
+    Field('ch3_sof', 4, 'marker', expected=0xAF, label='CH3 数据包帧头'),
+    Field('ch3_pressure', 5, 'u16'),                # KPa
+    Field('ch3_temperature', 7, 's16', scale=0.1),  # 0.1℃
+    Field('ch3_eof', 9, 'marker', expected=0xFA, label='CH3 数据包帧尾'),
+    Field('ch6', 10, 'adc12', expected=6, scale=V_REF / ADC_FULL_SCALE, label='CH6'),
+    Field('ch7', 12, 'adc12', expected=7, scale=V_REF / ADC_FULL_SCALE, label='CH7'),
+    Field('ch8', 14, 'adc12', expected=8, scale=V_REF / ADC_FULL_SCALE, label='CH8'),
+])
+
+# serial_debug_tool.py: FF 帧头 + 12位数值(高字节, 低字节)
+FF_SYNC = b'\xFF'
+FF_PACKET = FrameLayout('ff', 3, [
+    Field('sync', 0, 'marker', expected=FF_SYNC[0], label='帧头'),
+    Field('adc', 1, 'u16', scale=FF_V_REF / ADC_FULL_SCALE),
+])
+
+# Serial Monitor v1.py: 请求 AF 01 FA，应答 AF 压力(u16) 温度(s16, 0.1℃) FA
+AF_POLL_REQUEST = bytes.fromhex('AF 01 FA')
+AF_RESPONSE = FrameLayout('af_response', 6, [
+    Field('sof', 0, 'marker', expected=0xAF, label='帧头'),
+    Field('pressure', 1, 'u16'),                # KPa
+    Field('temperature', 3, 's16', scale=0.1),  # 0.1℃
+    Field('eof', 5, 'marker', expected=0xFA, label='帧尾'),
+])
+
+LAYOUTS = {layout.name: layout for layout in (MULTI8, HYBRID, FF_PACKET, AF_RESPONSE)}
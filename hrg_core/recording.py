@@ -0,0 +1,95 @@
+# 文件名: hrg_core/recording.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 二进制会话录制格式 (.hrgs)，用来替代无法高效回读的 txt/csv 日志。
+#
+# 文件布局:
+#   [0, 4096)    固定长度文件头: 魔数 b'HRGSES01' + uint32 版本 + uint32 JSON长度
+#                + UTF-8 JSON（通道名、单位、V_REF、标定参数等），其余补零
+#   [4096, ...)  定长记录: 小端 float64 时间戳 + 每个通道一个小端 float64
+#
+# 只追加写入；读取时用 numpy.memmap 直接映射记录区，零拷贝，
+# 几个小时的 8 通道数据也能瞬间打开和切片。
+
+import json
+import os
+import time
+import numpy as np
+
+MAGIC = b'HRGSES01'
+FORMAT_VERSION = 1
+HEADER_SIZE = 4096
+SESSION_EXTENSION = ".hrgs"
+_PREAMBLE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('json_len', '<u4')])
+
+
+def record_dtype(channels):
+    """一条记录: 时间戳 + 各通道，字段顺序与 sample_block.block_dtype 相同"""
+    return np.dtype([('timestamp', '<f8')] + [(name, '<f8') for name in channels])
+
+
+class SessionRecorder:
+    """只追加的会话写入器，供工作线程调用"""
+
+    def __init__(self, path, channels, units=None, v_ref=None, calibration=None):
+        self.path = path
+        self.channels = tuple(channels)
+        self.dtype = record_dtype(self.channels)
+        self.records_written = 0
+        header = {
+            'channels': list(self.channels),
+            'units': list(units) if units is not None else [''] * len(self.channels),
+            'v_ref': v_ref,
+            'calibration': calibration or {},
+            'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        payload = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if _PREAMBLE.itemsize + len(payload) > HEADER_SIZE:
+            raise ValueError("会话文件头超过 4096 字节，请精简标定参数")
+        preamble = np.array([(MAGIC, FORMAT_VERSION, len(payload))], dtype=_PREAMBLE).tobytes()
+
+        self._file = open(path, 'wb', buffering=1 << 16)
+        self._file.write((preamble + payload).ljust(HEADER_SIZE, b'\0'))
+
+    def write_block(self, block):
+        """追加一个数据块（sample_block 产生的结构化数组，或任何同字段顺序的数组）"""
+        records = np.asarray(block).astype(self.dtype, copy=False)
+        self._file.write(records.tobytes())
+        self.records_written += len(records)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_header(path):
+    """只读取并解析文件头"""
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{path} 不是完整的会话文件")
+    preamble = np.frombuffer(raw, dtype=_PREAMBLE, count=1)[0]
+    if preamble['magic'] != MAGIC:
+        raise ValueError(f"{path} 不是 HRG 会话文件")
+    if preamble['version'] != FORMAT_VERSION:
+        raise ValueError(f"不支持的会话文件版本: {preamble['version']}")
+    start = _PREAMBLE.itemsize
+    return json.loads(raw[start:start + int(preamble['json_len'])].decode('utf-8'))
+
+
+def open_session(path):
+    """
+    打开会话文件，返回 (header, records)。
+    records 是只读的 numpy.memmap 结构化数组，可以按字段名取通道，例如 records['ch1']。
+    录制中断留下的不完整尾记录会被忽略。
+    """
+    header = read_header(path)
+    dtype = record_dtype(header['channels'])
+    n_records = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if n_records == 0:
+        return header, np.zeros(0, dtype=dtype)
+    records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+    return header, records
@@ -0,0 +1,150 @@
+# 文件名: hrg_core/ring_console.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 调试信息窗口: 文本存放在固定容量的行环形缓冲区里，绘制时只画当前可见的几行，
+# 新行先进缓冲区、由定时器合并刷新。没有 QTextDocument，
+# 不会重新排版整篇文档，长时间高速输出时内存和每次刷新的开销都是常数。
+
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication, QMenu
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QPainter, QPalette
+
+DEFAULT_CAPACITY = 10000   # 最多保留的行数，更早的行在日志文件里
+DEFAULT_REFRESH_MS = 100   # 合并刷新的间隔
+_MARGIN = 4
+
+
+class LineRing:
+    """固定容量的行环形缓冲区，按下标 O(1) 取行，满了自动覆盖最旧的行"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._lines = [''] * capacity
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._lines[(self._start + index) % self.capacity]
+
+    def extend(self, lines):
+        # 一批行比容量还多时，只有最后 capacity 行有意义
+        lines = lines[-self.capacity:]
+        for line in lines:
+            end = (self._start + self._count) % self.capacity
+            self._lines[end] = line
+            if self._count < self.capacity:
+                self._count += 1
+            else:
+                self._start = (self._start + 1) % self.capacity
+
+    def clear(self):
+        self._lines = [''] * self.capacity
+        self._start = 0
+        self._count = 0
+
+    def slice(self, start, stop):
+        return [self[i] for i in range(max(0, start), min(stop, self._count))]
+
+
+class RingConsole(QAbstractScrollArea):
+    """
+    只读的调试输出控件。
+    append_lines() 只把行放进环形缓冲区，滚动条和重绘由定时器每 refresh_ms 合并一次；
+    滚动条停在底部时自动跟随最新输出，用户往上翻时保持不动。
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, refresh_ms=DEFAULT_REFRESH_MS, parent=None):
+        super().__init__(parent)
+        self._ring = LineRing(capacity)
+        self._dirty = False
+        self._evicted = 0  # 上次刷新以来被挤出缓冲区的行数
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._flush)
+        self._timer.start(refresh_ms)
+
+    # --- 公共接口 ---
+
+    def append_lines(self, lines):
+        self._evicted += max(0, len(self._ring) + len(lines) - self._ring.capacity)
+        self._ring.extend(lines)
+        self._dirty = True
+
+    def append(self, message):
+        """与 QTextEdit.append 相同的用法，消息可以包含多行"""
+        self.append_lines(message.split('\n'))
+
+    def clear(self):
+        self._ring.clear()
+        self._evicted = 0
+        self._dirty = True
+
+    def line_count(self):
+        return len(self._ring)
+
+    def toPlainText(self):
+        return '\n'.join(self._ring.slice(0, len(self._ring)))
+
+    # --- 刷新 ---
+
+    def _line_height(self):
+        return self.fontMetrics().lineSpacing()
+
+    def _visible_rows(self):
+        return max(1, (self.viewport().height() - 2 * _MARGIN) // self._line_height())
+
+    def _flush(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._update_scrollbar()
+        self.viewport().update()
+
+    def _update_scrollbar(self):
+        bar = self.verticalScrollBar()
+        follow = bar.value() >= bar.maximum()
+        # 往上翻看时，旧行被挤出后把位置同步前移，看到的内容保持不动
+        value = bar.value() - self._evicted
+        self._evicted = 0
+        rows = self._visible_rows()
+        bar.setPageStep(rows)
+        bar.setRange(0, max(0, len(self._ring) - rows))
+        bar.setValue(bar.maximum() if follow else value)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbar()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.setFont(self.font())
+        painter.setPen(self.palette().color(QPalette.Text))
+        line_height = self._line_height()
+        ascent = self.fontMetrics().ascent()
+        first = self.verticalScrollBar().value()
+        # 只取可见的几行来画，和缓冲区里总共有多少行无关
+        for row, line in enumerate(self._ring.slice(first, first + self._visible_rows() + 1)):
+            painter.drawText(_MARGIN, _MARGIN + row * line_height + ascent, line)
+
+    # --- 右键菜单 ---
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        copy_visible = menu.addAction("复制可见内容")
+        copy_all = menu.addAction("复制全部")
+        clear = menu.addAction("清空")
+        action = menu.exec_(event.globalPos())
+        first = self.verticalScrollBar().value()
+        if action is copy_visible:
+            QApplication.clipboard().setText('\n'.join(self._ring.slice(first, first + self._visible_rows())))
+        elif action is copy_all:
+            QApplication.clipboard().setText(self.toPlainText())
+        elif action is clear:
+            self.clear()
@@ -0,0 +1,95 @@
+# 文件名: hrg_core/sample_block.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 块传输: 工作线程把解码后的样本攒进预分配的结构化数组，
+# 每 N 帧或每 T 毫秒（先到者为准）才跨线程发出一个数据块，
+# 取代每帧一次的 dict/list 信号，避免高帧率下 Qt 事件队列被淹没。
+
+import time
+import numpy as np
+
+DEFAULT_BLOCK_FRAMES = 64       # 每块最多帧数
+DEFAULT_BLOCK_INTERVAL_MS = 50  # 最长攒块时间 (毫秒)
+
+
+def block_dtype(fields):
+    """时间戳列 + 各通道列，全部为 float64，便于整体视为二维数组"""
+    return np.dtype([('timestamp', np.float64)] + [(name, np.float64) for name in fields])
+
+
+def block_values(block):
+    """数据块 -> (n, 字段数) 的 float64 视图（去掉时间戳列，不拷贝）"""
+    return block.view(np.float64).reshape(len(block), len(block.dtype.names))[:, 1:]
+
+
+class SampleBlockBuffer:
+    """
+    预分配的样本块缓冲区。
+
+    append()/append_many() 在块满时返回拷贝出来的数据块，
+    poll() 在攒块超时时返回数据块，其余情况返回 None/空列表。
+    数据块是 numpy 结构化数组，字段为 'timestamp' 加上构造时给出的通道名。
+    """
+
+    def __init__(self, fields, max_frames=DEFAULT_BLOCK_FRAMES, max_interval_ms=DEFAULT_BLOCK_INTERVAL_MS):
+        self.fields = tuple(fields)
+        self.dtype = block_dtype(self.fields)
+        self.max_frames = max_frames
+        self.max_interval = max_interval_ms / 1000.0
+        self._buf = np.zeros(max_frames, dtype=self.dtype)
+        # 同一块内存的二维视图: 第0列是时间戳，后面是各通道
+        self._table = self._buf.view(np.float64).reshape(max_frames, len(self.fields) + 1)
+        self._count = 0
+        self._started = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, values):
+        """追加一帧，块满时返回数据块"""
+        if self._count == 0:
+            self._started = time.monotonic()
+        row = self._table[self._count]
+        row[0] = timestamp
+        row[1:] = values
+        self._count += 1
+        if self._count >= self.max_frames:
+            return self.flush()
+        return None
+
+    def append_many(self, timestamps, values):
+        """追加多帧 (values 形状为 (n, 通道数))，返回期间装满的所有数据块"""
+        blocks = []
+        values = np.asarray(values, dtype=np.float64)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), (len(values),))
+        start = 0
+        while start < len(values):
+            if self._count == 0:
+                self._started = time.monotonic()
+            n = min(self.max_frames - self._count, len(values) - start)
+            rows = self._table[self._count:self._count + n]
+            rows[:, 0] = timestamps[start:start + n]
+            rows[:, 1:] = values[start:start + n]
+            self._count += n
+            start += n
+            if self._count >= self.max_frames:
+                blocks.append(self.flush())
+        return blocks
+
+    def poll(self, now=None):
+        """攒块时间到了就返回已有的数据，否则返回 None"""
+        if self._count == 0:
+            return None
+        if now is None:
+            now = time.monotonic()
+        if now - self._started >= self.max_interval:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """无条件取出当前已攒的数据（拷贝），缓冲区复位"""
+        if self._count == 0:
+            return None
+        block = self._buf[:self._count].copy()
+        self._count = 0
+        return block
@@ -0,0 +1,63 @@
+# 文件名: hrg_core/serial_reader.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 事件驱动的串口读取，取代 "in_waiting > 0 ... else: time.sleep(0.01)" 轮询。
+# 思路: 用带超时的阻塞 read(min_chunk)，pyserial 在底层等待串口句柄就绪
+# (POSIX 上是 select，Windows 上是重叠 I/O)，数据一到就醒，不再每 10ms 空转一次。
+
+
+class ReadProfile:
+    """
+    延迟/吞吐取舍。
+    min_chunk: 凑够这么多字节就立即返回（越小延迟越低，越大每次唤醒处理的数据越多）
+    max_wait:  最长等待秒数，到时即使没凑够也返回已收到的数据；
+               空闲时线程每 max_wait 秒才醒一次，用于检查停止标志
+    """
+
+    def __init__(self, min_chunk, max_wait):
+        self.min_chunk = min_chunk
+        self.max_wait = max_wait
+
+    def __repr__(self):
+        return f"ReadProfile(min_chunk={self.min_chunk}, max_wait={self.max_wait})"
+
+
+READ_PROFILES = {
+    'low_latency': ReadProfile(min_chunk=1, max_wait=0.1),
+    'balanced': ReadProfile(min_chunk=16, max_wait=0.05),     # 16 字节正好是一帧
+    'throughput': ReadProfile(min_chunk=512, max_wait=0.1),
+}
+DEFAULT_READ_PROFILE = READ_PROFILES['balanced']
+
+
+class SerialReader:
+    """按 ReadProfile 从 serial.Serial 读取数据块"""
+
+    def __init__(self, serial_port, profile=DEFAULT_READ_PROFILE):
+        self.serial_port = serial_port
+        self.profile = profile
+
+    def configure(self):
+        """把超时写入串口设置；打开串口之前或之后调用都可以"""
+        self.serial_port.timeout = self.profile.max_wait
+
+    def read(self):
+        """
+        阻塞到收到 min_chunk 字节或 max_wait 超时，再顺带取走已经到达的其余数据。
+        超时且没有任何数据时返回 b''。
+        """
+        data = self.serial_port.read(self.profile.min_chunk)
+        if data:
+            waiting = self.serial_port.in_waiting
+            if waiting:
+                data += self.serial_port.read(waiting)
+        return data
+
+    def cancel(self):
+        """从其他线程唤醒正在阻塞的 read()，用于快速停止"""
+        try:
+            if self.serial_port.is_open:
+                self.serial_port.cancel_read()
+        except (AttributeError, OSError):
+            # 老版本 pyserial 没有 cancel_read，最多等一个 max_wait
+            pass
@@ -0,0 +1,157 @@
+# 文件名: hrg_core/shm_ring.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 共享内存样本环形缓冲区: 采集进程写，界面进程直接映射同一块内存读。
+# 每行是 timestamp + 解码器字段 (全部 float64，与 sample_block.block_dtype 相同)，
+# 头部的写序号只增不减，读者记住自己读到的序号，就能知道新来了哪些行、有没有被覆盖掉。
+#
+# 只允许一个写者。写者先登记要写到的序号 (reserved)，再写数据，最后发布序号；
+# 读者先读序号，把数据拷贝出来，再看 reserved 判断拷贝期间有哪些行被写者追上覆盖，
+# 这些行按丢失处理。读接口只返回拷贝，共享内存上的视图不会交到缓冲区外面，
+# 所以 close() 随时可以解除映射，读者拿到的数据也不会在用的时候被改写。
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from hrg_core.sample_block import block_dtype
+
+DEFAULT_CAPACITY = 1 << 16  # 行数；2 kHz 时约 30 秒
+
+_MAGIC = 0x48524753484D3032  # "HRGSHM02"
+# 头部 16 个 uint64，前 9 个在用
+(_H_MAGIC, _H_CAPACITY, _H_COLUMNS, _H_SEQ, _H_BYTES, _H_FRAMES, _H_SYNC_LOSSES, _H_PROTOCOL_ERRORS,
+ _H_RESERVED) = range(9)
+_HEADER_WORDS = 16
+_HEADER_BYTES = _HEADER_WORDS * 8
+COUNTERS = ('bytes', 'frames', 'sync_losses', 'protocol_errors')
+
+
+class SharedSampleRing:
+    """
+    create() 新建（写者一方），attach() 按名字打开已有的缓冲区（读者一方，也可以是写者进程）。
+    头部另有几项计数器 (COUNTERS)，写者顺手更新，读者不必另开通道就能看到采集统计。
+    """
+
+    def __init__(self, shm, fields, owner):
+        self._shm = shm
+        self.owner = owner
+        self.fields = tuple(fields)
+        self.dtype = block_dtype(self.fields)
+        self._header = np.ndarray(_HEADER_WORDS, dtype=np.uint64, buffer=shm.buf)
+        if self._header[_H_MAGIC] != _MAGIC or self._header[_H_COLUMNS] != len(self.fields) + 1:
+            raise ValueError(f"共享内存 {shm.name} 不是 {len(self.fields)} 个字段的样本缓冲区")
+        self.capacity = int(self._header[_H_CAPACITY])
+        self._records = np.ndarray(self.capacity, dtype=self.dtype, buffer=shm.buf, offset=_HEADER_BYTES)
+        # 同一块内存的二维视图: 第0列是时间戳，后面是各字段
+        self._table = self._records.view(np.float64).reshape(self.capacity, len(self.fields) + 1)
+
+    @classmethod
+    def create(cls, fields, capacity=DEFAULT_CAPACITY):
+        columns = len(fields) + 1
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER_BYTES + capacity * columns * 8)
+        header = np.ndarray(_HEADER_WORDS, dtype=np.uint64, buffer=shm.buf)
+        header[:] = 0
+        header[_H_CAPACITY] = capacity
+        header[_H_COLUMNS] = columns
+        header[_H_MAGIC] = _MAGIC
+        del header  # 不留指向共享内存的引用，close() 才能释放
+        return cls(shm, fields, owner=True)
+
+    @classmethod
+    def attach(cls, name, fields):
+        return cls(shared_memory.SharedMemory(name=name), fields, owner=False)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def seq(self):
+        """已写入的总行数（下一行的序号）"""
+        return int(self._header[_H_SEQ])
+
+    # --- 写者 ---
+
+    def write(self, timestamps, rows):
+        """追加 (n, 字段数) 的样本；timestamps 为标量或长度 n 的数组"""
+        n = len(rows)
+        if n == 0:
+            return
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), (n,))
+        seq = int(self._header[_H_SEQ])
+        if n > self.capacity:  # 一次比整个环还多，只留最新的
+            seq += n - self.capacity
+            rows, timestamps = rows[-self.capacity:], timestamps[-self.capacity:]
+            n = self.capacity
+        # 先登记: 读者据此知道序号 seq + n - capacity 之前的行可能正在被覆盖
+        self._header[_H_RESERVED] = seq + n
+        start = seq % self.capacity
+        first = min(n, self.capacity - start)
+        table = self._table
+        table[start:start + first, 0] = timestamps[:first]
+        table[start:start + first, 1:] = rows[:first]
+        if first < n:
+            table[:n - first, 0] = timestamps[first:]
+            table[:n - first, 1:] = rows[first:]
+        # 数据写完再发布序号
+        self._header[_H_SEQ] = seq + n
+
+    def set_counters(self, bytes_read, frames, sync_losses, protocol_errors):
+        self._header[_H_BYTES:_H_PROTOCOL_ERRORS + 1] = (bytes_read, frames, sync_losses, protocol_errors)
+
+    # --- 读者 ---
+
+    def counters(self):
+        return dict(zip(COUNTERS, (int(v) for v in self._header[_H_BYTES:_H_PROTOCOL_ERRORS + 1])))
+
+    def read_since(self, seq):
+        """
+        返回 (新序号, 数据块, 丢失行数)，数据块是按时间顺序拷贝出来的新数组。
+        读者落后超过一整圈、或者拷贝期间被写者追上时，被覆盖的行计入丢失行数，
+        数据块从仍然有效的最早一行开始。
+        """
+        head = self.seq
+        if seq > head:  # 写者重新开始了
+            seq = head
+        lost = max(0, head - self.capacity - seq)
+        seq += lost
+        start, stop = seq % self.capacity, head % self.capacity
+        if seq == head:
+            block = self._records[:0].copy()
+        elif start < stop:
+            block = self._records[start:stop].copy()
+        else:  # 跨过环尾
+            block = np.concatenate((self._records[start:], self._records[:stop]))
+        torn = min(len(block), max(0, self.reserved - self.capacity - seq))
+        if torn:
+            block = block[torn:]
+            lost += torn
+        return head, block, lost
+
+    def latest(self, n=1):
+        """最新的至多 n 行（拷贝）"""
+        return self.read_since(max(0, self.seq - n))[1]
+
+    @property
+    def reserved(self):
+        """写者已登记、可能还没写完的序号；序号小于 reserved - capacity 的行已被覆盖或正在被覆盖"""
+        return int(self._header[_H_RESERVED])
+
+    # --- 释放 ---
+
+    def close(self):
+        """
+        释放本进程的映射；创建者同时删除共享内存。可以重复调用。
+        指向共享内存的视图只有下面这三个（读接口都返回拷贝），丢掉它们就可以解除映射。
+        """
+        if self._header is None:
+            return
+        self._header = self._records = self._table = None
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self.owner = False
+        self._shm.close()
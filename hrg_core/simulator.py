@@ -0,0 +1,308 @@
+# 文件名: hrg_core/simulator.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 虚拟串口设备: 创建一对伪终端 (pty)，在主端按设定帧率写入合成数据，
+# 上位机像打开真串口一样按端口名 (例如 /dev/pts/5) 打开从端即可，无需改动代码:
+# 各图形界面的端口框都可以编辑，把从端路径（或 --link 指定的路径）直接填进去再连接。
+# 没有板子也能做基准测试和回归测试。仅支持 Linux/macOS (需要 os.openpty)。
+#
+# 支持四种协议:
+#   multi8  Multi_channel_ADC 的 8 通道 16 字节帧
+#   hybrid  Hybride_Digital_2ADC 的 CH1/CH2 + AF..FA(CH3) + CH6-8 混合帧
+#   ff      serial_debug_tool.py 的 FF 帧头 3 字节包
+#   af_poll Serial Monitor v1.py 的 AF 01 FA 请求/应答
+#
+# 用法示例:
+#   python -m hrg_core.simulator hybrid --rate 500 --noise 0.01 --drop 0.001
+#   运行中在终端输入 "b 200" 可以立刻注入 200 字节的突发噪声。
+
+import argparse
+import math
+import os
+import random
+import select
+import sys
+import threading
+import time
+
+from hrg_core.protocol import MULTI8, HYBRID, FF_PACKET, AF_RESPONSE, AF_POLL_REQUEST
+
+PROTOCOLS = ('multi8', 'hybrid', 'ff', 'af_poll')
+POLL_REQUEST = AF_POLL_REQUEST
+
+
+# --- 帧编码（按 hrg_core.protocol 中的帧格式声明打包）---
+
+def encode_multi8(codes):
+    """8 个 12 位 ADC 码 -> 16 字节帧，每个字高 4 位是通道号 1..8"""
+    return MULTI8.pack(codes)
+
+
+def encode_hybrid(ch1_code, ch2_code, ch3_pressure, ch3_temp_raw, ch678_codes=(0, 0, 0)):
+    """混合帧: CH1, CH2, AF 压力(u16) 温度(s16, 0.1℃) FA, CH6, CH7, CH8"""
+    return HYBRID.pack((ch1_code, ch2_code, ch3_pressure, ch3_temp_raw, *ch678_codes))
+
+
+def encode_ff(code):
+    """FF 帧头 + 12 位数值的高/低字节"""
+    return FF_PACKET.pack((code & 0x0FFF,))
+
+
+def encode_af_response(pressure, temp_raw):
+    """AF 压力(u16) 温度(s16, 0.1℃) FA，共 6 字节"""
+    return AF_RESPONSE.pack((pressure, temp_raw))
+
+
+# --- 合成信号 ---
+
+def _wave(t, freq, phase, center, amplitude):
+    return center + amplitude * math.sin(2 * math.pi * freq * t + phase)
+
+
+def synth_frame(protocol, t):
+    """按协议生成时刻 t 的一帧（af_poll 生成一条应答）"""
+    if protocol == 'multi8':
+        return encode_multi8([int(_wave(t, 0.5 + 0.25 * i, i, 2048, 1800)) for i in range(8)])
+    if protocol == 'hybrid':
+        # CH1/CH2 落在传感器有效的 1.5V~3.0V 区间
+        return encode_hybrid(int(_wave(t, 0.2, 0, 3070, 1000)), int(_wave(t, 0.3, 1, 3070, 1000)),
+                             int(_wave(t, 0.1, 0, 500, 400)), int(_wave(t, 0.05, 0, 250, 300)),
+                             [int(_wave(t, 1.0, k, 2048, 1000)) for k in range(3)])
+    if protocol == 'ff':
+        return encode_ff(int(_wave(t, 0.5, 0, 2048, 2000)))
+    if protocol == 'af_poll':
+        return encode_af_response(int(_wave(t, 0.1, 0, 500, 400)), int(_wave(t, 0.05, 0, 250, 300)))
+    raise ValueError(f"未知协议: {protocol}")
+
+
+class VirtualSerialDevice:
+    """
+    一个 pty 虚拟串口。open() 返回上位机应当打开的端口名。
+
+    frame_rate:  每秒帧数 (af_poll 协议下忽略，按请求应答)
+    baudrate:    等效波特率，按 10 bit/字节 限制吞吐
+    noise_rate:  每帧之前插入随机垃圾字节的概率
+    drop_rate:   每帧随机丢掉一个字节的概率
+    burst_bytes/burst_interval: 周期性注入突发噪声；也可随时调用 inject_burst()
+    """
+
+    def __init__(self, protocol, frame_rate=100.0, baudrate=115200, noise_rate=0.0, drop_rate=0.0,
+                 burst_bytes=0, burst_interval=0.0, seed=None, link=None):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"未知协议: {protocol}，可选 {', '.join(PROTOCOLS)}")
+        self.protocol = protocol
+        self.frame_rate = frame_rate
+        self.baudrate = baudrate
+        self.noise_rate = noise_rate
+        self.drop_rate = drop_rate
+        self.burst_bytes = burst_bytes
+        self.burst_interval = burst_interval
+        self.link = link
+        self.port_name = None
+        self.running = False
+        self._rng = random.Random(seed)
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._pending_burst = 0
+        self._lock = threading.Lock()
+        # 统计
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.noise_bytes = 0
+        self.dropped_bytes = 0
+        self.overflow_bytes = 0  # 没人读、pty 缓冲区满时丢掉的字节
+        self.requests_answered = 0
+
+    # --- 生命周期 ---
+
+    def open(self):
+        import tty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port_name = os.ttyname(self._slave)
+        if self.link:
+            if os.path.lexists(self.link):
+                os.remove(self.link)
+            os.symlink(self.port_name, self.link)
+        return self.link or self.port_name
+
+    def start(self):
+        """在后台线程运行，适合测试和基准脚本"""
+        if self._master is None:
+            self.open()
+        self.running = True
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self.link or self.port_name
+
+    def stop(self):
+        self.running = False
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+        if self.link and os.path.islink(self.link):
+            os.remove(self.link)
+
+    def inject_burst(self, n_bytes):
+        """下一次写入时插入 n_bytes 个随机字节（线程安全）"""
+        with self._lock:
+            self._pending_burst += n_bytes
+
+    # --- 主循环 ---
+
+    def run(self, duration=None):
+        self.running = True
+        deadline = None if not duration else time.monotonic() + duration
+        if self.protocol == 'af_poll':
+            self._run_polled(deadline)
+        else:
+            self._run_streaming(deadline)
+
+    def _run_streaming(self, deadline):
+        frame_size = len(synth_frame(self.protocol, 0.0))
+        bytes_per_second = self.baudrate / 10.0
+        # 帧率受等效波特率限制
+        interval = max(1.0 / self.frame_rate, frame_size / bytes_per_second)
+        start = time.monotonic()
+        next_frame = start
+        next_burst = start + self.burst_interval if self.burst_interval else None
+        while self.running:
+            now = time.monotonic()
+            if deadline and now >= deadline:
+                break
+            if next_burst and now >= next_burst:
+                self.inject_burst(self.burst_bytes)
+                next_burst += self.burst_interval
+            chunk = bytearray()
+            # 把到期的帧攒在一起一次写出，高帧率时也不必每帧睡一次
+            while next_frame <= now:
+                chunk += self._impair(synth_frame(self.protocol, next_frame - start))
+                self.frames_sent += 1
+                next_frame += interval
+            chunk = self._take_burst() + chunk
+            if chunk:
+                self._write(chunk)
+            time.sleep(max(0.0, min(next_frame - time.monotonic(), 0.01)))
+
+    def _run_polled(self, deadline):
+        inbox = bytearray()
+        start = time.monotonic()
+        while self.running:
+            if deadline and time.monotonic() >= deadline:
+                break
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            burst = self._take_burst()
+            if burst:
+                self._write(burst)
+            if not readable:
+                continue
+            try:
+                inbox += os.read(self._master, 4096)
+            except BlockingIOError:
+                continue
+            while True:
+                index = inbox.find(POLL_REQUEST)
+                if index == -1:
+                    # 保留可能被截断的请求前缀
+                    del inbox[:max(0, len(inbox) - (len(POLL_REQUEST) - 1))]
+                    break
+                del inbox[:index + len(POLL_REQUEST)]
+                self._write(self._impair(synth_frame('af_poll', time.monotonic() - start)))
+                self.requests_answered += 1
+                self.frames_sent += 1
+
+    # --- 干扰注入 ---
+
+    def _impair(self, frame):
+        out = bytearray(frame)
+        if self.drop_rate and self._rng.random() < self.drop_rate:
+            del out[self._rng.randrange(len(out))]
+            self.dropped_bytes += 1
+        if self.noise_rate and self._rng.random() < self.noise_rate:
+            n = self._rng.randint(1, 8)
+            out[0:0] = bytes(self._rng.randrange(256) for _ in range(n))
+            self.noise_bytes += n
+        return bytes(out)
+
+    def _take_burst(self):
+        with self._lock:
+            n, self._pending_burst = self._pending_burst, 0
+        if not n:
+            return b''
+        self.noise_bytes += n
+        return bytes(self._rng.randrange(256) for _ in range(n))
+
+    def _write(self, data):
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(self._master, view)
+            except BlockingIOError:
+                # 上位机没在读，像真串口一样丢掉溢出的数据
+                self.overflow_bytes += len(view)
+                return
+            self.bytes_sent += written
+            view = view[written:]
+
+    def summary(self):
+        return (f"帧 {self.frames_sent}, 字节 {self.bytes_sent}, 噪声 {self.noise_bytes}, "
+                f"丢字节 {self.dropped_bytes}, 溢出 {self.overflow_bytes}, 应答 {self.requests_answered}")
+
+
+def _stdin_commands(device):
+    """读取终端命令: "b [n]" 注入突发噪声, "q" 退出"""
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == 'b':
+            n = int(parts[1]) if len(parts) > 1 else 64
+            device.inject_burst(n)
+            print(f"已注入 {n} 字节突发噪声")
+        elif parts[0] == 'q':
+            device.running = False
+            break
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HRG 虚拟串口设备 (pty)")
+    parser.add_argument('protocol', choices=PROTOCOLS)
+    parser.add_argument('--rate', type=float, default=100.0, help="每秒帧数 (默认 100)")
+    parser.add_argument('--baud', type=int, default=115200, help="等效波特率 (默认 115200)")
+    parser.add_argument('--noise', type=float, default=0.0, help="每帧插入垃圾字节的概率")
+    parser.add_argument('--drop', type=float, default=0.0, help="每帧丢一个字节的概率")
+    parser.add_argument('--burst-bytes', type=int, default=0, help="周期性突发噪声的字节数")
+    parser.add_argument('--burst-every', type=float, default=0.0, help="突发噪声间隔秒数")
+    parser.add_argument('--duration', type=float, default=0.0, help="运行秒数，0 表示一直运行")
+    parser.add_argument('--link', help="额外创建一个指向从端的符号链接，例如 /tmp/ttyHRG0")
+    parser.add_argument('--seed', type=int, help="随机种子，便于复现")
+    args = parser.parse_args(argv)
+
+    device = VirtualSerialDevice(args.protocol, frame_rate=args.rate, baudrate=args.baud,
+                                 noise_rate=args.noise, drop_rate=args.drop,
+                                 burst_bytes=args.burst_bytes, burst_interval=args.burst_every,
+                                 seed=args.seed, link=args.link)
+    port = device.open()
+    print(f"虚拟串口已就绪: {port}  (协议 {args.protocol})")
+    print('输入 "b [字节数]" 注入突发噪声, "q" 退出')
+    threading.Thread(target=_stdin_commands, args=(device,), daemon=True).start()
+    try:
+        device.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(device.summary())
+        device.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# 文件名: hrg_core/stats_panel.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 各通道的均值/标准差/最小/最大/峰峰值表格，可以在最近 N 点和从连接开始累计之间切换。
+# 数据进来时只更新 hrg_core.stream_stats.StreamStats，表格由定时器每 refresh_ms 刷新一次。
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QLabel,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QTimer
+
+from hrg_core.stream_stats import StreamStats, DEFAULT_WINDOW
+
+DEFAULT_REFRESH_MS = 500
+_COLUMNS = (('mean', "均值"), ('std', "标准差"), ('min', "最小"), ('max', "最大"), ('p2p', "峰峰值"))
+
+
+class StatsPanel(QWidget):
+    """每个通道一行: 均值、标准差、最小、最大、峰峰值、采样率；可切换滑动窗口/累计"""
+
+    def __init__(self, names, units=None, window=DEFAULT_WINDOW, refresh_ms=DEFAULT_REFRESH_MS, parent=None):
+        super().__init__(parent)
+        self.names = tuple(names)
+        self.units = tuple(units) if units else ('',) * len(self.names)
+        self.stats = StreamStats(self.names, window=window)
+
+        self.scope_combobox = QComboBox()
+        self.scope_combobox.addItem(f"最近 {window} 点", 'window')
+        self.scope_combobox.addItem("从连接开始累计", 'cumulative')
+        self.scope_combobox.currentIndexChanged.connect(self.refresh)
+        self.reset_button = QPushButton("重置")
+        self.reset_button.clicked.connect(self.reset)
+        self.summary_label = QLabel()
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("统计:"))
+        controls.addWidget(self.scope_combobox)
+        controls.addWidget(self.reset_button)
+        controls.addWidget(self.summary_label)
+        controls.addStretch()
+
+        self.table = QTableWidget(len(self.names), len(_COLUMNS))
+        self.table.setHorizontalHeaderLabels([label for _, label in _COLUMNS])
+        self.table.setVerticalHeaderLabels([f"{name} ({unit})" if unit else name
+                                            for name, unit in zip(self.names, self.units)])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setWordWrap(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # 行高固定为一行字，所有通道不用滚动就能看全
+        row_height = self.table.fontMetrics().height() + 6
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(row_height)
+        self.table.setFixedHeight(row_height * (len(self.names) + 1) + 4)
+        # 单元格一次建好，刷新时只改文字
+        self._items = [[QTableWidgetItem("--") for _ in _COLUMNS] for _ in self.names]
+        for row, items in enumerate(self._items):
+            for column, item in enumerate(items):
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(controls)
+        layout.addWidget(self.table)
+
+        self._dirty = False
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._flush)
+        self._timer.start(refresh_ms)
+
+    # --- 公共接口 ---
+
+    def update_stats(self, values, timestamps=None):
+        """喂进 (n, 通道数) 的样本，timestamps 省略时用到达时刻"""
+        self.stats.update(values, timestamps)
+        self._dirty = True
+
+    def reset(self):
+        self.stats.reset()
+        self._dirty = True
+        self.refresh()
+
+    # --- 刷新 ---
+
+    def _flush(self):
+        if self._dirty:
+            self._dirty = False
+            self.refresh()
+
+    def refresh(self):
+        scope = self.scope_combobox.currentData()
+        result = self.stats.windowed() if scope == 'window' else self.stats.cumulative()
+        count = result['count']
+        self.summary_label.setText(f"{count} 点, {result['rate']:.1f} Hz")
+        for row, items in enumerate(self._items):
+            for (key, _), item in zip(_COLUMNS, items):
+                item.setText(f"{result[key][row]:.5g}" if count else "--")
@@ -0,0 +1,123 @@
+# 文件名: hrg_core/stream_stats.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 逐通道的流式统计: 均值、方差 (Welford)、最小/最大、峰峰值、采样率，
+# 同时给出“从连接开始累计”和“最近一段滑动窗口”两套结果。
+# 每批样本只做一次向量化的批内统计，再用 Chan 的合并公式并入累计值，
+# 开销和批大小成正比、与已经统计过多少样本无关。不依赖 Qt。
+
+import time
+
+import numpy as np
+
+DEFAULT_WINDOW = 2000   # 滑动窗口的样本数
+DEFAULT_CHUNKS = 20     # 滑动窗口分成多少段
+STAT_NAMES = ('count', 'mean', 'std', 'min', 'max', 'p2p', 'rate')
+
+
+class _Moments:
+    """一组样本的 (个数, 均值, M2, 最小, 最大)，各量都是每通道一个值；可以相互合并"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 't_first', 't_last')
+
+    def __init__(self, channels):
+        self.count = 0
+        self.mean = np.zeros(channels)
+        self.m2 = np.zeros(channels)
+        self.min = np.full(channels, np.inf)
+        self.max = np.full(channels, -np.inf)
+        self.t_first = None
+        self.t_last = None
+
+    def add_batch(self, values, t_first, t_last):
+        n = len(values)
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        self._merge(n, mean, m2, values.min(axis=0), values.max(axis=0), t_first, t_last)
+
+    def add(self, other):
+        if other.count:
+            self._merge(other.count, other.mean, other.m2, other.min, other.max, other.t_first, other.t_last)
+
+    def _merge(self, n, mean, m2, vmin, vmax, t_first, t_last):
+        # Chan et al. 的并行合并: 两组的均值和 M2 合成一组，不需要原始样本
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + m2 + delta * delta * (self.count * n / total)
+        self.count = total
+        np.minimum(self.min, vmin, out=self.min)
+        np.maximum(self.max, vmax, out=self.max)
+        if self.t_first is None:
+            self.t_first = t_first
+        self.t_last = t_last
+
+    def result(self):
+        """STAT_NAMES 中各项 -> 每通道数组（count 和 rate 为标量）"""
+        variance = self.m2 / (self.count - 1) if self.count > 1 else np.zeros_like(self.m2)
+        span = (self.t_last - self.t_first) if self.count > 1 else 0.0
+        return {
+            'count': self.count,
+            'mean': self.mean.copy(),
+            'std': np.sqrt(variance),
+            'min': self.min.copy(),
+            'max': self.max.copy(),
+            'p2p': self.max - self.min,
+            # 相邻样本间隔数 / 首尾时间差
+            'rate': (self.count - 1) / span if span > 0 else 0.0,
+        }
+
+
+class StreamStats:
+    """
+    update(values, timestamps) 喂进 (n, 通道数) 的样本；
+    cumulative() / windowed() 返回统计结果字典，键见 STAT_NAMES。
+
+    滑动窗口分成 chunks 段，每段只保存合并后的矩，窗口结果由最近各段合并而成，
+    所以窗口实际覆盖 window*(chunks-1)/chunks 到 window 个样本，以段为单位滑动。
+    """
+
+    def __init__(self, fields, window=DEFAULT_WINDOW, chunks=DEFAULT_CHUNKS):
+        self.fields = tuple(fields)
+        self.window = window
+        self.chunks = chunks
+        self.chunk_size = max(1, window // chunks)
+        self.reset()
+
+    def reset(self):
+        channels = len(self.fields)
+        self._total = _Moments(channels)
+        self._chunks = [_Moments(channels) for _ in range(self.chunks)]
+        self._current = 0  # 正在填充的段
+
+    def update(self, values, timestamps=None):
+        """timestamps 为每个样本的时间（秒），省略时用到达时刻"""
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.fields))
+        n = len(values)
+        if n == 0:
+            return
+        if timestamps is None:
+            timestamps = np.full(n, time.time())
+        else:
+            timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), (n,))
+        self._total.add_batch(values, timestamps[0], timestamps[-1])
+        # 按段边界切开，每一片整体并入当前段
+        start = 0
+        while start < n:
+            chunk = self._chunks[self._current]
+            if chunk.count >= self.chunk_size:
+                self._current = (self._current + 1) % self.chunks
+                chunk = self._chunks[self._current] = _Moments(len(self.fields))
+            stop = min(n, start + self.chunk_size - chunk.count)
+            chunk.add_batch(values[start:stop], timestamps[start], timestamps[stop - 1])
+            start = stop
+
+    def cumulative(self):
+        return self._total.result()
+
+    def windowed(self):
+        merged = _Moments(len(self.fields))
+        # 从最旧的一段合并到最新的一段，时间范围才是对的
+        for offset in range(1, self.chunks + 1):
+            merged.add(self._chunks[(self._current + offset) % self.chunks])
+        return merged.result()
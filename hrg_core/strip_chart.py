@@ -0,0 +1,229 @@
+# 文件名: hrg_core/strip_chart.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# 多通道滚动曲线控件。每个通道保留很长的历史（默认 2^20 点），绘制开销只和控件宽度有关:
+# 写入时就逐级 2 倍抽取出 min/max 金字塔，绘制时挑一层“每个像素列至少一个桶”的数据，
+# 再把桶合并成像素列，每列画一条从最小值到最大值的竖线，尖峰和毛刺不会因抽取而丢失。
+
+import numpy as np
+
+from PyQt5.QtWidgets import QWidget, QMenu
+from PyQt5.QtCore import Qt, QTimer, QPointF, pyqtSignal
+from PyQt5.QtGui import QPainter, QPalette, QPolygonF, QColor, QPen
+
+DEFAULT_CAPACITY = 1 << 20   # 每通道保留的样本数
+DEFAULT_REFRESH_MS = 50      # 合并重绘的间隔
+MIN_SPAN = 64                # 放大到最多只显示这么多点
+_MIN_LEVEL_BUCKETS = 64      # 金字塔最粗一层至少的桶数
+_LANE_MARGIN = 3
+_COLORS = ('#1f77b4', '#d62728', '#2ca02c', '#ff7f0e', '#9467bd', '#8c564b', '#e377c2', '#17becf')
+
+
+def _ring_take(array, start, stop):
+    """按绝对序号 [start, stop) 从环形数组里取行（拷贝）"""
+    return array[np.arange(start, stop) % len(array)]
+
+
+class MinMaxHistory:
+    """
+    多通道样本的环形历史，附带逐级 2 倍抽取的 min/max 金字塔。
+
+    第 k 层的每个桶是 2^k 个连续样本的最小/最大值，桶按样本的绝对序号对齐。
+    extend() 只重算新样本所在的桶，每层都是一次向量化运算，总开销和新样本数成正比；
+    envelope() 的开销只和要求的列数有关，与历史长度无关。
+    """
+
+    def __init__(self, channels, capacity=DEFAULT_CAPACITY):
+        self.channels = channels
+        self.capacity = 1 << max(0, int(capacity) - 1).bit_length()  # 向上取 2 的幂，各层才能整除
+        self.raw = np.zeros((self.capacity, channels), dtype=np.float32)
+        self._mins = []
+        self._maxs = []
+        size = self.capacity >> 1
+        while size >= _MIN_LEVEL_BUCKETS:
+            self._mins.append(np.zeros((size, channels), dtype=np.float32))
+            self._maxs.append(np.zeros((size, channels), dtype=np.float32))
+            size >>= 1
+        self.total = 0  # 累计写入的样本数，也是下一个样本的绝对序号
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def clear(self):
+        self.total = 0
+
+    def latest(self):
+        """最新一个样本 (各通道)，没有数据时为 None"""
+        if self.total == 0:
+            return None
+        return self.raw[(self.total - 1) % self.capacity]
+
+    def extend(self, rows):
+        """追加 (n, 通道数) 的样本"""
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.channels)
+        if len(rows) > self.capacity:
+            self.total += len(rows) - self.capacity
+            rows = rows[-self.capacity:]
+        n = len(rows)
+        if n == 0:
+            return
+        start = self.total
+        first = min(n, self.capacity - start % self.capacity)
+        self.raw[start % self.capacity:start % self.capacity + first] = rows[:first]
+        self.raw[:n - first] = rows[first:]
+        self.total += n
+
+        # 逐层更新: 本层受影响的桶 = 下一层新写入的那些元素所在的桶
+        child_min = child_max = self.raw
+        child_lo, child_hi = start, self.total
+        for level_min, level_max in zip(self._mins, self._maxs):
+            lo, hi = child_lo >> 1, (child_hi + 1) >> 1
+            lo = max(lo, hi - len(level_min))
+            buckets = np.arange(lo, hi)
+            left = (2 * buckets) % len(child_min)
+            # 最新的桶可能只写了一半，缺的那个孩子用左孩子代替
+            right = np.minimum(2 * buckets + 1, child_hi - 1) % len(child_min)
+            slots = buckets % len(level_min)
+            level_min[slots] = np.minimum(child_min[left], child_min[right])
+            level_max[slots] = np.maximum(child_max[left], child_max[right])
+            child_min, child_max = level_min, level_max
+            child_lo, child_hi = lo, hi
+
+    def envelope(self, span, columns):
+        """
+        把最近 span 个样本分成至多 columns 列，返回 (mins, maxs)，形状都是 (列数, 通道数)。
+        样本数不超过列数时每列就是一个样本，mins 和 maxs 相同。
+        桶按绝对序号对齐，所以最左一列可能多带或少带不到一个桶的最旧样本。
+        """
+        span = min(span, len(self))
+        if span == 0 or columns <= 0:
+            empty = np.empty((0, self.channels), dtype=np.float32)
+            return empty, empty
+        if span <= columns:
+            raw = _ring_take(self.raw, self.total - span, self.total)
+            return raw, raw
+        # 选每列至少一个桶的最粗一层
+        level = min((span // columns).bit_length() - 1, len(self._mins))
+        if level == 0:
+            mins = maxs = _ring_take(self.raw, self.total - span, self.total)
+        else:
+            level_min, level_max = self._mins[level - 1], self._maxs[level - 1]
+            hi = (self.total + (1 << level) - 1) >> level
+            lo = max((self.total - span) >> level, hi - len(level_min))
+            mins = _ring_take(level_min, lo, hi)
+            maxs = _ring_take(level_max, lo, hi)
+        columns = min(columns, len(mins))
+        edges = (np.arange(columns) * len(mins)) // columns
+        return np.minimum.reduceat(mins, edges, axis=0), np.maximum.reduceat(maxs, edges, axis=0)
+
+
+def _polyline(xs, ys):
+    """numpy 坐标 -> QPolygonF，直接写进 QPolygonF 的内存，不逐点创建 QPointF"""
+    polygon = QPolygonF(len(xs))
+    pointer = polygon.data()
+    pointer.setsize(len(xs) * 2 * 8)
+    points = np.frombuffer(pointer, dtype=np.float64).reshape(len(xs), 2)
+    points[:, 0] = xs
+    points[:, 1] = ys
+    return polygon
+
+
+class StripChart(QWidget):
+    """
+    多通道滚动曲线，每个通道一条泳道，纵轴按可见范围自动缩放。
+    extend() 只把数据写进历史，重绘由定时器每 refresh_ms 合并一次。
+    滚轮缩放可见的样本数，右键菜单可以清空或显示全部历史。
+    每次画完发出 painted 信号（流水线延迟测量用）。
+    """
+
+    painted = pyqtSignal()
+
+    def __init__(self, names, units=None, capacity=DEFAULT_CAPACITY, refresh_ms=DEFAULT_REFRESH_MS, parent=None):
+        super().__init__(parent)
+        self.names = tuple(names)
+        self.units = tuple(units) if units else ('',) * len(self.names)
+        self.history = MinMaxHistory(len(self.names), capacity)
+        self.span = self.history.capacity
+        self._dirty = False
+        self.setMinimumHeight(40 * len(self.names))
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._flush)
+        self._timer.start(refresh_ms)
+
+    # --- 公共接口 ---
+
+    def extend(self, rows):
+        """追加 (n, 通道数) 的样本"""
+        self.history.extend(rows)
+        self._dirty = True
+
+    def clear(self):
+        self.history.clear()
+        self._dirty = True
+
+    def _flush(self):
+        if self._dirty:
+            self._dirty = False
+            self.update()
+
+    # --- 绘制 ---
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().color(QPalette.Base))
+        text_color = self.palette().color(QPalette.Text)
+        width = self.width()
+        lane_height = self.height() / len(self.names)
+        mins, maxs = self.history.envelope(self.span, width)
+        columns = len(mins)
+        latest = self.history.latest()
+        # 列铺满整个宽度（数据不足一屏时拉开），最新的样本在最右边
+        xs = np.repeat((np.arange(columns, dtype=np.float64) + 0.5) * (width / max(columns, 1)), 2)
+        for channel, name in enumerate(self.names):
+            top = channel * lane_height
+            painter.setPen(QPen(self.palette().color(QPalette.Mid)))
+            if channel:
+                painter.drawLine(QPointF(0, top), QPointF(width, top))
+            label = name
+            if columns:
+                low, high = float(mins[:, channel].min()), float(maxs[:, channel].max())
+                if high - low < 1e-9:
+                    low, high = low - 0.5, high + 0.5
+                scale = (lane_height - 2 * _LANE_MARGIN) / (high - low)
+                # 每列两个点 (min, max)，相邻列方向交替，连成一条锯齿线就是每列一条竖线
+                ys = np.empty((columns, 2), dtype=np.float64)
+                ys[:, 0] = mins[:, channel]
+                ys[:, 1] = maxs[:, channel]
+                ys[1::2] = ys[1::2, ::-1]
+                ys = top + _LANE_MARGIN + (high - ys.ravel()) * scale
+                painter.setPen(QPen(QColor(_COLORS[channel % len(_COLORS)])))
+                painter.drawPolyline(_polyline(xs, ys))
+                label = f"{name}: {latest[channel]:.4g} {self.units[channel]}  [{low:.4g} ~ {high:.4g}]"
+            painter.setPen(text_color)
+            painter.drawText(QPointF(4, top + _LANE_MARGIN + painter.fontMetrics().ascent()), label)
+        painter.setPen(text_color)
+        painter.drawText(self.rect().adjusted(0, 0, -4, -2), Qt.AlignRight | Qt.AlignBottom,
+                         f"最近 {min(self.span, len(self.history))} 点")
+        painter.end()
+        self.painted.emit()
+
+    # --- 交互 ---
+
+    def wheelEvent(self, event):
+        # 向上滚放大（显示更少的点），向下滚缩小
+        if event.angleDelta().y() > 0:
+            self.span = max(MIN_SPAN, self.span // 2)
+        else:
+            self.span = min(self.history.capacity, self.span * 2)
+        self.update()
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        show_all = menu.addAction("显示全部历史")
+        clear = menu.addAction("清空")
+        action = menu.exec_(event.globalPos())
+        if action is show_all:
+            self.span = self.history.capacity
+            self.update()
+        elif action is clear:
+            self.clear()
@@ -0,0 +1,108 @@
+# 文件名: hrg_core/tk_refresh.py
+# Hui & Rongrong & Gemini 合作开发
+#
+# Tk 工具共用的固定帧率界面刷新（依赖 tkinter，Qt 程序不要导入本模块）。
+# 采集线程只把数据交给调度器: 数值只保留最新的一份，日志文本先累积起来；
+# Tk 主循环按固定帧率（默认 25 Hz）调用一次 render，标签更新和文本插入都合并在这一次里完成。
+# 界面开销只和帧率有关，与采样率无关；采集线程也不必再从别的线程调用 root.after。
+
+import threading
+import time
+import tkinter as tk
+
+DEFAULT_RATE_HZ = 25
+
+
+class RefreshScheduler:
+    """
+    render(latest, text) 在 Tk 主线程里每帧至多调用一次，没有新数据的帧不调用:
+      latest  上一帧之后 post() 过的各项的最新值 {名字: 值}
+      text    上一帧之后 append() 的全部文本，按顺序拼接（没有时为 ''）
+    post() 和 append() 可以在任何线程调用，只是加锁改一下 Python 对象。
+    """
+
+    def __init__(self, root, render, rate_hz=DEFAULT_RATE_HZ):
+        self.root = root
+        self.render = render
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._texts = []
+        self._job = None
+        self._next_tick = 0.0
+        self.set_rate(rate_hz)
+
+    def set_rate(self, rate_hz):
+        """每秒刷新次数，从下一帧起生效"""
+        if rate_hz <= 0:
+            raise ValueError(f"刷新频率必须大于 0，得到 {rate_hz}")
+        self.rate_hz = rate_hz
+        self._period = 1.0 / rate_hz
+
+    # --- 生命周期（Tk 主线程） ---
+
+    def start(self):
+        if self._job is None:
+            self._next_tick = time.monotonic()
+            self._tick()
+        return self
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    # --- 生产者接口（任何线程） ---
+
+    def post(self, **values):
+        """更新要显示的最新值，同一帧内的旧值直接被覆盖"""
+        with self._lock:
+            self._latest.update(values)
+
+    def append(self, text):
+        """追加一段日志文本，下一帧与其他文本一起插入"""
+        with self._lock:
+            self._texts.append(text)
+
+    # --- 刷新（Tk 主线程） ---
+
+    def flush(self):
+        """立即画出积压的数据，例如停止采集、复位显示之前"""
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            texts, self._texts = self._texts, []
+        if latest or texts:
+            self.render(latest, ''.join(texts))
+
+    def _tick(self):
+        self.flush()
+        # 下一帧排在固定网格上，render 的耗时不累积；落后超过一帧就从现在重新起算，不连续补帧
+        now = time.monotonic()
+        self._next_tick += self._period
+        if self._next_tick < now:
+            self._next_tick = now + self._period
+        self._job = self.root.after(max(1, round((self._next_tick - now) * 1000)), self._tick)
+
+
+def append_text(widget, text, max_lines=None, keep_lines=None):
+    """
+    把 text 一次性追加到 Text 控件末尾并滚动到底，只读控件临时打开一次写状态。
+    给出 max_lines 时，超过这么多行就删掉最旧的行，只留最近 keep_lines 行（默认为 max_lines）。
+    返回删掉的行数。
+    """
+    if not text:
+        return 0
+    disabled = str(widget.cget('state')) == tk.DISABLED
+    if disabled:
+        widget.config(state=tk.NORMAL)
+    widget.insert(tk.END, text)
+    removed = 0
+    if max_lines:
+        # 'end-1c' 是最后一个字符之后的位置，末尾换行后的空行也算一行
+        lines = int(widget.index('end-1c').split('.')[0]) - 1
+        if lines > max_lines:
+            removed = lines - (keep_lines or max_lines)
+            widget.delete('1.0', f'{removed + 1}.0')
+    widget.see(tk.END)
+    if disabled:
+        widget.config(state=tk.DISABLED)
+    return removed
@@ -8,6 +8,12 @@ import serial.tools.list_ports
 import threading
 import time
 import re
+from hrg_core.serial_reader import SerialReader, DEFAULT_READ_PROFILE
+from hrg_core.decoders import FFDecoder
+from hrg_core.tk_refresh import RefreshScheduler, append_text
+
+# Receive-area redraws per second; the GUI cost stays fixed whatever the packet rate
+UI_REFRESH_HZ = 25
 
 class SerialDebugTool:
     def __init__(self, root):
@@ -17,15 +23,18 @@ class SerialDebugTool:
         self.root.geometry("800x600")
         
         self.serial_port = None
+        self.serial_reader = None
         self.receive_thread = None
         self.is_running = False
         
-        # --- MODIFICATION 2: Add a byte buffer ---
-        # This buffer will store incoming bytes until we have a complete 2-byte packet
-        self.byte_buffer = b''
+        # Framing and conversion happen in the reader thread: FFDecoder keeps the bytes in a
+        # preallocated FrameRing and converts whole batches through the 2.998V lookup table.
+        self.decoder = FFDecoder()
         
         self.setup_ui()
         self.refresh_ports()
+        # Formatted text from the reader thread is accumulated and inserted once per frame
+        self.refresher = RefreshScheduler(self.root, self.render_received, UI_REFRESH_HZ).start()
         
     def setup_ui(self):
         # 主框架
@@ -157,7 +166,11 @@ class SerialDebugTool:
             stopbits = float(self.stopbits_var.get())
             parity_map = {'无': serial.PARITY_NONE, '奇校验': serial.PARITY_ODD, '偶校验': serial.PARITY_EVEN}
             parity = parity_map[self.parity_var.get()]
-            self.serial_port = serial.Serial(port=port, baudrate=baudrate, bytesize=databits, stopbits=stopbits, parity=parity, timeout=0.1)
+            self.serial_port = serial.Serial(port=port, baudrate=baudrate, bytesize=databits, stopbits=stopbits, parity=parity)
+            # Event-driven reads: block until data arrives instead of polling in_waiting
+            self.serial_reader = SerialReader(self.serial_port, DEFAULT_READ_PROFILE)
+            self.serial_reader.configure()
+            self.decoder.reset()
             self.is_running = True
             self.open_btn.config(text="关闭串口")
             self.status_var.set(f"串口已连接: {port}")
@@ -168,6 +181,7 @@ class SerialDebugTool:
     def close_serial(self):
         try:
             self.is_running = False
+            if self.serial_reader: self.serial_reader.cancel()
             if self.receive_thread: self.receive_thread.join(timeout=1)
             if self.serial_port and self.serial_port.is_open: self.serial_port.close()
             self.open_btn.config(text="打开串口")
@@ -177,82 +191,43 @@ class SerialDebugTool:
 
     # --- MODIFICATION 3: Overhaul the receive and process logic ---
     def receive_data(self):
-        """Receiving thread: reads data and puts it into the buffer."""
+        """Receiving thread: reads data, parses packets and queues the formatted lines."""
         while self.is_running and self.serial_port and self.serial_port.is_open:
             try:
-                # Read all available data from serial port
-                if self.serial_port.in_waiting > 0:
-                    data = self.serial_port.read(self.serial_port.in_waiting)
-                    self.byte_buffer += data
-                    
-                    # Schedule the processing function to run in the main thread
-                    self.root.after(0, self.process_and_display_data)
-                    
-                time.sleep(0.01)
+                # Block until data arrives (or the read profile's max_wait expires)
+                data = self.serial_reader.read()
+                if data:
+                    text = self.parse_packets(data)
+                    if text:
+                        self.refresher.append(text)
                 
             except Exception as e:
                 if self.is_running:
                     self.root.after(0, lambda: messagebox.showerror("错误", f"接收数据失败: {str(e)}"))
                 break
 
-    def process_and_display_data(self):
+    def parse_packets(self, data):
         """
-        Processes the byte buffer to find framed packets, construct 12-bit numbers, 
-        and update the UI. This version includes a sync header for robust framing.
-        This function runs in the main GUI thread.
+        Feeds newly read bytes to the frame decoder and formats every complete packet.
+        Returns all lines as one string ('' if no packet completed). Runs in the reader thread.
         """
-        # --- NEW LOGIC WITH FRAME SYNC ---
-        
-        # Define the sync header byte. This must match what the hardware sends.
-        SYNC_HEADER = b'\xFF' # We use 0xFF as the header. b'' makes it a bytes object.
-        PACKET_LENGTH = 3      # Total packet length: 1 header byte + 2 data bytes
-
-        while True:
-            # 1. Find the sync header in our buffer
-            header_index = self.byte_buffer.find(SYNC_HEADER)
-
-            # If no header is found, we can't process anything yet.
-            if header_index == -1:
-                # Optional: If buffer is very large, trim it to prevent infinite growth
-                # in case of continuous bad data. Keep last few bytes in case header
-                # is split across reads.
-                if len(self.byte_buffer) > PACKET_LENGTH:
-                     self.byte_buffer = self.byte_buffer[-(PACKET_LENGTH-1):]
-                break # Exit the loop for now, wait for more data
-
-            # 2. If header is found, discard any garbage data before it.
-            if header_index > 0:
-                self.byte_buffer = self.byte_buffer[header_index:]
-
-            # 3. Check if we have a full packet (header + data)
-            if len(self.byte_buffer) < PACKET_LENGTH:
-                # We have a header but not enough data yet. Wait for the next read.
-                break # Exit the loop for now
+        # The packet layout (0xFF header + 12-bit value as high/low byte) is declared in hrg_core.protocol;
+        # the decoder hunts for the 0xFF header and skips garbage before it.
+        rows = self.decoder.feed(data)
+        if not len(rows):
+            return ''
+        timestamp = time.strftime("%H:%M:%S")
+        codes = rows[:, 0].astype(int).tolist()
+        voltages = rows[:, 1].tolist()
+        return ''.join(
+            f"[{timestamp}] RX: {code >> 8:02X} {code & 0xFF:02X} -> "
+            f"0x{code:03X} ({code}) -> {voltage:.3f}V\n"
+            for code, voltage in zip(codes, voltages)
+        )
 
-            # 4. We have a full packet. Extract and process it.
-            # Packet structure: [Header (1 byte), High Byte (1 byte), Low Byte (1 byte)]
-            high_byte = self.byte_buffer[1]
-            low_byte = self.byte_buffer[2]
-
-            # Reconstruct the 12-bit value.
-            adc_value = (high_byte << 8) | low_byte
-
-            # Calculate voltage
-            voltage = (adc_value / 4095.0) * 2.998
-            
-            # Format for display
-            timestamp = time.strftime("%H:%M:%S")
-            display_str = (
-                f"[{timestamp}] RX: {high_byte:02X} {low_byte:02X} -> "
-                f"0x{adc_value:03X} ({adc_value}) -> {voltage:.3f}V\n"
-            )
-            self.receive_text.insert(tk.END, display_str)
-            
-            # 5. Remove the processed packet from the buffer and loop again
-            #    to process any other complete packets in the buffer.
-            self.byte_buffer = self.byte_buffer[PACKET_LENGTH:]
-        
-        self.receive_text.see(tk.END)
+    def render_received(self, latest, text):
+        """Called by the refresh scheduler on the Tk thread: one insert/see for everything received this frame."""
+        append_text(self.receive_text, text)
 
     # --- The send and clear methods are unchanged ---
     # ... [send_data, clear_receive, clear_send, on_closing] ...
@@ -271,8 +246,8 @@ class SerialDebugTool:
             self.serial_port.write(data)
             formatted_hex = ' '.join([f'{byte:02X}' for byte in data])
             timestamp = time.strftime("%H:%M:%S")
-            self.receive_text.insert(tk.END, f"[{timestamp}] TX: {formatted_hex}\n")
-            self.receive_text.see(tk.END)
+            # Goes through the scheduler so it stays in order with the received lines
+            self.refresher.append(f"[{timestamp}] TX: {formatted_hex}\n")
         except Exception as e:
             messagebox.showerror("错误", f"发送数据失败: {str(e)}")
             